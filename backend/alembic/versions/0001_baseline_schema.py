@@ -0,0 +1,128 @@
+"""baseline schema
+
+Tables as created by init_db() before migrations were introduced. Databases
+that already have them should be stamped with `alembic stamp 0001`; the
+sensor rollup tables added since then come in 0002.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('crop_data',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('crop_name', sa.String(length=100), nullable=False),
+    sa.Column('nitrogen_min', sa.Float(), nullable=True),
+    sa.Column('nitrogen_max', sa.Float(), nullable=True),
+    sa.Column('phosphorus_min', sa.Float(), nullable=True),
+    sa.Column('phosphorus_max', sa.Float(), nullable=True),
+    sa.Column('potassium_min', sa.Float(), nullable=True),
+    sa.Column('potassium_max', sa.Float(), nullable=True),
+    sa.Column('temperature_min', sa.Float(), nullable=True),
+    sa.Column('temperature_max', sa.Float(), nullable=True),
+    sa.Column('humidity_min', sa.Float(), nullable=True),
+    sa.Column('humidity_max', sa.Float(), nullable=True),
+    sa.Column('ph_min', sa.Float(), nullable=True),
+    sa.Column('ph_max', sa.Float(), nullable=True),
+    sa.Column('rainfall_min', sa.Float(), nullable=True),
+    sa.Column('rainfall_max', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_crop_data_id', 'crop_data', ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.Column('language', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    op.create_table('fertilizer_recommendations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('crop_type', sa.String(length=100), nullable=True),
+    sa.Column('soil_type', sa.String(length=50), nullable=True),
+    sa.Column('nitrogen', sa.Float(), nullable=True),
+    sa.Column('phosphorus', sa.Float(), nullable=True),
+    sa.Column('potassium', sa.Float(), nullable=True),
+    sa.Column('fertilizer_name', sa.String(length=100), nullable=True),
+    sa.Column('quantity_kg_per_acre', sa.Float(), nullable=True),
+    sa.Column('application_method', sa.Text(), nullable=True),
+    sa.Column('timing', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_fertilizer_recommendations_id', 'fertilizer_recommendations', ['id'], unique=False)
+
+    op.create_table('predictions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('prediction_type', sa.String(length=50), nullable=True),
+    sa.Column('input_data', sa.Text(), nullable=True),
+    sa.Column('output_data', sa.Text(), nullable=True),
+    sa.Column('confidence', sa.Float(), nullable=True),
+    sa.Column('model_used', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_predictions_id', 'predictions', ['id'], unique=False)
+
+    op.create_table('sensor_readings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('soil_moisture', sa.Float(), nullable=True),
+    sa.Column('soil_ph', sa.Float(), nullable=True),
+    sa.Column('nitrogen', sa.Float(), nullable=True),
+    sa.Column('phosphorus', sa.Float(), nullable=True),
+    sa.Column('potassium', sa.Float(), nullable=True),
+    sa.Column('temperature', sa.Float(), nullable=True),
+    sa.Column('humidity', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sensor_readings_id', 'sensor_readings', ['id'], unique=False)
+
+
+
+def downgrade():
+    op.drop_index('ix_sensor_readings_id', table_name='sensor_readings')
+
+    op.drop_table('sensor_readings')
+    op.drop_index('ix_predictions_id', table_name='predictions')
+
+    op.drop_table('predictions')
+    op.drop_index('ix_fertilizer_recommendations_id', table_name='fertilizer_recommendations')
+
+    op.drop_table('fertilizer_recommendations')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+
+    op.drop_table('users')
+    op.drop_index('ix_crop_data_id', table_name='crop_data')
+
+    op.drop_table('crop_data')
@@ -0,0 +1,46 @@
+"""sensor rollup tables
+
+Per-location minute, hour and day aggregates of sensor readings. Tables
+that init_db() already created are left alone, so this applies to
+databases stamped 0001 whichever version of the app created them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+TABLES = ('sensor_rollup_1m', 'sensor_rollup_1h', 'sensor_rollup_1d')
+METRICS = ('soil_moisture', 'soil_ph', 'nitrogen', 'phosphorus', 'potassium', 'temperature', 'humidity')
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    for table in TABLES:
+        if table in existing:
+            continue
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('location', sa.String(length=100), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('first_reading', sa.DateTime(), nullable=True),
+        sa.Column('last_reading', sa.DateTime(), nullable=True),
+        *[
+            sa.Column(f'{metric}_{stat}', sa.Float(), nullable=True)
+            for metric in METRICS for stat in ('sum', 'min', 'max')
+        ],
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('location', 'bucket_start', name=f'uq_{table}_location_bucket')
+        )
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_table(table)
@@ -0,0 +1,35 @@
+"""composite indexes for history queries
+
+Covers the filter + ORDER BY of prediction history, sensor history and
+fertilizer history, with id as the keyset tie-breaker. if_not_exists lets
+this run against databases whose tables were created by init_db(), which
+now declares the same indexes on the models.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_predictions_user_created', 'predictions', ['user_id', 'created_at', 'id']),
+    ('ix_predictions_user_type_created', 'predictions', ['user_id', 'prediction_type', 'created_at', 'id']),
+    ('ix_sensor_readings_location_timestamp', 'sensor_readings', ['location', 'timestamp', 'id']),
+    ('ix_sensor_readings_timestamp', 'sensor_readings', ['timestamp', 'id']),
+    ('ix_fertilizer_recommendations_user_created', 'fertilizer_recommendations', ['user_id', 'created_at']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,176 @@
+"""native JSON prediction payloads and promoted hot fields
+
+input_data / output_data become JSONB on PostgreSQL (SQLite keeps its
+TEXT storage, which the JSON type reads as-is). recommended_crop,
+disease_name, language and location are copied out of the payloads into
+indexed columns, and narrative holds long output strings zlib-compressed
+when PREDICTION_COMPRESS_NARRATIVES is on. Existing rows are backfilled
+in id order, BATCH_SIZE at a time, so memory stays flat on large tables.
+
+The column type and payload helpers are frozen copies of the app code at
+the time of this revision, so later changes to the app do not change
+what this migration does.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+"""
+import json
+import os
+import zlib
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+COMPRESS_NARRATIVES = os.getenv('PREDICTION_COMPRESS_NARRATIVES', 'False').lower() == 'true'
+NARRATIVE_MIN_CHARS = int(os.getenv('PREDICTION_NARRATIVE_MIN_CHARS', '512'))
+
+JSONPayload = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+
+COLUMNS = (
+    ('recommended_crop', sa.String(length=50)),
+    ('disease_name', sa.String(length=100)),
+    ('language', sa.String(length=10)),
+    ('location', sa.String(length=100)),
+    ('narrative', sa.LargeBinary()),
+)
+
+INDEXES = (
+    ('ix_predictions_crop_created', ['recommended_crop', 'created_at']),
+    ('ix_predictions_disease_created', ['disease_name', 'created_at']),
+    ('ix_predictions_location_created', ['location', 'created_at']),
+    ('ix_predictions_language', ['language']),
+)
+
+predictions = sa.table(
+    'predictions',
+    sa.column('id', sa.Integer),
+    sa.column('input_data', JSONPayload),
+    sa.column('output_data', JSONPayload),
+    *[sa.column(name, type_) for name, type_ in COLUMNS]
+)
+
+
+def decode_payload(payload):
+    if payload is None:
+        return {}
+    if isinstance(payload, (str, bytes)):
+        return json.loads(payload)
+    return payload
+
+
+def promoted_fields(input_data, output_data):
+    return {
+        'recommended_crop': output_data.get('recommended_crop'),
+        'disease_name': output_data.get('disease_name'),
+        'language': input_data.get('language'),
+        'location': input_data.get('location'),
+    }
+
+
+def split_narrative(output_data):
+    if not COMPRESS_NARRATIVES:
+        return output_data, None
+    lifted = {
+        key: value for key, value in output_data.items()
+        if isinstance(value, str) and len(value) >= NARRATIVE_MIN_CHARS
+    }
+    if not lifted:
+        return output_data, None
+    remaining = {key: value for key, value in output_data.items() if key not in lifted}
+    return remaining, zlib.compress(json.dumps(lifted, ensure_ascii=False).encode('utf-8'))
+
+
+def backfill(conn):
+    update = predictions.update().where(predictions.c.id == sa.bindparam('row_id')).values(
+        output_data=sa.bindparam('new_output'),
+        narrative=sa.bindparam('new_narrative'),
+        **{name: sa.bindparam(f'new_{name}') for name in ('recommended_crop', 'disease_name', 'language', 'location')}
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(predictions.c.id, predictions.c.input_data, predictions.c.output_data)
+            .where(predictions.c.id > last_id)
+            .order_by(predictions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        params = []
+        for row in rows:
+            input_data, output_data = decode_payload(row.input_data), decode_payload(row.output_data)
+            stored_output, narrative = split_narrative(output_data)
+            params.append({
+                'row_id': row.id,
+                'new_output': stored_output,
+                'new_narrative': narrative,
+                **{f'new_{name}': value for name, value in promoted_fields(input_data, output_data).items()},
+            })
+        conn.execute(update, params)
+
+
+def upgrade():
+    conn = op.get_bind()
+    existing = {column['name'] for column in sa.inspect(conn).get_columns('predictions')}
+
+    with op.batch_alter_table('predictions') as batch:
+        for name, type_ in COLUMNS:
+            if name not in existing:
+                batch.add_column(sa.Column(name, type_, nullable=True))
+
+    if conn.dialect.name == 'postgresql':
+        for name in ('input_data', 'output_data'):
+            op.alter_column(
+                'predictions', name,
+                type_=postgresql.JSONB(),
+                postgresql_using=f'{name}::jsonb'
+            )
+
+    backfill(conn)
+
+    for name, columns in INDEXES:
+        op.create_index(name, 'predictions', columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='predictions', if_exists=True)
+
+    # Put compressed narrative fields back into output_data before dropping the column
+    restore = predictions.update().where(predictions.c.id == sa.bindparam('row_id')).values(
+        output_data=sa.bindparam('new_output')
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(predictions.c.id, predictions.c.output_data, predictions.c.narrative)
+            .where(predictions.c.id > last_id, predictions.c.narrative.isnot(None))
+            .order_by(predictions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        conn.execute(restore, [
+            {'row_id': row.id, 'new_output': {**decode_payload(row.output_data), **json.loads(zlib.decompress(row.narrative))}}
+            for row in rows
+        ])
+
+    if conn.dialect.name == 'postgresql':
+        for name in ('input_data', 'output_data'):
+            op.alter_column('predictions', name, type_=sa.Text(), postgresql_using=f'{name}::text')
+
+    with op.batch_alter_table('predictions') as batch:
+        for name, _ in reversed(COLUMNS):
+            batch.drop_column(name)
@@ -9,21 +9,105 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./agriculture.db")
+    # Async driver URL; derived from DATABASE_URL (aiosqlite / asyncpg) when unset
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # SQLite storage profile applied on connect: tuned (WAL) | default (stock pragmas)
+    DB_STORAGE_PROFILE: str = os.getenv("DB_STORAGE_PROFILE", "tuned")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Move output strings longer than the threshold into a zlib-compressed column
+    PREDICTION_COMPRESS_NARRATIVES: bool = os.getenv("PREDICTION_COMPRESS_NARRATIVES", "False").lower() == "true"
+    PREDICTION_NARRATIVE_MIN_CHARS: int = int(os.getenv("PREDICTION_NARRATIVE_MIN_CHARS", "512"))
+    # Write-behind queue for Prediction / FertilizerRecommendation rows
+    AUDIT_MAX_QUEUE: int = int(os.getenv("AUDIT_MAX_QUEUE", "10000"))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))
+    AUDIT_ENQUEUE_TIMEOUT: float = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT", "1.0"))
+    AUDIT_MAX_RETRIES: int = int(os.getenv("AUDIT_MAX_RETRIES", "3"))
+    AUDIT_RETRY_BACKOFF_SECONDS: float = float(os.getenv("AUDIT_RETRY_BACKOFF_SECONDS", "0.5"))
+    AUDIT_DEAD_LETTER_PATH: str = os.getenv("AUDIT_DEAD_LETTER_PATH", "./audit_dead_letter.jsonl")
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-me")
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "jwt-secret-key-change-me")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30 days
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_TOKEN_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "process")  # process | thread
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "10"))
     
     # AI API Keys
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
-    
+
+    # LLM Gateway
+    GROQ_MAX_CONCURRENCY: int = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    LLM_THREAD_POOL_SIZE: int = int(os.getenv("LLM_THREAD_POOL_SIZE", "8"))
+    LLM_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "15"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "1"))
+    LLM_WARMUP_ON_STARTUP: bool = os.getenv("LLM_WARMUP_ON_STARTUP", "True").lower() == "true"
+
+    # LLM Provider Routing (hedged requests and circuit breakers)
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "4"))
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_LATENCY_WINDOW: int = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+    LLM_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    LLM_BREAKER_COOLDOWN_SECONDS: float = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+    # Disease Image Preprocessing
+    IMAGE_MAX_UPLOAD_BYTES: int = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", "50000000"))
+    IMAGE_MAX_DIMENSION: int = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+    IMAGE_OUTPUT_FORMAT: str = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg")  # jpeg | webp
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_PIPELINE_EXECUTOR: str = os.getenv("IMAGE_PIPELINE_EXECUTOR", "thread")  # thread | process
+    IMAGE_PIPELINE_WORKERS: int = int(os.getenv("IMAGE_PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    IMAGE_PIPELINE_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("IMAGE_PIPELINE_QUEUE_TIMEOUT_SECONDS", "10"))
+    IMAGE_CACHE_PATH: str = os.getenv("IMAGE_CACHE_PATH", "./image_cache.db")  # empty disables
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    IMAGE_CACHE_MAX_DISTANCE: int = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "6"))
+
+    # Advisory Response Cache (memory, sqlite or none)
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "21600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")
+
+    # Fertilizer Blend Optimiser
+    FERTILIZER_BLEND_TOLERANCE: float = float(os.getenv("FERTILIZER_BLEND_TOLERANCE", "0.05"))
+    FERTILIZER_BATCH_MAX_PLOTS: int = int(os.getenv("FERTILIZER_BATCH_MAX_PLOTS", "50000"))
+    FERTILIZER_TABLE_STEP: int = int(os.getenv("FERTILIZER_TABLE_STEP", "5"))
+    FERTILIZER_TABLE_PATH: str = os.getenv("FERTILIZER_TABLE_PATH", "")  # empty: build in memory at startup
+
+    # Batch Crop Prediction
+    BATCH_MAX_ROWS: int = int(os.getenv("BATCH_MAX_ROWS", "50000"))
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+    BATCH_LLM_CONCURRENCY: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
     # Weather API
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "")
     WEATHER_API_URL: str = "https://api.openweathermap.org/data/2.5"
+    WEATHER_CACHE_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600"))
+    WEATHER_CACHE_STALE_SECONDS: float = float(os.getenv("WEATHER_CACHE_STALE_SECONDS", "3600"))
+    WEATHER_CACHE_MAX_ENTRIES: int = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "2048"))
+    WEATHER_MAX_CONNECTIONS: int = int(os.getenv("WEATHER_MAX_CONNECTIONS", "20"))
+    WEATHER_TIMEOUT_SECONDS: float = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "10"))
     
     # CORS
     ALLOWED_ORIGINS: Union[List[str], str] = "http://localhost:5173,http://localhost:5174,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:5174,http://127.0.0.1:3000"
@@ -38,9 +122,27 @@ class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
+
+    # Logging (JSON lines written by a background thread)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")  # per logger, e.g. app.services.ai_service=DEBUG,sqlalchemy.engine=INFO
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json | text
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_SAMPLE_RATE_PER_SECOND: float = float(os.getenv("LOG_SAMPLE_RATE_PER_SECOND", "5"))
+    LOG_SAMPLE_MAX_LEVEL: str = os.getenv("LOG_SAMPLE_MAX_LEVEL", "DEBUG")
+
+    # Metrics (/metrics in the Prometheus text format)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
     
     # Sensor Settings
     SENSOR_UPDATE_INTERVAL: int = 5
+    SENSOR_STREAM_QUEUE_SIZE: int = int(os.getenv("SENSOR_STREAM_QUEUE_SIZE", "8"))
+    SENSOR_INGEST_MAX_QUEUE: int = int(os.getenv("SENSOR_INGEST_MAX_QUEUE", "100000"))
+    SENSOR_INGEST_BATCH_SIZE: int = int(os.getenv("SENSOR_INGEST_BATCH_SIZE", "5000"))
+    SENSOR_INGEST_FLUSH_INTERVAL: float = float(os.getenv("SENSOR_INGEST_FLUSH_INTERVAL", "1.0"))
+    SENSOR_INGEST_ENQUEUE_TIMEOUT: float = float(os.getenv("SENSOR_INGEST_ENQUEUE_TIMEOUT", "2.0"))
+    SENSOR_HISTORY_MAX_POINTS: int = int(os.getenv("SENSOR_HISTORY_MAX_POINTS", "1500"))
     
     # ML Models Path
     ML_MODELS_PATH: str = "./app/ml_models"
@@ -1,18 +1,145 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+def _async_database_url(url: str) -> str:
+    """The same database through its asyncio driver"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+IS_SQLITE_MEMORY = IS_SQLITE and (":memory:" in settings.DATABASE_URL or settings.DATABASE_URL.rstrip("/") == "sqlite:")
+
+# Pragmas applied to every new SQLite connection, per DB_STORAGE_PROFILE.
+# WAL lets readers run while the ingest writer commits; synchronous=NORMAL
+# only fsyncs at checkpoints, which is durable across crashes of the app
+# (not of the OS) and is the usual pairing with WAL.
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    },
+}
+
+def sqlite_pragmas(profile: str) -> dict:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_STORAGE_PROFILE {profile!r}; expected one of {', '.join(SQLITE_PROFILES)}")
+    return SQLITE_PROFILES[profile]
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def install_sqlite_profile(engine, profile: str):
+    """Apply a storage profile's pragmas whenever the pool opens a connection"""
+    pragmas = sqlite_pragmas(profile)
+    if not pragmas:
+        return
+    if IS_SQLITE_MEMORY:
+        # journal_mode=WAL doesn't apply to in-memory databases
+        pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+    event.listen(engine, "connect", lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas))
+
+# Statement kinds reported as their own metric label; the rest are "other"
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "ALTER", "DROP"}
+
+def _query_operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in QUERY_OPERATIONS else "OTHER"
+
+def install_query_metrics(engine, name: str):
+    """Time every statement the engine runs into db_query_duration_seconds{engine=name}"""
+    from app.services.metrics import db_query_duration, db_query_errors
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, engine=name, operation=_query_operation(statement))
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+        db_query_errors.inc(engine=name, operation=_query_operation(exception_context.statement or ""))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+def _pool_options(is_async: bool = False) -> dict:
+    """Pool class and sizing per backend"""
+    if IS_SQLITE_MEMORY:
+        # One shared connection, otherwise every checkout sees an empty database
+        return {"poolclass": StaticPool}
+    if IS_SQLITE:
+        # Keep file connections open (aiosqlite would otherwise default to
+        # NullPool) so the page cache and mmap survive between requests
+        return {
+            "poolclass": AsyncAdaptedQueuePool if is_async else QueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **_pool_options()
 )
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    **_pool_options(is_async=True)
+)
+
+if IS_SQLITE:
+    install_sqlite_profile(engine, settings.DB_STORAGE_PROFILE)
+    install_sqlite_profile(async_engine.sync_engine, settings.DB_STORAGE_PROFILE)
+
+if settings.METRICS_ENABLED:
+    install_query_metrics(engine, "sync")
+    install_query_metrics(async_engine.sync_engine, "async")
+
+# Objects stay usable after commit without another round trip
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -24,11 +151,16 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Initialize database
 def init_db():
     """Create all tables"""
+    import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
     Base.metadata.create_all(bind=engine)
-    print("✅ Database initialized successfully!")
+    logger.info("Database initialized")
 
 def seed_demo_user():
     """Create demo user if it doesn't exist"""
@@ -52,14 +184,68 @@ def seed_demo_user():
             )
             db.add(demo_user)
             db.commit()
-            print("✅ Demo user created: demo_farmer / demo123")
+            logger.info("Demo user created: demo_farmer")
         else:
-            print("ℹ️  Demo user already exists")
+            logger.info("Demo user already exists")
+    except Exception as e:
+        logger.warning("Error creating demo user: %s", e)
+        db.rollback()
+    finally:
+        db.close()
+
+def seed_crop_data():
+    """Populate the crop_data table from the built-in crop ranges if it is empty"""
+    from app.models.models import CropData
+    from app.services.crop_engine import CROP_DATABASE, PARAMETERS, CROP_DATA_COLUMNS
+    
+    db = SessionLocal()
+    try:
+        if db.query(CropData).first():
+            logger.info("Crop data already seeded")
+            return
+        
+        for crop_name, ranges in CROP_DATABASE.items():
+            columns = {}
+            for param, column in zip(PARAMETERS, CROP_DATA_COLUMNS):
+                low, high = ranges.get(param, (None, None))
+                columns[f"{column}_min"] = low
+                columns[f"{column}_max"] = high
+            db.add(CropData(crop_name=crop_name, **columns))
+        db.commit()
+        logger.info("Seeded %d crops into crop_data", len(CROP_DATABASE))
     except Exception as e:
-        print(f"⚠️  Error creating demo user: {e}")
+        logger.warning("Error seeding crop data: %s", e)
         db.rollback()
     finally:
         db.close()
 
+def load_crop_engine():
+    """Build the vectorised crop scoring engine from the crop_data table"""
+    from app.services.crop_engine import load_crop_engine_from_db
+    
+    db = SessionLocal()
+    try:
+        return load_crop_engine_from_db(db)
+    finally:
+        db.close()
+
+def backfill_sensor_rollups():
+    """Build the sensor rollup tiers from existing readings if they have never been populated"""
+    from app.models.models import SensorReading, SensorRollupMinute
+    from app.services.sensor_rollup import rebuild_rollups
+    
+    db = SessionLocal()
+    try:
+        if db.query(SensorRollupMinute.id).first() or not db.query(SensorReading.id).first():
+            return
+    finally:
+        db.close()
+    
+    try:
+        total = rebuild_rollups(engine)
+        logger.info("Rolled up %d sensor readings", total)
+    except Exception as e:
+        logger.warning("Error building sensor rollups: %s", e)
+
 if __name__ == "__main__":
     init_db()
@@ -1,15 +1,40 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.config import settings
-from app.database import init_db, seed_demo_user
+from app.database import async_engine, init_db, seed_demo_user, seed_crop_data, load_crop_engine, backfill_sensor_rollups
+from app.services.llm_gateway import llm_gateway
+from app.services.provider_router import provider_router
+from app.services.provider_registry import provider_registry
+from app.services.response_cache import response_cache
+from app.services.single_flight import single_flight
+from app.services.sensor_hub import sensor_hub
+from app.services.sensor_ingest import sensor_writer
+from app.services import audit_writer
+from app.services.weather_service import weather_service
+from app.services.password_hasher import password_hasher
+from app.services.image_pipeline import image_pipeline
+from app.services.image_cache import image_cache
+from app.services.fertilizer_table import fertilizer_table
+from app.services.metrics import metrics, loop_lag_monitor
+from app.utils.auth import auth_cache_stats
+from app.utils.uploads import UploadLimitMiddleware
+from app.utils.request_metrics import RequestMetricsMiddleware
+from app.utils.structured_logging import configure_logging, shutdown_logging, logging_stats, RequestIdMiddleware
 import logging
 
 # Import routes
 from app.routes import auth, crop, disease, fertilizer, sensor, weather, history
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging(
+    level=settings.LOG_LEVEL,
+    module_levels=settings.LOG_LEVELS,
+    fmt=settings.LOG_FORMAT,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    sample_rate=settings.LOG_SAMPLE_RATE_PER_SECOND,
+    sample_max_level=settings.LOG_SAMPLE_MAX_LEVEL
+)
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -30,10 +55,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Refuse oversized photo uploads while they stream in (multipart overhead allowed for)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={"/api/disease/detect-image": settings.IMAGE_MAX_UPLOAD_BYTES + 64 * 1024}
+)
+
+# Per-route latency histograms; added last so it times the other middleware too
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
+# Outermost, so every log line written for a request carries its ID
+app.add_middleware(RequestIdMiddleware)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global error: {exc}", exc_info=True)
+    logger.error("Global error: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
@@ -46,9 +84,61 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "Smart Agriculture API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "ai": {
+            "providers": llm_gateway.stats(),
+            "sdks": provider_registry.stats(),
+            "routing": provider_router.stats(),
+            "response_cache": response_cache.stats(),
+            "coalescing": single_flight.stats()
+        },
+        "sensor_stream": sensor_hub.stats(),
+        "sensor_ingest": sensor_writer.stats(),
+        "audit": audit_writer.audit_stats(),
+        "weather": weather_service.stats(),
+        "auth_cache": auth_cache_stats(),
+        "password_hashing": password_hasher.stats(),
+        "image_pipeline": image_pipeline.stats(),
+        "image_cache": image_cache.stats() if image_cache else None,
+        "fertilizer_table": fertilizer_table.stats(),
+        "logging": logging_stats()
     }
 
+def cache_counters():
+    """(hits, misses) per cache, read from the caches' own counters"""
+    auth = auth_cache_stats()
+    weather_cache = weather_service.stats()["cache"]
+    counters = {
+        "response": (response_cache.hits, response_cache.misses),
+        "auth_token": (auth["tokens"]["hits"], auth["tokens"]["misses"]),
+        "auth_user": (auth["users"]["hits"], auth["users"]["misses"]),
+        "weather": (weather_cache["hits"], weather_cache["misses"]),
+        "fertilizer_table": (fertilizer_table.hits, fertilizer_table.misses),
+    }
+    if image_cache:
+        counters["image"] = (image_cache.exact_hits + image_cache.near_hits, image_cache.misses)
+    return counters
+
+def hit_ratios():
+    return {name: hits / (hits + misses) if hits + misses else None for name, (hits, misses) in cache_counters().items()}
+
+metrics.collect("cache_hits_total", "counter", "Cache hits", lambda: {name: hits for name, (hits, _) in cache_counters().items()}, ("cache",))
+metrics.collect("cache_misses_total", "counter", "Cache misses", lambda: {name: misses for name, (_, misses) in cache_counters().items()}, ("cache",))
+metrics.collect("cache_hit_ratio", "gauge", "Cache hits over lookups since startup", hit_ratios, ("cache",))
+metrics.collect("websocket_subscribers", "gauge", "Sensor stream WebSocket subscribers", sensor_hub.subscriber_counts, ("location",))
+metrics.collect("llm_requests_in_flight", "gauge", "LLM calls holding a provider slot", lambda: {p: s["in_flight"] for p, s in llm_gateway.stats().items()}, ("provider",))
+metrics.collect("llm_requests_waiting", "gauge", "LLM calls queued for a provider slot", lambda: {p: s["waiting"] for p, s in llm_gateway.stats().items()}, ("provider",))
+metrics.collect(
+    "llm_breaker_open", "gauge", "1 while a provider's circuit breaker refuses calls",
+    lambda: {p: int(b["state"] == "open") for p, b in provider_router.stats()["breakers"].items()}, ("provider",)
+)
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -86,14 +176,45 @@ async def startup_event():
     init_db()
     logger.info("✅ Database initialized")
     seed_demo_user()
-    logger.info(f"🌍 Environment: {settings.ENVIRONMENT}")
-    logger.info(f"🔐 CORS Origins: {settings.ALLOWED_ORIGINS}")
+    seed_crop_data()
+    engine = load_crop_engine()
+    logger.info("🌾 Crop scoring engine loaded with %d crops", len(engine))
+    source = fertilizer_table.load(settings.FERTILIZER_TABLE_PATH)
+    logger.info("🧪 Fertilizer table %s with %d deficiency cells", source, len(fertilizer_table.cells))
+    backfill_sensor_rollups()
+    sensor_writer.start()
+    audit_writer.start()
+    weather_service.open()
+    password_hasher.start()
+    image_pipeline.start()
+    response_cache.open()
+    if image_cache:
+        image_cache.open()
+    if settings.METRICS_ENABLED:
+        loop_lag_monitor.start()
+    if settings.LLM_WARMUP_ON_STARTUP:
+        provider_registry.start_warm_up()
+    logger.info("🌍 Environment: %s", settings.ENVIRONMENT)
+    logger.info("🔐 CORS Origins: %s", settings.ALLOWED_ORIGINS)
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Smart Agriculture API...")
+    await loop_lag_monitor.aclose()
+    await sensor_hub.aclose()
+    await sensor_writer.aclose()
+    await audit_writer.aclose()
+    await weather_service.aclose()
+    password_hasher.shutdown()
+    image_pipeline.shutdown()
+    response_cache.close()
+    if image_cache:
+        image_cache.close()
+    await async_engine.dispose()
+    await llm_gateway.aclose()
+    shutdown_logging()
 
 if __name__ == "__main__":
     import uvicorn
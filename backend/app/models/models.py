@@ -1,8 +1,12 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint, JSON, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, declared_attr
 from app.database import Base
 
+# Native JSON column: JSONB on PostgreSQL, JSON text (queryable with json_extract) elsewhere
+JSONPayload = JSON().with_variant(JSONB(), "postgresql")
+
 class User(Base):
     __tablename__ = "users"
     
@@ -28,14 +32,31 @@ class Prediction(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     prediction_type = Column(String(50))  # crop, disease, fertilizer
-    input_data = Column(Text)  # JSON string
-    output_data = Column(Text)  # JSON string
+    input_data = Column(JSONPayload)
+    output_data = Column(JSONPayload)
     confidence = Column(Float)
     model_used = Column(String(50))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Hot fields promoted out of the payloads (see services/prediction_store.py)
+    recommended_crop = Column(String(50))
+    disease_name = Column(String(100))
+    language = Column(String(10))
+    location = Column(String(100))
+    # zlib-compressed JSON of long narrative fields lifted out of output_data
+    narrative = Column(LargeBinary)
+    
     # Relationships
     user = relationship("User", back_populates="predictions")
+    
+    __table_args__ = (
+        Index("ix_predictions_user_created", "user_id", "created_at", "id"),
+        Index("ix_predictions_user_type_created", "user_id", "prediction_type", "created_at", "id"),
+        Index("ix_predictions_crop_created", "recommended_crop", "created_at"),
+        Index("ix_predictions_disease_created", "disease_name", "created_at"),
+        Index("ix_predictions_location_created", "location", "created_at"),
+        Index("ix_predictions_language", "language"),
+    )
 
 class SensorReading(Base):
     __tablename__ = "sensor_readings"
@@ -54,6 +75,55 @@ class SensorReading(Base):
     
     # Relationships
     user = relationship("User", back_populates="sensor_readings")
+    
+    __table_args__ = (
+        Index("ix_sensor_readings_location_timestamp", "location", "timestamp", "id"),
+        Index("ix_sensor_readings_timestamp", "timestamp", "id"),
+    )
+
+class SensorRollupMixin:
+    """Per-location aggregates of sensor readings over fixed time buckets"""
+    
+    id = Column(Integer, primary_key=True)
+    location = Column(String(100), nullable=False, default="")
+    bucket_start = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    first_reading = Column(DateTime)
+    last_reading = Column(DateTime)
+    soil_moisture_sum = Column(Float)
+    soil_moisture_min = Column(Float)
+    soil_moisture_max = Column(Float)
+    soil_ph_sum = Column(Float)
+    soil_ph_min = Column(Float)
+    soil_ph_max = Column(Float)
+    nitrogen_sum = Column(Float)
+    nitrogen_min = Column(Float)
+    nitrogen_max = Column(Float)
+    phosphorus_sum = Column(Float)
+    phosphorus_min = Column(Float)
+    phosphorus_max = Column(Float)
+    potassium_sum = Column(Float)
+    potassium_min = Column(Float)
+    potassium_max = Column(Float)
+    temperature_sum = Column(Float)
+    temperature_min = Column(Float)
+    temperature_max = Column(Float)
+    humidity_sum = Column(Float)
+    humidity_min = Column(Float)
+    humidity_max = Column(Float)
+    
+    @declared_attr
+    def __table_args__(cls):
+        return (UniqueConstraint("location", "bucket_start", name=f"uq_{cls.__tablename__}_location_bucket"),)
+
+class SensorRollupMinute(SensorRollupMixin, Base):
+    __tablename__ = "sensor_rollup_1m"
+
+class SensorRollupHour(SensorRollupMixin, Base):
+    __tablename__ = "sensor_rollup_1h"
+
+class SensorRollupDay(SensorRollupMixin, Base):
+    __tablename__ = "sensor_rollup_1d"
 
 class CropData(Base):
     __tablename__ = "crop_data"
@@ -90,3 +160,7 @@ class FertilizerRecommendation(Base):
     application_method = Column(Text)
     timing = Column(String(100))
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_fertilizer_recommendations_user_created", "user_id", "created_at"),
+    )
@@ -94,6 +94,19 @@ class FertilizerOutput(BaseModel):
     frequency: str
     precautions: List[str]
     cost_estimate: Optional[float] = None
+    blend: Optional[List[Dict[str, Any]]] = None
+
+class BlendPlot(BaseModel):
+    plot_id: Optional[str] = None
+    crop_type: str
+    nitrogen: float = Field(..., ge=0)
+    phosphorus: float = Field(..., ge=0)
+    potassium: float = Field(..., ge=0)
+
+class BlendBatchInput(BaseModel):
+    plots: List[BlendPlot] = Field(..., min_length=1)
+    prices: Optional[Dict[str, float]] = None  # USD per kg, overrides the defaults by product name
+    tolerance: Optional[float] = Field(None, ge=0, lt=1)
 
 # Sensor Schemas
 class SensorData(BaseModel):
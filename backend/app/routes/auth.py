@@ -1,39 +1,57 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import User
 from app.models.schemas import UserCreate, UserLogin, Token, UserResponse
+from app.services.password_hasher import password_hasher, PasswordHasherBusy
 from app.utils.auth import (
-    get_password_hash,
-    verify_password,
     create_access_token,
-    get_current_active_user
+    get_current_active_user,
+    invalidate_user
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+async def _offload_hashing(call):
+    """Await a password_hasher call, turning a saturated pool into a 503"""
+    try:
+        return await call
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent sign-ins, please retry",
+            headers={"Retry-After": "2"}
+        )
+
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     # Check if user already exists
-    if db.query(User).filter(User.username == user_data.username).first():
+    if (await db.execute(select(User.id).where(User.username == user_data.username))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    if db.query(User).filter(User.email == user_data.email).first():
+    if (await db.execute(select(User.id).where(User.email == user_data.email))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Don't hold a pooled connection while the hash is computed
+    await db.rollback()
+    
     # Create new user
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await _offload_hashing(password_hasher.hash(user_data.password)),
         full_name=user_data.full_name,
         phone=user_data.phone,
         location=user_data.location,
@@ -41,8 +59,8 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(data={"sub": new_user.username})
@@ -54,19 +72,39 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user"""
     
-    # Find user
-    user = db.query(User).filter(User.username == credentials.username).first()
+    # Find user, then end the transaction so no pooled connection is held
+    # while the password is verified
+    user = (await db.execute(select(User).where(User.username == credentials.username))).scalars().first()
+    if user:
+        db.expunge(user)
+    await db.rollback()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await _offload_hashing(
+        password_hasher.verify(credentials.password, user.hashed_password)
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade hashes made with an old BCRYPT_ROUNDS while we have the plaintext
+    if password_hasher.needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await password_hasher.hash(credentials.password)
+            await db.execute(
+                update(User).where(User.id == user.id).values(hashed_password=user.hashed_password)
+            )
+            await db.commit()
+            invalidate_user(user.username)
+            password_hasher.rehashed += 1
+        except Exception as e:
+            await db.rollback()
+            logger.warning("Password rehash error: %s", e)
+    
     # Create access token
     access_token = create_access_token(data={"sub": user.username})
     
@@ -87,7 +125,7 @@ async def update_user(
     location: str = None,
     language: str = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile"""
     
@@ -98,7 +136,8 @@ async def update_user(
     if language:
         current_user.language = language
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidate_user(current_user.username)
+    await db.refresh(current_user)
     
     return UserResponse.model_validate(current_user)
@@ -1,96 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import User, Prediction
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.models.models import User
 from app.models.schemas import CropPredictionInput, CropPredictionOutput
 from app.services.ai_service import AIService
+from app.services.crop_engine import get_crop_engine
+from app.services.batch_prediction import CropBatchPredictor
+from app.services.prediction_store import prediction_row
+from app.services.audit_writer import prediction_writer, record
+from app.utils.streaming import DuplexStreamingResponse, EventStreamResponse, advisory_events, iter_batch_rows
 from app.utils.auth import get_current_user_optional
 from typing import Optional
-import json
 
 router = APIRouter(prefix="/api/crop", tags=["Crop Prediction"])
 
+def _crop_output(result: dict) -> CropPredictionOutput:
+    return CropPredictionOutput(
+        recommended_crop=result["recommended_crop"],
+        confidence=result["confidence"],
+        alternative_crops=result.get("alternatives", []),
+        reasoning=result.get("reasoning", "Based on soil and climate analysis"),
+        model_used=result.get("model_used", "Rule-based"),
+        yield_potential=result.get("yield_potential", ""),
+        growing_tips=result.get("growing_tips", [])
+    )
+
 @router.post("/predict", response_model=CropPredictionOutput)
 async def predict_crop(
     input_data: CropPredictionInput,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Predict best crop based on soil and climate parameters
     
-    Uses Groq AI API with multilingual support (en, hi, ta, ur, ml)
+    Uses Groq AI API with multilingual support (en, hi, ta, ur, ml).
+    With stream=true the answer is sent as Server-Sent Events: a "field"
+    event per field as the model writes it, then a "result" event with
+    the usual response body.
     """
     
-    try:
-        # Get prediction from AI service with language and location support
-        result = await AIService.predict_crop_ai(
-            input_data.model_dump(exclude={'language'}),
-            language=input_data.language,
-            location=input_data.location,
-            latitude=input_data.latitude,
-            longitude=input_data.longitude
-        )
-        
+    ai_kwargs = dict(
+        language=input_data.language,
+        location=input_data.location,
+        latitude=input_data.latitude,
+        longitude=input_data.longitude
+    )
+    
+    async def save_and_format(result: dict) -> CropPredictionOutput:
         # Save prediction to database if user is logged in
         if current_user:
-            prediction = Prediction(
-                user_id=current_user.id,
-                prediction_type="crop",
-                input_data=json.dumps(input_data.model_dump()),
-                output_data=json.dumps(result),
-                confidence=result.get("confidence", 0.0),
-                model_used=result.get("model_used", "Unknown")
-            )
-            
-            db.add(prediction)
-            db.commit()
-        
-        return CropPredictionOutput(
-            recommended_crop=result["recommended_crop"],
-            confidence=result["confidence"],
-            alternative_crops=result.get("alternatives", []),
-            reasoning=result.get("reasoning", "Based on soil and climate analysis"),
-            model_used=result.get("model_used", "Rule-based"),
-            yield_potential=result.get("yield_potential", ""),
-            growing_tips=result.get("growing_tips", [])
-        )
+            await record(prediction_writer, [
+                prediction_row(current_user.id, "crop", input_data.model_dump(), result, model_used="Unknown")
+            ])
+        return _crop_output(result)
+    
+    if stream:
+        events = AIService.stream_crop_prediction(input_data.model_dump(exclude={'language'}), **ai_kwargs)
+        return EventStreamResponse(advisory_events(events, save_and_format))
+    
+    try:
+        # Get prediction from AI service with language and location support
+        result = await AIService.predict_crop_ai(input_data.model_dump(exclude={'language'}), **ai_kwargs)
+        return await save_and_format(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@router.post("/predict/batch")
+async def predict_crop_batch(
+    request: Request,
+    narrate_below: Optional[float] = None,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    Predict crops for a whole soil survey in one request
+    
+    Accepts a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv)
+    of CropPredictionInput rows and streams one NDJSON result per row,
+    followed by a summary line. Rows are scored by the local rule engine;
+    rows whose confidence is below narrate_below also get an AI narrative.
+    """
+    
+    predictor = CropBatchPredictor(
+        user_id=current_user.id if current_user else None,
+        narrate_below=narrate_below
+    )
+    
+    return DuplexStreamingResponse(
+        predictor.stream(iter_batch_rows(request)),
+        media_type="application/x-ndjson"
+    )
+
 @router.get("/crops")
 async def get_all_crops():
     """Get list of all supported crops"""
     
-    from app.services.ai_service import CROP_DATABASE
+    engine = get_crop_engine()
     
     return {
-        "crops": list(CROP_DATABASE.keys()),
-        "total": len(CROP_DATABASE)
+        "crops": engine.crop_names,
+        "total": len(engine)
     }
 
 @router.get("/crop/{crop_name}")
 async def get_crop_info(crop_name: str):
     """Get detailed information about a specific crop"""
     
-    from app.services.ai_service import CROP_DATABASE
-    
+    engine = get_crop_engine()
     crop_name = crop_name.lower()
     
-    if crop_name not in CROP_DATABASE:
+    if crop_name not in engine:
         raise HTTPException(status_code=404, detail="Crop not found")
     
-    info = CROP_DATABASE[crop_name]
+    info = engine.crop_ranges(crop_name)
+    
+    def requirement(param, unit=None):
+        if info[param] is None:
+            return None
+        entry = {"min": info[param][0], "max": info[param][1]}
+        if unit:
+            entry["unit"] = unit
+        return entry
     
     return {
         "crop": crop_name,
         "requirements": {
-            "nitrogen": {"min": info["N"][0], "max": info["N"][1], "unit": "kg/ha"},
-            "phosphorus": {"min": info["P"][0], "max": info["P"][1], "unit": "kg/ha"},
-            "potassium": {"min": info["K"][0], "max": info["K"][1], "unit": "kg/ha"},
-            "temperature": {"min": info["temp"][0], "max": info["temp"][1], "unit": "°C"},
-            "humidity": {"min": info["humidity"][0], "max": info["humidity"][1], "unit": "%"},
-            "ph": {"min": info["ph"][0], "max": info["ph"][1]}
+            "nitrogen": requirement("N", "kg/ha"),
+            "phosphorus": requirement("P", "kg/ha"),
+            "potassium": requirement("K", "kg/ha"),
+            "temperature": requirement("temp", "°C"),
+            "humidity": requirement("humidity", "%"),
+            "ph": requirement("ph"),
+            "rainfall": requirement("rainfall", "mm")
         }
     }
@@ -1,27 +1,51 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import User, Prediction
+from app.models.models import User
 from app.models.schemas import DiseaseDiagnosisInput, DiseaseDiagnosisOutput
 from app.services.ai_service import AIService
+from app.services.prediction_store import prediction_row
+from app.services.audit_writer import prediction_writer, record
+from app.services.image_pipeline import InvalidImage, ImagePipelineBusy
+from app.config import settings
+from app.utils.streaming import EventStreamResponse, advisory_events
+from app.utils.uploads import read_upload
 from app.utils.auth import get_current_user_optional
-import json
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/disease", tags=["Disease Diagnosis"])
 
 @router.post("/diagnose", response_model=DiseaseDiagnosisOutput)
 async def diagnose_disease(
     input_data: DiseaseDiagnosisInput,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Diagnose plant disease based on symptoms
     
-    Uses Groq AI for accurate multilingual diagnosis (en, hi, ta, ur, ml)
+    Uses Groq AI for accurate multilingual diagnosis (en, hi, ta, ur, ml).
+    With stream=true the diagnosis is sent as Server-Sent Events ("field"
+    events, then a "result" event with the usual response body).
     """
     
+    async def save_and_format(result: dict) -> DiseaseDiagnosisOutput:
+        # Save diagnosis to database if user is logged in
+        if current_user:
+            await record(prediction_writer, [
+                prediction_row(current_user.id, "disease", input_data.model_dump(), result, model_used="AI-based")
+            ])
+        return DiseaseDiagnosisOutput(**result)
+    
+    if stream:
+        events = AIService.stream_disease_diagnosis(
+            input_data.crop_type,
+            input_data.symptoms,
+            language=input_data.language
+        )
+        return EventStreamResponse(advisory_events(events, save_and_format))
+    
     try:
         # Get diagnosis from AI service with language support
         result = await AIService.diagnose_disease_ai(
@@ -29,22 +53,7 @@ async def diagnose_disease(
             input_data.symptoms,
             language=input_data.language
         )
-        
-        # Save diagnosis to database if user is logged in
-        if current_user:
-            prediction = Prediction(
-                user_id=current_user.id,
-                prediction_type="disease",
-                input_data=json.dumps(input_data.model_dump()),
-                output_data=json.dumps(result),
-                confidence=result.get("confidence", 0.0),
-                model_used=result.get("model_used", "AI-based")
-            )
-            
-            db.add(prediction)
-            db.commit()
-        
-        return DiseaseDiagnosisOutput(**result)
+        return await save_and_format(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Diagnosis error: {str(e)}")
@@ -55,18 +64,20 @@ async def detect_disease_from_image(
     file: UploadFile = File(...),
     crop_type: Optional[str] = Form("general"),
     language: Optional[str] = Form("en"),
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Detect plant disease from uploaded image using AI Vision
     
-    Accepts image file and uses AI vision models to analyze and diagnose plant diseases
+    Accepts image file and uses AI vision models to analyze and diagnose plant diseases.
+    Uploads over IMAGE_MAX_UPLOAD_BYTES are refused with 413; the photo is
+    downsized and re-encoded without metadata before it reaches the model,
+    and repeated or near-identical photos are answered from the image cache.
     """
     
     try:
-        # Read image file
-        image_bytes = await file.read()
+        # Read image file (capped)
+        image_bytes = await read_upload(file, settings.IMAGE_MAX_UPLOAD_BYTES)
         
         # Get diagnosis from AI service with actual image
         result = await AIService.diagnose_disease_from_image(
@@ -77,22 +88,19 @@ async def detect_disease_from_image(
         
         # Save diagnosis to database if user is logged in
         if current_user:
-            prediction = Prediction(
-                user_id=current_user.id,
-                prediction_type="disease_image",
-                input_data=json.dumps({
+            await record(prediction_writer, [prediction_row(
+                current_user.id,
+                "disease_image",
+                {
                     "crop_type": crop_type,
                     "filename": file.filename,
                     "content_type": file.content_type,
+                    "image_bytes": len(image_bytes),
                     "language": language
-                }),
-                output_data=json.dumps(result),
-                confidence=result.get("confidence", 0.0),
-                model_used=result.get("model_used", "AI Vision Analysis")
-            )
-            
-            db.add(prediction)
-            db.commit()
+                },
+                result,
+                model_used="AI Vision Analysis"
+            )])
         
         # Map AI response to frontend expected format with better fallbacks
         symptoms_list = result.get("affected_parts", [])
@@ -119,10 +127,14 @@ async def detect_disease_from_image(
             "cause": result.get("description", result.get("symptoms_analysis", "Disease analysis based on visual symptoms and common pathological patterns observed in the uploaded image."))
         }
         
+    except HTTPException:
+        raise
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ImagePipelineBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"Image detection error: {error_trace}")
+        logger.error("Image detection error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Image detection error: {str(e)}")
 
 @router.get("/common-diseases/{crop_type}")
@@ -167,14 +179,24 @@ async def get_pest_management(
     crop_type: str,
     pest_issue: str,
     language: str = "en",
+    stream: bool = False,
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Get comprehensive pest management advice
     
-    Uses Groq AI for detailed multilingual IPM strategies
+    Uses Groq AI for detailed multilingual IPM strategies. With stream=true
+    the advice is sent as Server-Sent Events.
     """
     
+    if stream:
+        events = AIService.stream_pest_management(crop_type=crop_type, pest_issue=pest_issue, language=language)
+        
+        async def passthrough(result: dict) -> dict:
+            return result
+        
+        return EventStreamResponse(advisory_events(events, passthrough))
+    
     try:
         result = await AIService.get_pest_management_advice(
             crop_type=crop_type,
@@ -1,62 +1,98 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import User, FertilizerRecommendation
-from app.models.schemas import FertilizerInput, FertilizerOutput
+from app.models.models import User
+from app.models.schemas import FertilizerInput, FertilizerOutput, BlendBatchInput
 from app.services.fertilizer_service import FertilizerService
+from app.services.audit_writer import fertilizer_writer, record
+from app.utils.streaming import EventStreamResponse, advisory_events
 from app.utils.auth import get_current_active_user
+from app.config import settings
 
 router = APIRouter(prefix="/api/fertilizer", tags=["Fertilizer Recommendation"])
 
 @router.post("/recommend", response_model=FertilizerOutput)
 async def recommend_fertilizer(
     input_data: FertilizerInput,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    current_user: User = Depends(get_current_active_user)
 ):
     """
     Recommend fertilizer based on soil data and crop type
     
-    Uses Groq AI with multilingual support (en, hi, ta, ur, ml)
+    Uses Groq AI with multilingual support (en, hi, ta, ur, ml). With
+    stream=true the recommendation is sent as Server-Sent Events ("field"
+    events, then a "result" event with the usual response body).
     """
     
+    ai_kwargs = dict(
+        crop_type=input_data.crop_type,
+        soil_type=input_data.soil_type,
+        current_npk={
+            "N": input_data.nitrogen,
+            "P": input_data.phosphorus,
+            "K": input_data.potassium
+        },
+        soil_ph=input_data.soil_ph,
+        moisture=input_data.moisture,
+        language=input_data.language
+    )
+    
+    async def save_and_format(result: dict) -> FertilizerOutput:
+        # Save to database in the background
+        await record(fertilizer_writer, [{
+            "user_id": current_user.id,
+            "crop_type": input_data.crop_type,
+            "soil_type": input_data.soil_type,
+            "nitrogen": input_data.nitrogen,
+            "phosphorus": input_data.phosphorus,
+            "potassium": input_data.potassium,
+            "fertilizer_name": result["fertilizer_name"],
+            "quantity_kg_per_acre": result["quantity_kg_per_acre"],
+            "application_method": result["application_method"],
+            "timing": result["timing"]
+        }])
+        return FertilizerOutput(**result)
+    
+    if stream:
+        events = FertilizerService.stream_fertilizer_recommendation(**ai_kwargs)
+        return EventStreamResponse(advisory_events(events, save_and_format))
+    
     try:
         # Get recommendation from fertilizer service with AI and language support
-        result = await FertilizerService.recommend_fertilizer_ai(
-            crop_type=input_data.crop_type,
-            soil_type=input_data.soil_type,
-            current_npk={
-                "N": input_data.nitrogen,
-                "P": input_data.phosphorus,
-                "K": input_data.potassium
-            },
-            soil_ph=input_data.soil_ph,
-            moisture=input_data.moisture,
-            language=input_data.language
-        )
-        
-        # Save to database
-        recommendation = FertilizerRecommendation(
-            user_id=current_user.id,
-            crop_type=input_data.crop_type,
-            soil_type=input_data.soil_type,
-            nitrogen=input_data.nitrogen,
-            phosphorus=input_data.phosphorus,
-            potassium=input_data.potassium,
-            fertilizer_name=result["fertilizer_name"],
-            quantity_kg_per_acre=result["quantity_kg_per_acre"],
-            application_method=result["application_method"],
-            timing=result["timing"]
-        )
-        
-        db.add(recommendation)
-        db.commit()
-        
-        return FertilizerOutput(**result)
+        result = await FertilizerService.recommend_fertilizer_ai(**ai_kwargs)
+        return await save_and_format(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Recommendation error: {str(e)}")
 
+@router.post("/blend/batch")
+def plan_blends(
+    input_data: BlendBatchInput,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Cheapest fertilizer blend for every plot, plus cooperative-wide totals
+    
+    Solved as one vectorised linear program over all plots; prices can
+    override the per-kg product prices by name.
+    """
+    
+    if len(input_data.plots) > settings.FERTILIZER_BATCH_MAX_PLOTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.FERTILIZER_BATCH_MAX_PLOTS} plots per request"
+        )
+    if input_data.prices and any(price < 0 for price in input_data.prices.values()):
+        raise HTTPException(status_code=400, detail="Prices must not be negative")
+    
+    try:
+        return FertilizerService.plan_blends(
+            [plot.model_dump() for plot in input_data.plots],
+            prices=input_data.prices,
+            tolerance=input_data.tolerance
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/fertilizers")
 async def get_all_fertilizers():
     """Get list of all available fertilizers"""
@@ -70,7 +106,8 @@ async def get_all_fertilizers():
                 "nitrogen": data["N"],
                 "phosphorus": data["P"],
                 "potassium": data["K"],
-                "type": data["type"]
+                "type": data["type"],
+                "price_per_kg": data["price_per_kg"]
             }
             for name, data in FERTILIZER_DATABASE.items()
         ]
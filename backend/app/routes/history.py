@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from app.database import get_async_db
 from app.models.models import User, Prediction
+from app.services.prediction_store import prediction_input, prediction_output
 from app.utils.auth import get_current_active_user
+from app.utils.pagination import clamp_limit, keyset_page
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter(prefix="/api/history", tags=["History"])
 
@@ -11,17 +16,44 @@ router = APIRouter(prefix="/api/history", tags=["History"])
 async def get_prediction_history(
     limit: int = 50,
     prediction_type: str = None,
+    crop: Optional[str] = None,
+    disease: Optional[str] = None,
+    location: Optional[str] = None,
+    min_ph: Optional[float] = None,
+    max_ph: Optional[float] = None,
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's prediction history"""
+    """
+    Get user's prediction history, newest first
     
-    query = db.query(Prediction).filter(Prediction.user_id == current_user.id)
+    Filter by recommended crop, disease, location or the input soil pH
+    (e.g. crop=rice&max_ph=6). Pass the returned next_cursor as `after`
+    to fetch the following page.
+    """
+    
+    limit = clamp_limit(limit, 50)
+    
+    # The list never shows payloads, so don't fetch them
+    stmt = select(Prediction).options(
+        defer(Prediction.input_data), defer(Prediction.output_data), defer(Prediction.narrative)
+    ).where(Prediction.user_id == current_user.id)
     
     if prediction_type:
-        query = query.filter(Prediction.prediction_type == prediction_type)
+        stmt = stmt.where(Prediction.prediction_type == prediction_type)
+    if crop:
+        stmt = stmt.where(Prediction.recommended_crop == crop)
+    if disease:
+        stmt = stmt.where(Prediction.disease_name == disease)
+    if location:
+        stmt = stmt.where(Prediction.location == location)
+    if min_ph is not None:
+        stmt = stmt.where(Prediction.input_data["ph"].as_float() >= min_ph)
+    if max_ph is not None:
+        stmt = stmt.where(Prediction.input_data["ph"].as_float() < max_ph)
     
-    predictions = query.order_by(Prediction.created_at.desc()).limit(limit).all()
+    predictions, next_cursor = await keyset_page(db, stmt, Prediction.created_at, Prediction.id, after, limit)
     
     return {
         "predictions": [
@@ -30,36 +62,39 @@ async def get_prediction_history(
                 "type": p.prediction_type,
                 "created_at": p.created_at.isoformat(),
                 "confidence": p.confidence,
-                "model_used": p.model_used
+                "model_used": p.model_used,
+                "recommended_crop": p.recommended_crop,
+                "disease_name": p.disease_name
             }
             for p in predictions
         ],
-        "total": len(predictions)
+        "total": len(predictions),
+        "next_cursor": next_cursor
     }
 
 @router.get("/predictions/{prediction_id}")
 async def get_prediction_detail(
     prediction_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get detailed information about a specific prediction"""
     
-    prediction = db.query(Prediction).filter(
-        Prediction.id == prediction_id,
-        Prediction.user_id == current_user.id
-    ).first()
+    prediction = (await db.execute(
+        select(Prediction).where(
+            Prediction.id == prediction_id,
+            Prediction.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not prediction:
         raise HTTPException(status_code=404, detail="Prediction not found")
     
-    import json
-    
     return {
         "id": prediction.id,
         "type": prediction.prediction_type,
-        "input_data": json.loads(prediction.input_data),
-        "output_data": json.loads(prediction.output_data),
+        "input_data": prediction_input(prediction),
+        "output_data": prediction_output(prediction),
         "confidence": prediction.confidence,
         "model_used": prediction.model_used,
         "created_at": prediction.created_at.isoformat()
@@ -68,25 +103,27 @@ async def get_prediction_detail(
 @router.get("/summary")
 async def get_user_summary(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get summary statistics for the user"""
     
-    from sqlalchemy import func
-    
     # Count predictions by type
-    prediction_counts = db.query(
-        Prediction.prediction_type,
-        func.count(Prediction.id).label("count")
-    ).filter(
-        Prediction.user_id == current_user.id
-    ).group_by(Prediction.prediction_type).all()
+    prediction_counts = (await db.execute(
+        select(
+            Prediction.prediction_type,
+            func.count(Prediction.id).label("count")
+        ).where(
+            Prediction.user_id == current_user.id
+        ).group_by(Prediction.prediction_type)
+    )).all()
     
     # Recent activity
-    recent_predictions = db.query(Prediction).filter(
-        Prediction.user_id == current_user.id,
-        Prediction.created_at >= datetime.utcnow() - timedelta(days=7)
-    ).count()
+    recent_predictions = (await db.execute(
+        select(func.count(Prediction.id)).where(
+            Prediction.user_id == current_user.id,
+            Prediction.created_at >= datetime.utcnow() - timedelta(days=7)
+        )
+    )).scalar()
     
     return {
         "user": {
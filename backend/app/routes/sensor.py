@@ -1,77 +1,167 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models.models import SensorReading
+import logging
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models.models import SensorReading, User
 from app.sensor_simulator import sensor_simulator
+from app.services.sensor_hub import sensor_hub
+from app.services.sensor_ingest import sensor_writer, validate_readings, MAX_REPORTED_ERRORS
+from app.services.batch_writer import QueueFull
+from app.services.sensor_rollup import BUCKETS, pick_tier, query_buckets, query_stats, to_utc_naive
 from app.models.schemas import SensorData
-from typing import List
-import json
+from app.config import settings
+from app.utils.auth import get_current_user_optional
+from app.utils.pagination import MAX_PAGE_SIZE, clamp_limit, keyset_page
+from app.utils.streaming import iter_batch_rows
+from datetime import datetime
+from typing import Optional
 import asyncio
 
-router = APIRouter(prefix="/api/sensor", tags=["Sensor Data"])
+logger = logging.getLogger(__name__)
 
-# Active WebSocket connections
-active_connections: List[WebSocket] = []
+router = APIRouter(prefix="/api/sensor", tags=["Sensor Data"])
 
 @router.websocket("/stream")
-async def sensor_stream(websocket: WebSocket):
+async def sensor_stream(websocket: WebSocket, location: str = "Farm-1"):
     """
     WebSocket endpoint for real-time sensor data streaming
     
-    Clients can connect and receive live sensor updates every 5 seconds
+    All clients watching a location share one producer and receive the
+    same reading every SENSOR_UPDATE_INTERVAL seconds
     """
     
     await websocket.accept()
-    active_connections.append(websocket)
+    subscriber = sensor_hub.subscribe(location)
+    
+    # Watch for the client going away while we wait for the next reading
+    client_message = asyncio.create_task(websocket.receive())
     
     try:
         while True:
-            # Generate sensor reading
-            reading = sensor_simulator.get_reading()
-            
-            # Convert datetime to ISO string for JSON serialization
-            reading_json = {**reading, "timestamp": reading["timestamp"].isoformat()}
+            next_message = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait(
+                {next_message, client_message},
+                return_when=asyncio.FIRST_COMPLETED
+            )
             
-            # Send to client
-            await websocket.send_json(reading_json)
+            if next_message in done:
+                await websocket.send_text(next_message.result())
+            else:
+                next_message.cancel()
             
-            # Wait for next update
-            await asyncio.sleep(5)
+            if client_message in done:
+                if client_message.result()["type"] == "websocket.disconnect":
+                    break
+                # Clients don't send commands; keep listening for the disconnect
+                client_message = asyncio.create_task(websocket.receive())
             
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
-        print("Client disconnected from sensor stream")
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        logger.warning("WebSocket error: %s", e)
+    finally:
+        client_message.cancel()
+        sensor_hub.unsubscribe(subscriber)
+        logger.debug("Client disconnected from sensor stream")
+
+@router.post("/ingest", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_readings(
+    request: Request,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    Ingest a batch of sensor readings from IoT gateways
+    
+    Accepts a JSON array or NDJSON (application/x-ndjson) of SensorData
+    readings for any number of devices and locations. Valid readings are
+    queued and written in bulk in the background; the response reports
+    how many were accepted. Returns 503 when the write queue is full.
+    """
+    
+    rows = [row async for row in iter_batch_rows(request)]
+    valid, errors = await asyncio.to_thread(
+        validate_readings, rows, current_user.id if current_user else None
+    )
+    
+    if valid:
+        try:
+            await sensor_writer.put(valid, timeout=settings.SENSOR_INGEST_ENQUEUE_TIMEOUT)
+        except QueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": "1"}
+            )
+    
+    return {
+        "accepted": len(valid),
+        "rejected": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS]
+    }
 
 @router.get("/latest", response_model=SensorData)
-async def get_latest_reading(db: Session = Depends(get_db)):
+async def get_latest_reading():
     """Get the latest sensor reading"""
     
     # Get from simulator
     reading = sensor_simulator.get_reading()
     
-    # Save to database
-    sensor_data = SensorReading(**reading)
-    db.add(sensor_data)
-    db.commit()
+    # Queue for the background writer; a full queue only skips persisting
+    sensor_writer.offer([{**reading, "user_id": None}])
     
     return SensorData(**reading)
 
 @router.get("/history")
 async def get_sensor_history(
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: Optional[int] = None,
+    bucket: str = "raw",
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    location: Optional[str] = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get historical sensor readings"""
+    """
+    Get historical sensor readings, newest first
+    
+    bucket=raw returns individual readings. bucket=1m, 1h or 1d returns
+    min/max/avg/count per metric from the matching rollup tier, and
+    bucket=auto picks the finest tier that keeps the from..to range
+    within SENSOR_HISTORY_MAX_POINTS buckets per location. Pass the
+    returned next_cursor as `after` to fetch the following page. limit
+    is clamped to 500 raw readings, or to a chart's worth of buckets.
+    """
+    
+    if bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"bucket must be one of {', '.join(BUCKETS)}"
+        )
+    
+    if bucket == "auto":
+        bucket = pick_tier(start, end or datetime.utcnow())
+    
+    if bucket != "raw":
+        readings, next_cursor = await query_buckets(
+            db, bucket, start, end, location,
+            clamp_limit(limit, settings.SENSOR_HISTORY_MAX_POINTS, max(MAX_PAGE_SIZE, settings.SENSOR_HISTORY_MAX_POINTS)),
+            after
+        )
+        return {"bucket": bucket, "readings": readings, "total": len(readings), "next_cursor": next_cursor}
+    
+    stmt = select(SensorReading)
+    if start is not None:
+        stmt = stmt.where(SensorReading.timestamp >= to_utc_naive(start))
+    if end is not None:
+        stmt = stmt.where(SensorReading.timestamp <= to_utc_naive(end))
+    if location is not None:
+        stmt = stmt.where(SensorReading.location == location)
     
-    readings = db.query(SensorReading).order_by(
-        SensorReading.timestamp.desc()
-    ).limit(limit).all()
+    readings, next_cursor = await keyset_page(db, stmt, SensorReading.timestamp, SensorReading.id, after, clamp_limit(limit, 100))
     
     return {
+        "bucket": "raw",
         "readings": [
             {
                 "soil_moisture": r.soil_moisture,
@@ -86,39 +176,22 @@ async def get_sensor_history(
             }
             for r in readings
         ],
-        "total": len(readings)
+        "total": len(readings),
+        "next_cursor": next_cursor
     }
 
 @router.get("/stats")
-async def get_sensor_stats(db: Session = Depends(get_db)):
-    """Get statistical summary of sensor data"""
-    
-    from sqlalchemy import func
-    
-    stats = db.query(
-        func.avg(SensorReading.soil_moisture).label("avg_moisture"),
-        func.avg(SensorReading.soil_ph).label("avg_ph"),
-        func.avg(SensorReading.nitrogen).label("avg_nitrogen"),
-        func.avg(SensorReading.phosphorus).label("avg_phosphorus"),
-        func.avg(SensorReading.potassium).label("avg_potassium"),
-        func.avg(SensorReading.temperature).label("avg_temperature"),
-        func.avg(SensorReading.humidity).label("avg_humidity"),
-        func.min(SensorReading.timestamp).label("first_reading"),
-        func.max(SensorReading.timestamp).label("last_reading"),
-        func.count(SensorReading.id).label("total_readings")
-    ).first()
+async def get_sensor_stats(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    location: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get statistical summary of sensor data
     
-    return {
-        "averages": {
-            "soil_moisture": round(stats.avg_moisture or 0, 2),
-            "soil_ph": round(stats.avg_ph or 0, 2),
-            "nitrogen": round(stats.avg_nitrogen or 0, 2),
-            "phosphorus": round(stats.avg_phosphorus or 0, 2),
-            "potassium": round(stats.avg_potassium or 0, 2),
-            "temperature": round(stats.avg_temperature or 0, 2),
-            "humidity": round(stats.avg_humidity or 0, 2)
-        },
-        "total_readings": stats.total_readings or 0,
-        "first_reading": stats.first_reading.isoformat() if stats.first_reading else None,
-        "last_reading": stats.last_reading.isoformat() if stats.last_reading else None
-    }
+    Computed from the rollup tiers rather than the raw readings; from
+    and to are resolved to whole minutes.
+    """
+    
+    return await query_stats(db, start, end, location)
@@ -0,0 +1,90 @@
+import contextlib
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+from app.services.llm_gateway import llm_gateway, GROQ_AVAILABLE
+from app.services.provider_router import provider_router
+from app.services.response_cache import response_cache, is_cacheable
+from app.utils.streaming import JSONFieldParser
+
+logger = logging.getLogger(__name__)
+
+# ("field", (name, value)) events followed by one ("result", advisory)
+AdvisoryEvent = Tuple[str, Any]
+
+
+async def replay(result: Dict[str, Any]) -> AsyncIterator[AdvisoryEvent]:
+    """Events for an advisory that is already complete (cached or local)"""
+    for field in result.items():
+        yield "field", field
+    yield "result", result
+
+
+async def stream_groq_json(
+    request: Dict[str, Any],
+    model_used: str,
+    language: str,
+    fallback: Callable[[Exception], Dict[str, Any]]
+) -> AsyncIterator[AdvisoryEvent]:
+    """Stream a Groq JSON answer field by field, ending with the full advisory or the fallback"""
+
+    request = {key: value for key, value in request.items() if key != "response_format"}
+    parser = JSONFieldParser()
+    started = time.perf_counter()
+    try:
+        async with contextlib.aclosing(llm_gateway.stream_chat_completion("groq", **request)) as deltas:
+            async for delta in deltas:
+                for field in parser.feed(delta):
+                    yield "field", field
+        result = parser.result()
+    except Exception as e:
+        logger.warning("Groq stream error, falling back: %s", e)
+        provider_router.record("groq", request["model"], time.perf_counter() - started, False)
+        yield "result", fallback(e)
+        return
+    except BaseException:
+        # The client went away mid-stream; that says nothing about Groq
+        provider_router.breaker("groq").release()
+        raise
+
+    provider_router.record("groq", request["model"], time.perf_counter() - started, True)
+    result["model_used"] = model_used
+    result["language"] = language
+    yield "result", result
+
+
+async def stream_advisory(
+    cache_key: Optional[str],
+    request: Callable[[], Dict[str, Any]],
+    model_used: str,
+    language: str,
+    fallback: Callable[[Exception], Dict[str, Any]],
+    compute: Callable[[], Awaitable[Dict[str, Any]]]
+) -> AsyncIterator[AdvisoryEvent]:
+    """
+    Streaming counterpart of response_cache.get_or_compute
+
+    A cached advisory is replayed at once. Otherwise Groq is streamed
+    (request builds its chat kwargs), or, without Groq, compute() runs the
+    buffered provider chain and its answer is replayed; the same happens
+    while Groq's circuit breaker is open. Streams are not
+    coalesced; each one holds its own provider slot.
+    """
+
+    if cache_key is not None:
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            async for event in replay(cached):
+                yield event
+            return
+
+    if GROQ_AVAILABLE and provider_router.breaker("groq").allow():
+        events = stream_groq_json(request(), model_used, language, fallback)
+    else:
+        events = replay(await compute())
+
+    async for kind, payload in events:
+        if kind == "result" and cache_key is not None and is_cacheable(payload):
+            await response_cache.set(cache_key, payload)
+        yield kind, payload
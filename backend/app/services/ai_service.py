@@ -1,34 +1,23 @@
-import os
 import json
-import traceback
+import logging
 import base64
-from typing import Dict, Any, List, Optional
-from app.config import settings
+import hashlib
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from app.services.response_cache import response_cache, is_cacheable, crop_cache_key, disease_cache_key, pest_cache_key
+from app.services.image_pipeline import image_pipeline
+from app.services.image_cache import image_cache
+from app.services.single_flight import single_flight
+from app.services.advisory_stream import stream_advisory
+from app.services.provider_router import provider_router, NoProviderAvailable
+from app.services.crop_engine import get_crop_engine
+from app.services.llm_gateway import (
+    llm_gateway,
+    GROQ_AVAILABLE,
+    OPENAI_AVAILABLE,
+    GEMINI_AVAILABLE
+)
 
-try:
-    import openai
-    OPENAI_AVAILABLE = bool(settings.OPENAI_API_KEY)
-    if OPENAI_AVAILABLE:
-        openai.api_key = settings.OPENAI_API_KEY
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = bool(settings.GEMINI_API_KEY)
-    if GEMINI_AVAILABLE:
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-except ImportError:
-    GEMINI_AVAILABLE = False
-
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = bool(settings.GROQ_API_KEY)
-    if GROQ_AVAILABLE:
-        groq_client = Groq(api_key=settings.GROQ_API_KEY)
-except ImportError:
-    GROQ_AVAILABLE = False
-    groq_client = None
+logger = logging.getLogger(__name__)
 
 # Language mappings
 LANGUAGE_NAMES = {
@@ -39,17 +28,6 @@ LANGUAGE_NAMES = {
     "ml": "Malayalam (മലയാളം)"
 }
 
-# Crop database
-CROP_DATABASE = {
-    "rice": {"N": [80, 100], "P": [40, 50], "K": [40, 50], "temp": [20, 30], "humidity": [80, 90], "ph": [5.5, 7.0]},
-    "wheat": {"N": [50, 70], "P": [30, 40], "K": [30, 40], "temp": [15, 25], "humidity": [50, 70], "ph": [6.0, 7.5]},
-    "maize": {"N": [60, 80], "P": [35, 45], "K": [35, 45], "temp": [18, 27], "humidity": [60, 80], "ph": [5.5, 7.0]},
-    "cotton": {"N": [100, 120], "P": [50, 60], "K": [50, 60], "temp": [21, 30], "humidity": [50, 80], "ph": [6.0, 7.5]},
-    "sugarcane": {"N": [120, 150], "P": [60, 80], "K": [80, 100], "temp": [25, 35], "humidity": [70, 90], "ph": [6.0, 7.5]},
-    "potato": {"N": [70, 90], "P": [50, 60], "K": [80, 100], "temp": [15, 25], "humidity": [60, 80], "ph": [5.0, 6.5]},
-    "tomato": {"N": [80, 100], "P": [50, 70], "K": [80, 100], "temp": [20, 30], "humidity": [60, 80], "ph": [6.0, 7.0]},
-}
-
 class AIService:
     """AI Service for crop prediction and disease diagnosis with multilingual support"""
     
@@ -57,22 +35,63 @@ class AIService:
     async def predict_crop_ai(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> Dict[str, Any]:
         """Use AI API for crop prediction with language and location support"""
         
-        print(f"[CROP-DEBUG] predict_crop_ai called with: N={input_data.get('nitrogen')}, P={input_data.get('phosphorus')}, K={input_data.get('potassium')}, temp={input_data.get('temperature')}, humidity={input_data.get('humidity')}, ph={input_data.get('ph')}, rainfall={input_data.get('rainfall')}, location={location}")
-        print(f"[CROP-DEBUG] GROQ_AVAILABLE={GROQ_AVAILABLE}, OPENAI_AVAILABLE={OPENAI_AVAILABLE}, GEMINI_AVAILABLE={GEMINI_AVAILABLE}")
+        logger.debug(
+            "Crop prediction requested",
+            extra={"inputs": input_data, "location": location, "language": language}
+        )
+        
+        cache_key = crop_cache_key(input_data, language, location, latitude, longitude)
+        return await response_cache.get_or_compute(
+            cache_key,
+            lambda: AIService._predict_crop_uncached(input_data, language, location, latitude, longitude)
+        )
+    
+    @staticmethod
+    def stream_crop_prediction(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> AsyncIterator[Tuple[str, Any]]:
+        """predict_crop_ai as ("field", ...) events ending with ("result", prediction)"""
+        
+        return stream_advisory(
+            crop_cache_key(input_data, language, location, latitude, longitude),
+            lambda: AIService._crop_groq_request(input_data, language, location, latitude, longitude),
+            model_used="Groq Llama-3.3-70B",
+            language=language,
+            fallback=lambda e: AIService._predict_with_rules(input_data),
+            compute=lambda: AIService._predict_crop_uncached(input_data, language, location, latitude, longitude)
+        )
+    
+    @staticmethod
+    async def _predict_crop_uncached(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> Dict[str, Any]:
+        """Race the configured providers for a crop prediction, falling back to rules"""
         
+        attempts = []
         if GROQ_AVAILABLE:
-            return await AIService._predict_with_groq(input_data, language, location, latitude, longitude)
-        elif OPENAI_AVAILABLE:
-            return await AIService._predict_with_openai(input_data, language, location)
-        elif GEMINI_AVAILABLE:
-            return await AIService._predict_with_gemini(input_data, language, location)
-        else:
-            # Fallback to rule-based
+            attempts.append(("groq", "llama-3.3-70b-versatile", lambda: AIService._predict_with_groq(input_data, language, location, latitude, longitude)))
+        if OPENAI_AVAILABLE:
+            attempts.append(("openai", "gpt-3.5-turbo", lambda: AIService._predict_with_openai(input_data, language, location)))
+        if GEMINI_AVAILABLE:
+            attempts.append(("gemini", "gemini-pro", lambda: AIService._predict_with_gemini(input_data, language, location)))
+        
+        try:
+            return await provider_router.race(attempts, AIService._valid_crop_prediction)
+        except NoProviderAvailable as e:
+            if attempts:
+                logger.warning("No provider answered the crop prediction, falling back to rules: %s", e)
             return AIService._predict_with_rules(input_data)
     
     @staticmethod
-    async def _predict_with_groq(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> Dict[str, Any]:
-        """Groq-based prediction with multilingual and location support"""
+    def _valid_crop_prediction(result: Any) -> bool:
+        """A provider answer is usable if it names a crop and gives a numeric confidence"""
+        
+        return (
+            isinstance(result, dict)
+            and isinstance(result.get("recommended_crop"), str)
+            and bool(result["recommended_crop"].strip())
+            and isinstance(result.get("confidence"), (int, float))
+        )
+    
+    @staticmethod
+    def _crop_groq_request(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> Dict[str, Any]:
+        """Chat request for a Groq crop prediction, shared by the buffered and streaming paths"""
         
         lang_name = LANGUAGE_NAMES.get(language, "English")
         
@@ -123,33 +142,42 @@ Respond ONLY with valid JSON in this exact format:
   ]
 }}"""
         
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are an expert agricultural scientist. Analyze the EXACT soil nutrient levels (N, P, K), pH, temperature, humidity, and rainfall provided. Your recommendation MUST be based on these specific values - different inputs should produce different crop recommendations. Respond in {lang_name} with valid JSON only."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "model": "llama-3.3-70b-versatile",  # Fast, high-quality model
+            "temperature": 0.5,
+            "max_tokens": 2000,
+            "response_format": {"type": "json_object"}
+        }
+    
+    @staticmethod
+    async def _predict_with_groq(input_data: Dict[str, float], language: str = "en", location: str = None, latitude: float = None, longitude: float = None) -> Dict[str, Any]:
+        """Groq-based prediction with multilingual and location support"""
+        
         try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are an expert agricultural scientist. Analyze the EXACT soil nutrient levels (N, P, K), pH, temperature, humidity, and rainfall provided. Your recommendation MUST be based on these specific values - different inputs should produce different crop recommendations. Respond in {lang_name} with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",  # Fast, high-quality model
-                temperature=0.5,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
+            content = await llm_gateway.chat_completion(
+                "groq",
+                **AIService._crop_groq_request(input_data, language, location, latitude, longitude)
             )
             
-            result = json.loads(chat_completion.choices[0].message.content)
+            result = json.loads(content)
             result["model_used"] = "Groq Llama-3.3-70B"
             result["language"] = language
-            print(f"[CROP-DEBUG] Groq returned: crop={result.get('recommended_crop')}, confidence={result.get('confidence')}")
+            logger.debug("Groq crop prediction: %s (confidence %s)", result.get("recommended_crop"), result.get("confidence"))
             return result
             
         except Exception as e:
-            print(f"[CROP-DEBUG] Groq API error, falling back to rules: {e}")
-            return AIService._predict_with_rules(input_data)
+            logger.warning("Groq crop prediction failed: %s", e)
+            raise
     
     @staticmethod
     async def _predict_with_openai(input_data: Dict[str, float], language: str = "en", location: str = None) -> Dict[str, Any]:
@@ -174,20 +202,21 @@ Respond ONLY with valid JSON in this exact format:
         """
         
         try:
-            response = openai.ChatCompletion.create(
+            content = await llm_gateway.chat_completion(
+                "openai",
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             result["model_used"] = "OpenAI GPT-3.5"
             result["language"] = language
             return result
             
         except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return AIService._predict_with_rules(input_data)
+            logger.warning("OpenAI crop prediction failed: %s", e)
+            raise
     
     @staticmethod
     async def _predict_with_gemini(input_data: Dict[str, float], language: str = "en", location: str = None) -> Dict[str, Any]:
@@ -204,78 +233,64 @@ Respond ONLY with valid JSON in this exact format:
         """
         
         try:
-            model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(prompt)
+            model = llm_gateway.gemini.GenerativeModel('gemini-pro')
+            response = await llm_gateway.run_blocking("gemini", model.generate_content, prompt)
             result = json.loads(response.text)
             result["model_used"] = "Google Gemini"
             result["language"] = language
             return result
             
         except Exception as e:
-            print(f"Gemini API error: {e}")
-            return AIService._predict_with_rules(input_data)
+            logger.warning("Gemini crop prediction failed: %s", e)
+            raise
     
     @staticmethod
     def _predict_with_rules(input_data: Dict[str, float]) -> Dict[str, Any]:
         """Rule-based fallback prediction"""
         
-        scores = {}
-        
-        for crop, ranges in CROP_DATABASE.items():
-            score = 0
-            max_score = 0
-            
-            # Check each parameter
-            for param, value in [
-                ("N", input_data["nitrogen"]),
-                ("P", input_data["phosphorus"]),
-                ("K", input_data["potassium"]),
-                ("temp", input_data["temperature"]),
-                ("humidity", input_data["humidity"]),
-                ("ph", input_data["ph"])
-            ]:
-                max_score += 1
-                if ranges[param][0] <= value <= ranges[param][1]:
-                    score += 1
-                elif abs(value - ranges[param][0]) <= 10 or abs(value - ranges[param][1]) <= 10:
-                    score += 0.5
-            
-            scores[crop] = score / max_score if max_score > 0 else 0
-        
-        # Sort by score
-        sorted_crops = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        return {
-            "recommended_crop": sorted_crops[0][0],
-            "confidence": round(sorted_crops[0][1], 2),
-            "reasoning": f"Best match based on NPK values and climate conditions",
-            "alternatives": [
-                {"crop": crop, "confidence": round(score, 2)}
-                for crop, score in sorted_crops[1:4]
-            ],
-            "model_used": "Rule-based (Local)"
-        }
+        return get_crop_engine().predict(input_data)
     
     @staticmethod
     async def diagnose_disease_ai(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
         """AI-based disease diagnosis with multilingual support"""
         
-        print(f"[DEBUG] diagnose_disease_ai called - GROQ_AVAILABLE: {GROQ_AVAILABLE}, OPENAI_AVAILABLE: {OPENAI_AVAILABLE}")
+        logger.debug("Symptom diagnosis requested", extra={"crop_type": crop_type, "language": language})
         
-        if GROQ_AVAILABLE and groq_client is not None:
-            print("[DEBUG] Attempting Groq diagnosis...")
+        cache_key = disease_cache_key(crop_type, symptoms, language)
+        return await response_cache.get_or_compute(
+            cache_key,
+            lambda: AIService._diagnose_disease_uncached(crop_type, symptoms, language)
+        )
+    
+    @staticmethod
+    def stream_disease_diagnosis(crop_type: str, symptoms: str, language: str = "en") -> AsyncIterator[Tuple[str, Any]]:
+        """diagnose_disease_ai as ("field", ...) events ending with ("result", diagnosis)"""
+        
+        return stream_advisory(
+            disease_cache_key(crop_type, symptoms, language),
+            lambda: AIService._disease_groq_request(crop_type, symptoms, language),
+            model_used="Groq Llama-3.1-70B",
+            language=language,
+            fallback=lambda e: AIService._get_intelligent_fallback(crop_type, symptoms),
+            compute=lambda: AIService._diagnose_disease_uncached(crop_type, symptoms, language)
+        )
+    
+    @staticmethod
+    async def _diagnose_disease_uncached(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
+        """Dispatch a symptom diagnosis to the first available provider"""
+        
+        if GROQ_AVAILABLE:
             try:
-                return await AIService._diagnose_with_groq(crop_type, symptoms, language)
-            except Exception as e:
-                print(f"[ERROR] Groq diagnosis failed: {e}")
+                return await provider_router.race(
+                    [("groq", "llama-3.3-70b-versatile", lambda: AIService._diagnose_with_groq(crop_type, symptoms, language))],
+                    lambda result: isinstance(result, dict) and bool(result.get("disease_name"))
+                )
+            except NoProviderAvailable as e:
+                logger.warning("Groq symptom diagnosis failed, using fallback: %s", e)
                 # Return intelligent fallback
                 return AIService._get_intelligent_fallback(crop_type, symptoms)
-        elif OPENAI_AVAILABLE:
-            print("[DEBUG] Groq not available, skipping OpenAI (deprecated)...")
-            # Skip OpenAI since it has API version issues
-            return AIService._get_intelligent_fallback(crop_type, symptoms)
         else:
-            print("[DEBUG] No AI service available, using fallback...")
+            # OpenAI is not used for diagnosis (it has API version issues)
             return AIService._get_intelligent_fallback(crop_type, symptoms)
     
     @staticmethod
@@ -283,8 +298,13 @@ Respond ONLY with valid JSON in this exact format:
         """
         Diagnose plant disease from actual image using AI Vision models
         
+        An exact repeat of an upload is answered from image_cache before any
+        decoding; otherwise the photo is preprocessed and a near-duplicate
+        (dHash within IMAGE_CACHE_MAX_DISTANCE bits) is looked up before the
+        vision models are asked.
+        
         Args:
-            image_bytes: Raw image bytes
+            image_bytes: Uploaded image bytes
             crop_type: Type of crop
             language: Language for response
         
@@ -292,43 +312,64 @@ Respond ONLY with valid JSON in this exact format:
             Disease diagnosis with treatment recommendations
         """
         
-        print(f"[DEBUG] diagnose_disease_from_image called - Image size: {len(image_bytes)} bytes")
         
-        # Generate seed based on image properties for varied responses
-        import hashlib
-        image_hash = hashlib.md5(image_bytes).hexdigest()
+        # Content address of the upload; also seeds the image-aware Groq prompt
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
         seed_value = int(image_hash[:8], 16)
         
-        print(f"[DEBUG] Image hash seed: {image_hash[:8]}")
+        logger.debug(
+            "Image diagnosis requested",
+            extra={"image_bytes": len(image_bytes), "image_sha256": image_hash[:16], "crop_type": crop_type}
+        )
+        
+        if image_cache is not None:
+            cached = await image_cache.get(image_hash, crop_type, language)
+            if cached is not None:
+                return cached
+        
+        image = await image_pipeline.prepare(image_bytes)
+        
+        if image_cache is not None:
+            cached = await image_cache.get(image_hash, crop_type, language, hash_value=image["dhash"])
+            if cached is not None:
+                return cached
+        
+        async def diagnose_and_store():
+            result = await AIService._diagnose_image_uncached(image["data"], seed_value, crop_type, language, image["mime_type"])
+            if image_cache is not None and is_cacheable(result):
+                await image_cache.set(image_hash, image["dhash"], crop_type, language, result)
+            return result
+        
+        return await single_flight.do(f"image:{image_hash}:{crop_type}:{language}", diagnose_and_store)
+    
+    @staticmethod
+    async def _diagnose_image_uncached(image_bytes: bytes, seed_value: int, crop_type: str, language: str = "en", mime_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Run image diagnosis against the available vision providers"""
         
         # Try Gemini Pro Vision first (best for image analysis)
         if GEMINI_AVAILABLE:
             try:
-                print("[DEBUG] Attempting Gemini Vision analysis...")
-                return await AIService._diagnose_with_gemini_vision(image_bytes, crop_type, language)
+                return await AIService._diagnose_with_gemini_vision(image_bytes, crop_type, language, mime_type)
             except Exception as e:
-                print(f"[ERROR] Gemini Vision failed: {e}")
-                import traceback
-                print(traceback.format_exc())
+                logger.warning("Gemini Vision diagnosis failed: %s", e, exc_info=True)
         
         # Use Groq with image-aware prompting
-        if GROQ_AVAILABLE and groq_client is not None:
+        if GROQ_AVAILABLE:
             try:
-                print("[DEBUG] Using Groq with image-aware analysis...")
                 return await AIService._diagnose_with_groq_image_aware(seed_value, crop_type, language)
             except Exception as e:
-                print(f"[ERROR] Groq analysis failed: {e}")
+                logger.warning("Groq image diagnosis failed: %s", e)
         
         # Fallback: use intelligent pattern matching
-        print("[DEBUG] Using intelligent fallback for image analysis...")
+        logger.info("No vision provider answered, using the rule-based image fallback")
         return AIService._get_intelligent_fallback(
             crop_type, 
             "Image uploaded showing plant disease symptoms requiring diagnosis"
         )
     
     @staticmethod
-    async def _diagnose_with_groq(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
-        """Groq-based disease diagnosis with detailed multilingual output"""
+    def _disease_groq_request(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
+        """Chat request for a Groq symptom diagnosis, shared by the buffered and streaming paths"""
         
         lang_name = LANGUAGE_NAMES.get(language, "English")
         
@@ -365,81 +406,46 @@ Respond in {lang_name} with ONLY valid JSON in this EXACT format:
   "precautions": ["Wear gloves during treatment", "Apply in early morning", "Avoid contact with eyes"]
 }}"""
         
-        try:
-            print(f"[DEBUG] Calling Groq API for disease diagnosis...")
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a highly experienced plant pathologist specializing in crop diseases. Provide accurate, specific disease diagnoses with practical treatment plans. Always respond in {lang_name} with valid JSON format only. Never use generic terms like 'Unknown Disease' - identify the most likely specific disease."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,
-                max_tokens=3000,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(chat_completion.choices[0].message.content)
-            result["model_used"] = "Groq Llama-3.1-70B"
-            result["language"] = language
-            
-            print(f"[DEBUG] AI Response: {result.get('disease_name', 'N/A')} (confidence: {result.get('confidence', 0)})")
-            return result
-            
-        except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Groq disease diagnosis error: {error_trace}")
-            raise e  # Re-raise to be caught by parent function
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are a highly experienced plant pathologist specializing in crop diseases. Provide accurate, specific disease diagnoses with practical treatment plans. Always respond in {lang_name} with valid JSON format only. Never use generic terms like 'Unknown Disease' - identify the most likely specific disease."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "model": "llama-3.3-70b-versatile",
+            "temperature": 0.3,
+            "max_tokens": 3000,
+            "response_format": {"type": "json_object"}
+        }
     
     @staticmethod
-    async def _diagnose_with_openai(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
-        """OpenAI-based disease diagnosis"""
-        
-        lang_name = LANGUAGE_NAMES.get(language, "English")
-        
-        prompt = f"""As a plant pathologist, diagnose the disease for {crop_type} with these symptoms:
-            {symptoms}
-            
-            Respond in {lang_name} with JSON format:
-            - disease_name
-            - confidence (0-1)
-            - description
-            - treatment
-            - prevention
-            - severity (low/medium/high)
-            """
+    async def _diagnose_with_groq(crop_type: str, symptoms: str, language: str = "en") -> Dict[str, Any]:
+        """Groq-based disease diagnosis with detailed multilingual output"""
         
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3
+            content = await llm_gateway.chat_completion(
+                "groq",
+                **AIService._disease_groq_request(crop_type, symptoms, language)
             )
             
-            result = json.loads(response.choices[0].message.content)
-            result["model_used"] = "OpenAI GPT-3.5"
+            result = json.loads(content)
+            result["model_used"] = "Groq Llama-3.1-70B"
             result["language"] = language
+            
+            logger.debug("Groq diagnosis: %s (confidence %s)", result.get("disease_name"), result.get("confidence"))
             return result
             
         except Exception as e:
-            print(f"OpenAI error: {e}")
-            return {
-                "disease_name": "Unknown Disease",
-                "confidence": 0.5,
-                "description": "Unable to diagnose",
-                "treatment": "Consult expert",
-                "prevention": "Good practices",
-                "severity": "medium"
-            }
+            logger.warning("Groq disease diagnosis failed: %s", e, exc_info=True)
+            raise e  # Re-raise to be caught by parent function
     
     @staticmethod
-    async def _diagnose_with_gemini_vision(image_bytes: bytes, crop_type: str, language: str = "en") -> Dict[str, Any]:
+    async def _diagnose_with_gemini_vision(image_bytes: bytes, crop_type: str, language: str = "en", mime_type: str = "image/jpeg") -> Dict[str, Any]:
         """Gemini Pro Vision for image-based disease diagnosis"""
         
         if not GEMINI_AVAILABLE:
@@ -447,13 +453,11 @@ Respond in {lang_name} with ONLY valid JSON in this EXACT format:
         
         lang_name = LANGUAGE_NAMES.get(language, "English")
         
-        # Convert image to PIL Image
-        from PIL import Image
-        import io
-        image = Image.open(io.BytesIO(image_bytes))
+        # Send the encoded bytes as-is; decoding to PIL would make the SDK re-encode them
+        image = {"mime_type": mime_type, "data": image_bytes}
         
         # Create vision model
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = llm_gateway.gemini.GenerativeModel('gemini-1.5-flash')
         
         prompt = f"""You are an expert plant pathologist. Analyze this image of a {crop_type} plant and diagnose any disease present.
 
@@ -480,7 +484,7 @@ Respond in {lang_name} with ONLY valid JSON:
 }}"""
         
         try:
-            response = model.generate_content([prompt, image])
+            response = await llm_gateway.run_blocking("gemini", model.generate_content, [prompt, image])
             result_text = response.text
             
             # Clean JSON if wrapped in markdown
@@ -493,11 +497,11 @@ Respond in {lang_name} with ONLY valid JSON:
             result["model_used"] = "Gemini Pro Vision"
             result["language"] = language
             
-            print(f"[DEBUG] Gemini Vision identified: {result.get('disease_name', 'N/A')}")
+            logger.debug("Gemini Vision diagnosis: %s", result.get("disease_name"))
             return result
             
         except Exception as e:
-            print(f"Gemini Vision error: {e}")
+            logger.warning("Gemini Vision request failed: %s", e)
             raise e
     
     @staticmethod
@@ -555,8 +559,8 @@ Respond in {lang_name} with ONLY valid JSON in this EXACT format:
 }}"""
         
         try:
-            print(f"[DEBUG] Calling Groq with symptoms: {selected_symptoms[:50]}...")
-            chat_completion = groq_client.chat.completions.create(
+            content = await llm_gateway.chat_completion(
+                "groq",
                 messages=[
                     {
                         "role": "system",
@@ -573,19 +577,19 @@ Respond in {lang_name} with ONLY valid JSON in this EXACT format:
                 response_format={"type": "json_object"}
             )
             
-            result = json.loads(chat_completion.choices[0].message.content)
+            result = json.loads(content)
             result["model_used"] = "Groq AI Vision-Aware Analysis"
             result["language"] = language
             
-            print(f"[DEBUG] Disease identified: {result.get('disease_name', 'N/A')}")
+            logger.debug("Groq image-aware diagnosis: %s", result.get("disease_name"))
             return result
             
         except Exception as e:
-            print(f"Groq image-aware analysis error: {e}")
+            logger.warning("Groq image-aware analysis failed: %s", e)
             raise e
     
     @staticmethod
-    async def _diagnose_with_groq_vision(image_bytes: bytes, crop_type: str, language: str = "en") -> Dict[str, Any]:
+    async def _diagnose_with_groq_vision(image_bytes: bytes, crop_type: str, language: str = "en", mime_type: str = "image/jpeg") -> Dict[str, Any]:
         """Groq vision-based diagnosis using Llama 3.2 Vision"""
         
         if not GROQ_AVAILABLE:
@@ -615,7 +619,8 @@ Provide detailed diagnosis in valid JSON format with:
         
         try:
             # Use Groq's vision model
-            chat_completion = groq_client.chat.completions.create(
+            content = await llm_gateway.chat_completion(
+                "groq",
                 messages=[
                     {
                         "role": "user",
@@ -624,7 +629,7 @@ Provide detailed diagnosis in valid JSON format with:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
+                                    "url": f"data:{mime_type};base64,{image_base64}"
                                 }
                             }
                         ]
@@ -636,26 +641,78 @@ Provide detailed diagnosis in valid JSON format with:
                 response_format={"type": "json_object"}
             )
             
-            result = json.loads(chat_completion.choices[0].message.content)
+            result = json.loads(content)
             result["model_used"] = "Groq Llama Vision"
             result["language"] = language
             
-            print(f"[DEBUG] Groq Vision identified: {result.get('disease_name', 'N/A')}")
+            logger.debug("Groq Vision diagnosis: %s", result.get("disease_name"))
             return result
             
         except Exception as e:
-            print(f"Groq Vision error: {e}")
+            logger.warning("Groq Vision request failed: %s", e)
             raise e
     
     @staticmethod
     async def get_pest_management_advice(crop_type: str, pest_issue: str, language: str = "en") -> Dict[str, Any]:
         """Get pest management advice with multilingual support"""
         
+        return await single_flight.do(
+            pest_cache_key(crop_type, pest_issue, language),
+            lambda: AIService._pest_management_uncached(crop_type, pest_issue, language)
+        )
+    
+    @staticmethod
+    def stream_pest_management(crop_type: str, pest_issue: str, language: str = "en") -> AsyncIterator[Tuple[str, Any]]:
+        """get_pest_management_advice as ("field", ...) events ending with ("result", advice)"""
+        
+        return stream_advisory(
+            None,
+            lambda: AIService._pest_groq_request(crop_type, pest_issue, language),
+            model_used="Groq Llama-3.1-70B",
+            language=language,
+            fallback=AIService._pest_error,
+            compute=lambda: AIService._pest_management_uncached(crop_type, pest_issue, language)
+        )
+    
+    @staticmethod
+    async def _pest_management_uncached(crop_type: str, pest_issue: str, language: str = "en") -> Dict[str, Any]:
+        """Ask Groq for an IPM plan"""
+        
         if not GROQ_AVAILABLE:
-            return {
-                "pest_name": "Unknown",
-                "management_plan": "Service unavailable"
-            }
+            return AIService._pest_unavailable()
+        
+        try:
+            content = await llm_gateway.chat_completion(
+                "groq",
+                **AIService._pest_groq_request(crop_type, pest_issue, language)
+            )
+            
+            result = json.loads(content)
+            result["model_used"] = "Groq Llama-3.1-70B"
+            result["language"] = language
+            return result
+            
+        except Exception as e:
+            logger.warning("Groq pest management request failed: %s", e)
+            return AIService._pest_error(e)
+    
+    @staticmethod
+    def _pest_unavailable() -> Dict[str, Any]:
+        return {
+            "pest_name": "Unknown",
+            "management_plan": "Service unavailable"
+        }
+    
+    @staticmethod
+    def _pest_error(e: Exception) -> Dict[str, Any]:
+        return {
+            "pest_name": "Error",
+            "management_plan": f"Service error: {str(e)}"
+        }
+    
+    @staticmethod
+    def _pest_groq_request(crop_type: str, pest_issue: str, language: str = "en") -> Dict[str, Any]:
+        """Chat request for Groq pest management advice, shared by the buffered and streaming paths"""
         
         lang_name = LANGUAGE_NAMES.get(language, "English")
         
@@ -681,35 +738,22 @@ Respond ONLY with valid JSON:
   "best_practices": ["practice 1 in {lang_name}", "practice 2", "practice 3"]
 }}"""
         
-        try:
-            chat_completion = groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are an IPM expert. Provide detailed advice in {lang_name}. Respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.2,
-                max_tokens=2500,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(chat_completion.choices[0].message.content)
-            result["model_used"] = "Groq Llama-3.1-70B"
-            result["language"] = language
-            return result
-            
-        except Exception as e:
-            print(f"Groq pest management error: {e}")
-            return {
-                "pest_name": "Error",
-                "management_plan": f"Service error: {str(e)}"
-            }
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are an IPM expert. Provide detailed advice in {lang_name}. Respond with valid JSON only."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "model": "llama-3.3-70b-versatile",
+            "temperature": 0.2,
+            "max_tokens": 2500,
+            "response_format": {"type": "json_object"}
+        }
     
     @staticmethod
     def _get_intelligent_fallback(crop_type: str, symptoms: str) -> Dict[str, Any]:
@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+from app.config import settings
+from app.models.models import Prediction, FertilizerRecommendation
+from app.services.batch_writer import BatchWriter, QueueFull
+
+logger = logging.getLogger(__name__)
+
+
+def _audit_writer(name: str, table) -> BatchWriter:
+    return BatchWriter(
+        name,
+        table,
+        max_queue=settings.AUDIT_MAX_QUEUE,
+        batch_size=settings.AUDIT_BATCH_SIZE,
+        flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+        max_retries=settings.AUDIT_MAX_RETRIES,
+        retry_backoff=settings.AUDIT_RETRY_BACKOFF_SECONDS,
+        dead_letter_path=settings.AUDIT_DEAD_LETTER_PATH or None
+    )
+
+
+# Write-behind queues for the records saved after each AI call
+prediction_writer = _audit_writer("prediction_audit", Prediction.__table__)
+fertilizer_writer = _audit_writer("fertilizer_audit", FertilizerRecommendation.__table__)
+AUDIT_WRITERS = (prediction_writer, fertilizer_writer)
+
+
+async def record(writer: BatchWriter, rows: List[Dict[str, Any]]):
+    """
+    Queue audit rows without waiting on the database
+
+    created_at is stamped now, not at flush time. If the queue stays full
+    past AUDIT_ENQUEUE_TIMEOUT the rows go straight to the dead-letter
+    file, so a result the user already received is never lost silently.
+    """
+
+    now = datetime.utcnow()
+    rows = [{"created_at": now, **row} for row in rows]
+    try:
+        await writer.put(rows, timeout=settings.AUDIT_ENQUEUE_TIMEOUT)
+    except QueueFull as e:
+        if writer.dead_letter_path:
+            writer.dead_letter(rows, str(e))
+        else:
+            logger.error("%s: %d rows dropped: %s", writer.name, len(rows), e)
+
+
+def start():
+    for writer in AUDIT_WRITERS:
+        writer.start()
+
+
+async def aclose():
+    """Drain every audit queue; call on shutdown"""
+    for writer in AUDIT_WRITERS:
+        await writer.aclose()
+
+
+def audit_stats() -> Dict[str, Any]:
+    return {writer.name: writer.stats() for writer in AUDIT_WRITERS}
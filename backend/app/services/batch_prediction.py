@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from app.config import settings
+from app.models.schemas import CropPredictionInput
+from app.services.ai_service import AIService
+from app.services.crop_engine import get_crop_engine
+from app.services.prediction_store import prediction_row
+from app.services.audit_writer import prediction_writer, record
+
+logger = logging.getLogger(__name__)
+
+
+def _output_row(index: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "recommended_crop": result["recommended_crop"],
+        "confidence": result["confidence"],
+        "alternative_crops": result.get("alternatives", []),
+        "reasoning": result.get("reasoning", "Based on soil and climate analysis"),
+        "model_used": result.get("model_used", "Rule-based"),
+        "yield_potential": result.get("yield_potential", ""),
+        "growing_tips": result.get("growing_tips", [])
+    }
+
+
+def _ndjson(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+class CropBatchPredictor:
+    """
+    Streams crop predictions for a large batch of soil tests
+
+    Rows are scored in chunks by the local vectorised engine. Only rows
+    whose rule confidence falls below narrate_below are sent to the LLM,
+    with bounded concurrency, for a full narrative; they are cancelled if
+    the client goes away. Predictions are queued on the audit writer a
+    chunk at a time; if its queue stays full past AUDIT_ENQUEUE_TIMEOUT
+    the chunk is dead-lettered rather than slowing the stream.
+    """
+
+    def __init__(self, user_id: Optional[int] = None, narrate_below: Optional[float] = None):
+        self.user_id = user_id
+        self.narrate_below = narrate_below
+        self.rows = 0
+        self.errors = 0
+        self.narrated = 0
+        self._llm_slots = asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY)
+
+    async def _narrate(self, index: int, row: CropPredictionInput, fallback: Dict[str, Any]):
+        async with self._llm_slots:
+            try:
+                result = await AIService.predict_crop_ai(
+                    row.model_dump(exclude={'language'}),
+                    language=row.language,
+                    location=row.location,
+                    latitude=row.latitude,
+                    longitude=row.longitude
+                )
+            except Exception as e:
+                logger.warning("Batch narrative error for row %d: %s", index, e)
+                result = fallback
+        return index, row, result
+
+    async def _persist(self, predictions: List[Tuple[CropPredictionInput, Dict[str, Any]]]):
+        if self.user_id is None or not predictions:
+            return
+        await record(prediction_writer, [
+            prediction_row(self.user_id, "crop", row.model_dump(), result, model_used="Unknown")
+            for row, result in predictions
+        ])
+
+    async def _process_chunk(self, chunk: List[Tuple[int, Any]]) -> AsyncIterator[str]:
+        valid: List[Tuple[int, CropPredictionInput]] = []
+        for index, raw in chunk:
+            if isinstance(raw, Exception):
+                self.errors += 1
+                yield _ndjson({"index": index, "error": str(raw)})
+                continue
+            try:
+                valid.append((index, CropPredictionInput.model_validate(raw)))
+            except ValidationError as e:
+                self.errors += 1
+                yield _ndjson({"index": index, "error": e.errors(include_url=False)})
+
+        if not valid:
+            return
+
+        scored = await asyncio.to_thread(
+            get_crop_engine().predict_batch,
+            [row.model_dump(exclude={'language'}) for _, row in valid]
+        )
+
+        completed: List[Tuple[CropPredictionInput, Dict[str, Any]]] = []
+        pending = []
+        try:
+            for (index, row), result in zip(valid, scored):
+                if self.narrate_below is not None and result["confidence"] < self.narrate_below:
+                    pending.append(asyncio.ensure_future(self._narrate(index, row, result)))
+                    continue
+                completed.append((row, result))
+                yield _ndjson(_output_row(index, result))
+
+            for future in asyncio.as_completed(pending):
+                index, row, result = await future
+                self.narrated += 1
+                completed.append((row, result))
+                yield _ndjson(_output_row(index, result))
+        finally:
+            # The client went away (the generator was closed at a yield): free the LLM slots
+            for future in pending:
+                future.cancel()
+
+        self.rows += len(valid)
+        await self._persist(completed)
+
+    async def stream(self, rows: AsyncIterator[Tuple[int, Any]]) -> AsyncIterator[str]:
+        """Consume parsed rows and yield NDJSON result lines, ending with a summary"""
+
+        try:
+            chunk: List[Tuple[int, Any]] = []
+            truncated = False
+            async for index, raw in rows:
+                if index >= settings.BATCH_MAX_ROWS:
+                    truncated = True
+                    break
+                chunk.append((index, raw))
+                if len(chunk) >= settings.BATCH_CHUNK_SIZE:
+                    async with aclosing(self._process_chunk(chunk)) as lines:
+                        async for line in lines:
+                            yield line
+                    chunk = []
+            if chunk:
+                async with aclosing(self._process_chunk(chunk)) as lines:
+                    async for line in lines:
+                        yield line
+
+            summary = {"rows": self.rows, "errors": self.errors, "narrated": self.narrated}
+            if truncated:
+                summary["truncated_at"] = settings.BATCH_MAX_ROWS
+            yield _ndjson({"summary": summary})
+        except Exception as e:
+            logger.error("Batch prediction error: %s", e, exc_info=True)
+            yield _ndjson({"error": f"Batch prediction error: {str(e)}"})
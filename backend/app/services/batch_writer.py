@@ -0,0 +1,200 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import deque
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a writer cannot accept more rows within the enqueue timeout"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+class BatchWriter:
+    """
+    In-memory write-behind buffer that flushes rows to a table in bulk
+
+    Callers enqueue plain row dicts and return immediately. A background
+    task flushes whenever batch_size rows are waiting or flush_interval
+    seconds have passed, using one executemany INSERT per batch inside a
+    single transaction. The buffer is bounded: enqueue waits for space
+    and raises QueueFull if none frees up in time.
+
+    A failed batch is retried max_retries times with exponential backoff.
+    After that it is appended to dead_letter_path as JSON lines, if set,
+    or dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        max_retries: int = 0,
+        retry_backoff: float = 0.5,
+        dead_letter_path: Optional[str] = None
+    ):
+        self.name = name
+        self.table = table
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self._buffer: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def start(self):
+        """Start the background flusher; call from the running event loop"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._space = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    def offer(self, rows: List[Dict[str, Any]]) -> bool:
+        """Enqueue rows if they fit, without waiting"""
+        if len(self._buffer) + len(rows) > self.max_queue:
+            self.rejected += len(rows)
+            return False
+        self._buffer.extend(rows)
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def put(self, rows: List[Dict[str, Any]], timeout: float):
+        """Enqueue rows, waiting up to timeout for the flusher to free space"""
+        if len(rows) > self.max_queue:
+            self.rejected += len(rows)
+            raise QueueFull(f"{self.name}: batch of {len(rows)} exceeds queue capacity")
+
+        deadline = time.monotonic() + timeout
+        while len(self._buffer) + len(rows) > self.max_queue:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._space is None:
+                self.rejected += len(rows)
+                raise QueueFull(f"{self.name}: write queue is full")
+            self._space.clear()
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        self.offer(rows)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything currently buffered"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._space.set()
+                started = time.perf_counter()
+                await self._flush_batch(batch)
+                self.flushes += 1
+                self.last_flush_seconds = time.perf_counter() - started
+
+    async def _flush_batch(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write, batch)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)[:200]}"
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    logger.warning("%s flush error, retrying (%d/%d): %s", self.name, attempt + 1, self.max_retries, error)
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+        self.failed += len(batch)
+        if self.dead_letter_path:
+            await asyncio.to_thread(self.dead_letter, batch, error)
+        else:
+            logger.error("%s flush error (%d rows dropped): %s", self.name, len(batch), error)
+
+    def dead_letter(self, rows: List[Dict[str, Any]], error: str):
+        """Append rows that could not be written to the dead-letter file as JSON lines"""
+        failed_at = datetime.utcnow().isoformat()
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({
+                        "writer": self.name,
+                        "table": self.table.name,
+                        "failed_at": failed_at,
+                        "error": error,
+                        "row": row,
+                    }, ensure_ascii=False, default=_json_default) + "\n")
+            self.dead_lettered += len(rows)
+            logger.error("%s: %d rows dead-lettered to %s: %s", self.name, len(rows), self.dead_letter_path, error)
+        except OSError as e:
+            logger.error("%s dead-letter error (%d rows dropped): %s", self.name, len(rows), e)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        with engine.begin() as conn:
+            self.write(conn, batch)
+
+    def write(self, conn, batch: List[Dict[str, Any]]):
+        """Persist one batch inside an open transaction"""
+        conn.execute(insert(self.table), batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._buffer),
+            "capacity": self.max_queue,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+    async def aclose(self):
+        """Stop the flusher and drain the buffer"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self.flush()
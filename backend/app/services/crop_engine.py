@@ -0,0 +1,211 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+# Crop database: suitable [min, max] range per parameter
+CROP_DATABASE = {
+    "rice": {"N": [80, 100], "P": [40, 50], "K": [40, 50], "temp": [20, 30], "humidity": [80, 90], "ph": [5.5, 7.0], "rainfall": [180, 300]},
+    "wheat": {"N": [50, 70], "P": [30, 40], "K": [30, 40], "temp": [15, 25], "humidity": [50, 70], "ph": [6.0, 7.5], "rainfall": [50, 100]},
+    "maize": {"N": [60, 80], "P": [35, 45], "K": [35, 45], "temp": [18, 27], "humidity": [60, 80], "ph": [5.5, 7.0], "rainfall": [60, 110]},
+    "cotton": {"N": [100, 120], "P": [50, 60], "K": [50, 60], "temp": [21, 30], "humidity": [50, 80], "ph": [6.0, 7.5], "rainfall": [60, 100]},
+    "sugarcane": {"N": [120, 150], "P": [60, 80], "K": [80, 100], "temp": [25, 35], "humidity": [70, 90], "ph": [6.0, 7.5], "rainfall": [150, 250]},
+    "potato": {"N": [70, 90], "P": [50, 60], "K": [80, 100], "temp": [15, 25], "humidity": [60, 80], "ph": [5.0, 6.5], "rainfall": [50, 100]},
+    "tomato": {"N": [80, 100], "P": [50, 70], "K": [80, 100], "temp": [20, 30], "humidity": [60, 80], "ph": [6.0, 7.0], "rainfall": [60, 120]},
+}
+
+# Column order of the range matrix, with the matching CropPredictionInput field
+PARAMETERS = ("N", "P", "K", "temp", "humidity", "ph", "rainfall")
+INPUT_FIELDS = ("nitrogen", "phosphorus", "potassium", "temperature", "humidity", "ph", "rainfall")
+
+# CropData column prefix for each parameter
+CROP_DATA_COLUMNS = ("nitrogen", "phosphorus", "potassium", "temperature", "humidity", "ph", "rainfall")
+
+PARAMETER_LABELS = {
+    "N": "nitrogen",
+    "P": "phosphorus",
+    "K": "potassium",
+    "temp": "temperature",
+    "humidity": "humidity",
+    "ph": "soil pH",
+    "rainfall": "rainfall",
+}
+
+DEFAULT_WEIGHTS = {"N": 1.0, "P": 1.0, "K": 1.0, "temp": 1.0, "humidity": 1.0, "ph": 1.0, "rainfall": 0.75}
+
+# Smallest distance (in parameter units) over which a score decays, so
+# narrow ranges such as pH still give partial credit just outside them
+MIN_TOLERANCE = {"N": 10.0, "P": 10.0, "K": 10.0, "temp": 3.0, "humidity": 10.0, "ph": 0.5, "rainfall": 40.0}
+
+# Rows scored per vectorised pass; keeps the N x M x P temporaries bounded
+CHUNK_SIZE = 4096
+
+
+class CropScoringEngine:
+    """
+    Vectorised rule-based crop scoring
+
+    Crop ranges are held in contiguous (M, P) min/max matrices. A batch of N
+    inputs is scored against every crop at once: inside a range scores 1,
+    outside decays with a Gaussian of the distance to the nearest bound.
+    Missing bounds (e.g. a CropData row with no rainfall range) carry zero
+    weight for that crop.
+    """
+
+    def __init__(
+        self,
+        crop_names: Sequence[str],
+        mins: np.ndarray,
+        maxs: np.ndarray,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        self.crop_names = list(crop_names)
+        mins = np.asarray(mins, dtype=np.float64)
+        maxs = np.asarray(maxs, dtype=np.float64)
+
+        known = ~(np.isnan(mins) | np.isnan(maxs))
+        self.mins = np.ascontiguousarray(np.where(known, mins, 0.0))
+        self.maxs = np.ascontiguousarray(np.where(known, maxs, 0.0))
+
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = np.where(known, np.array([weights[p] for p in PARAMETERS]), 0.0)
+        self._weight_totals = self.weights.sum(axis=1)
+        self._weight_totals[self._weight_totals == 0] = 1.0
+
+        min_tolerance = np.array([MIN_TOLERANCE[p] for p in PARAMETERS])
+        self.tolerance = np.maximum((self.maxs - self.mins) * 0.5, min_tolerance)
+
+        self._index = {name: i for i, name in enumerate(self.crop_names)}
+
+    @classmethod
+    def from_database(cls, crop_db: Dict[str, Dict[str, List[float]]], weights: Optional[Dict[str, float]] = None) -> "CropScoringEngine":
+        """Build the matrices from a CROP_DATABASE-style dict"""
+        names = list(crop_db.keys())
+        mins = np.full((len(names), len(PARAMETERS)), np.nan)
+        maxs = np.full((len(names), len(PARAMETERS)), np.nan)
+        for i, name in enumerate(names):
+            for j, param in enumerate(PARAMETERS):
+                bounds = crop_db[name].get(param)
+                if bounds:
+                    mins[i, j], maxs[i, j] = bounds
+        return cls(names, mins, maxs, weights)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], weights: Optional[Dict[str, float]] = None) -> "CropScoringEngine":
+        """Build the matrices from CropData rows"""
+        rows = list(rows)
+        names = [row.crop_name.lower() for row in rows]
+
+        def column(row, attr):
+            value = getattr(row, attr)
+            return np.nan if value is None else value
+
+        mins = np.array([[column(row, f"{col}_min") for col in CROP_DATA_COLUMNS] for row in rows], dtype=np.float64)
+        maxs = np.array([[column(row, f"{col}_max") for col in CROP_DATA_COLUMNS] for row in rows], dtype=np.float64)
+        return cls(names, mins.reshape(len(names), len(PARAMETERS)), maxs.reshape(len(names), len(PARAMETERS)), weights)
+
+    def __len__(self) -> int:
+        return len(self.crop_names)
+
+    def __contains__(self, crop_name: str) -> bool:
+        return crop_name in self._index
+
+    def crop_ranges(self, crop_name: str) -> Dict[str, Optional[List[float]]]:
+        """Suitable range per parameter for one crop"""
+        i = self._index[crop_name]
+        return {
+            param: [float(self.mins[i, j]), float(self.maxs[i, j])] if self.weights[i, j] > 0 else None
+            for j, param in enumerate(PARAMETERS)
+        }
+
+    @staticmethod
+    def to_matrix(inputs: Sequence[Dict[str, float]]) -> np.ndarray:
+        """Stack input dicts into an (N, P) matrix in PARAMETERS order"""
+        return np.array(
+            [[row.get(field, np.nan) for field in INPUT_FIELDS] for row in inputs],
+            dtype=np.float64
+        ).reshape(len(inputs), len(PARAMETERS))
+
+    def parameter_scores(self, X: np.ndarray) -> np.ndarray:
+        """Per-parameter soft scores, shape (N, M, P)"""
+        X = np.asarray(X, dtype=np.float64)[:, None, :]
+        distance = np.maximum(self.mins - X, 0.0) + np.maximum(X - self.maxs, 0.0)
+        scores = np.exp(-0.5 * np.square(distance / self.tolerance))
+        # A missing input value neither helps nor hurts
+        return np.where(np.isnan(scores), 1.0, scores)
+
+    def score_batch(self, X: np.ndarray) -> np.ndarray:
+        """Weighted suitability of every crop for every input row, shape (N, M)"""
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty((X.shape[0], len(self.crop_names)))
+        for start in range(0, X.shape[0], CHUNK_SIZE):
+            chunk = X[start:start + CHUNK_SIZE]
+            weighted = np.einsum("nmp,mp->nm", self.parameter_scores(chunk), self.weights)
+            out[start:start + CHUNK_SIZE] = weighted / self._weight_totals
+        return out
+
+    def top_k(self, X: np.ndarray, k: int = 4):
+        """Indices and scores of the k best crops per row, best first"""
+        scores = self.score_batch(X)
+        k = min(k, scores.shape[1])
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        indices = np.take_along_axis(candidates, order, axis=1)
+        return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+    def predict_batch(self, inputs: Sequence[Dict[str, float]], k: int = 4) -> List[Dict[str, Any]]:
+        """Rule-based predictions for many inputs in one pass"""
+        if not inputs:
+            return []
+
+        X = self.to_matrix(inputs)
+        indices, scores = self.top_k(X, k)
+        best = indices[:, 0]
+        best_params = self.parameter_scores(X)[np.arange(len(inputs)), best]
+
+        results = []
+        for row, (crop_idx, crop_scores) in enumerate(zip(indices, scores)):
+            limiting = [
+                PARAMETER_LABELS[param]
+                for j, param in enumerate(PARAMETERS)
+                if self.weights[best[row], j] > 0 and best_params[row, j] < 0.5
+            ]
+            reasoning = "Best match based on NPK values and climate conditions"
+            if limiting:
+                reasoning += f"; outside the ideal range for {', '.join(limiting)}"
+
+            results.append({
+                "recommended_crop": self.crop_names[crop_idx[0]],
+                "confidence": round(float(crop_scores[0]), 2),
+                "reasoning": reasoning,
+                "alternatives": [
+                    {"crop": self.crop_names[i], "confidence": round(float(score), 2)}
+                    for i, score in zip(crop_idx[1:], crop_scores[1:])
+                ],
+                "model_used": "Rule-based (Local)"
+            })
+        return results
+
+    def predict(self, input_data: Dict[str, float]) -> Dict[str, Any]:
+        return self.predict_batch([input_data])[0]
+
+
+_engine = CropScoringEngine.from_database(CROP_DATABASE)
+
+
+def get_crop_engine() -> CropScoringEngine:
+    """The engine currently used for offline predictions"""
+    return _engine
+
+
+def load_crop_engine_from_db(db) -> CropScoringEngine:
+    """Rebuild the engine from the CropData table, keeping the built-in table if it is empty"""
+    global _engine
+    from app.models.models import CropData
+
+    rows = db.query(CropData).all()
+    if rows:
+        _engine = CropScoringEngine.from_rows(rows)
+    return _engine
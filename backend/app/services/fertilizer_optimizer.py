@@ -0,0 +1,121 @@
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+NUTRIENTS = ("N", "P", "K")
+
+# Plots solved per pass; bounds the (bases, 3, plots) working array
+SOLVE_CHUNK_SIZE = 4096
+
+
+class BlendOptimizer:
+    """
+    Cheapest fertilizer blend that covers an N/P/K deficiency
+
+    Solves, per plot,
+
+        minimise    price @ x
+        subject to  content @ x >= (1 - tolerance) * deficiency,  x >= 0
+
+    where x is kg/acre of each product and content holds the nutrient
+    fraction of each product. With only three constraints an optimal
+    solution sits on a vertex whose basis is three columns of
+    [content | -I] (products plus surplus), so every basis is inverted once
+    up front and a batch of plots is solved with a few array operations:
+    each plot takes the cheapest basis whose solution is non-negative.
+    """
+
+    def __init__(self, products: Dict[str, Dict[str, Any]], tolerance: float = 0.0):
+        self.names = list(products)
+        self.tolerance = tolerance
+        self.content = np.array([[products[name][n] / 100.0 for name in self.names] for n in NUTRIENTS])
+        self.prices = np.array([products[name].get("price_per_kg", 0.0) for name in self.names])
+
+        columns = np.hstack([self.content, -np.eye(len(NUTRIENTS))])
+        bases, inverses = [], []
+        for basis in combinations(range(columns.shape[1]), len(NUTRIENTS)):
+            matrix = columns[:, basis]
+            if abs(np.linalg.det(matrix)) < 1e-9:
+                continue
+            bases.append(basis)
+            inverses.append(np.linalg.inv(matrix))
+        self.bases = np.array(bases)
+        self.inverses = np.array(inverses)
+
+    def _price_vector(self, prices: Optional[Dict[str, float]]) -> np.ndarray:
+        if not prices:
+            return self.prices
+        unknown = set(prices) - set(self.names)
+        if unknown:
+            raise ValueError(f"Unknown fertilizers in price list: {', '.join(sorted(unknown))}")
+        return np.array([prices.get(name, price) for name, price in zip(self.names, self.prices)])
+
+    def solve(
+        self,
+        deficiencies: np.ndarray,
+        prices: Optional[Dict[str, float]] = None,
+        tolerance: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Optimal blends for an (m, 3) array of N/P/K deficiencies in kg/acre
+
+        Returns (quantities, costs): kg/acre of each product, shape
+        (m, products), and the blend cost per plot, shape (m,). prices
+        overrides the per-kg price of any product by name.
+        """
+
+        tolerance = self.tolerance if tolerance is None else tolerance
+        targets = np.clip(np.asarray(deficiencies, dtype=float).reshape(-1, len(NUTRIENTS)), 0, None) * (1 - tolerance)
+        price_vector = np.concatenate([self._price_vector(prices), np.zeros(len(NUTRIENTS))])
+
+        quantities = np.zeros((targets.shape[0], len(self.names)))
+        for start in range(0, targets.shape[0], SOLVE_CHUNK_SIZE):
+            quantities[start:start + SOLVE_CHUNK_SIZE] = self._solve_chunk(
+                targets[start:start + SOLVE_CHUNK_SIZE], price_vector
+            )
+        return quantities, quantities @ price_vector[:len(self.names)]
+
+    def _solve_chunk(self, targets: np.ndarray, price_vector: np.ndarray) -> np.ndarray:
+        # (bases, 3, m): basic variable values of every basis for every plot
+        values = np.einsum("bij,mj->bim", self.inverses, targets)
+        feasible = (values >= -1e-9).all(axis=1)
+        costs = np.einsum("bi,bim->bm", price_vector[self.bases], values)
+        costs = np.where(feasible, costs, np.inf)
+        best = costs.argmin(axis=0)
+
+        plots = np.arange(targets.shape[0])
+        quantities = np.zeros((targets.shape[0], len(self.names) + len(NUTRIENTS)))
+        np.put_along_axis(quantities, self.bases[best], np.clip(values[best, :, plots], 0, None), axis=1)
+        return quantities[:, :len(self.names)]
+
+    def blend(
+        self,
+        deficiency: Dict[str, float],
+        prices: Optional[Dict[str, float]] = None,
+        tolerance: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Optimal blend for one plot as products, supplied nutrients and cost"""
+
+        quantities, costs = self.solve(
+            np.array([[deficiency.get(n, 0.0) for n in NUTRIENTS]]), prices, tolerance
+        )
+        return self.describe(quantities[0], costs[0], prices)
+
+    def describe(self, quantities: np.ndarray, cost: float, prices: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        price_vector = self._price_vector(prices)
+        products: List[Dict[str, Any]] = [
+            {
+                "fertilizer": self.names[i],
+                "quantity_kg_per_acre": round(float(quantities[i]), 2),
+                "cost": round(float(quantities[i] * price_vector[i]), 2),
+            }
+            for i in np.argsort(-quantities)
+            if quantities[i] >= 0.005
+        ]
+        supplied = self.content @ quantities
+        return {
+            "products": products,
+            "nutrients_supplied": {n: round(float(v), 2) for n, v in zip(NUTRIENTS, supplied)},
+            "total_kg_per_acre": round(float(quantities.sum()), 2),
+            "cost": round(float(cost), 2),
+        }
@@ -1,15 +1,14 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 import json
+import logging
+import numpy as np
 from app.config import settings
+from app.services.llm_gateway import llm_gateway, GROQ_AVAILABLE
+from app.services.response_cache import response_cache, fertilizer_cache_key
+from app.services.advisory_stream import stream_advisory
+from app.services.fertilizer_optimizer import BlendOptimizer, NUTRIENTS
 
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = bool(settings.GROQ_API_KEY)
-    if GROQ_AVAILABLE:
-        groq_client = Groq(api_key=settings.GROQ_API_KEY)
-except ImportError:
-    GROQ_AVAILABLE = False
-    groq_client = None
+logger = logging.getLogger(__name__)
 
 # Language mappings
 LANGUAGE_NAMES = {
@@ -20,16 +19,16 @@ LANGUAGE_NAMES = {
     "ml": "Malayalam (മലയാളം)"
 }
 
-# Fertilizer database
+# Fertilizer database (nutrient %, approximate USD per kg)
 FERTILIZER_DATABASE = {
-    "Urea": {"N": 46, "P": 0, "K": 0, "type": "Nitrogen"},
-    "DAP": {"N": 18, "P": 46, "K": 0, "type": "Phosphorus"},
-    "MOP": {"N": 0, "P": 0, "K": 60, "type": "Potassium"},
-    "NPK 10-26-26": {"N": 10, "P": 26, "K": 26, "type": "Complex"},
-    "NPK 12-32-16": {"N": 12, "P": 32, "K": 16, "type": "Complex"},
-    "NPK 17-17-17": {"N": 17, "P": 17, "K": 17, "type": "Balanced"},
-    "Ammonium Sulphate": {"N": 21, "P": 0, "K": 0, "type": "Nitrogen"},
-    "SSP": {"N": 0, "P": 16, "K": 0, "type": "Phosphorus"},
+    "Urea": {"N": 46, "P": 0, "K": 0, "type": "Nitrogen", "price_per_kg": 0.35},
+    "DAP": {"N": 18, "P": 46, "K": 0, "type": "Phosphorus", "price_per_kg": 0.45},
+    "MOP": {"N": 0, "P": 0, "K": 60, "type": "Potassium", "price_per_kg": 0.40},
+    "NPK 10-26-26": {"N": 10, "P": 26, "K": 26, "type": "Complex", "price_per_kg": 0.48},
+    "NPK 12-32-16": {"N": 12, "P": 32, "K": 16, "type": "Complex", "price_per_kg": 0.47},
+    "NPK 17-17-17": {"N": 17, "P": 17, "K": 17, "type": "Balanced", "price_per_kg": 0.50},
+    "Ammonium Sulphate": {"N": 21, "P": 0, "K": 0, "type": "Nitrogen", "price_per_kg": 0.30},
+    "SSP": {"N": 0, "P": 16, "K": 0, "type": "Phosphorus", "price_per_kg": 0.20},
 }
 
 # Crop nutrient requirements (kg/acre)
@@ -42,6 +41,39 @@ CROP_REQUIREMENTS = {
     "potato": {"N": 60, "P": 40, "K": 50},
     "tomato": {"N": 70, "P": 45, "K": 50},
 }
+DEFAULT_REQUIREMENT = {"N": 60, "P": 30, "K": 30}
+
+# Split-application schedule by crop
+TIMING_SCHEDULES = {
+    "rice": "Basal: 50%, Tillering: 25%, Panicle: 25%",
+    "wheat": "Basal: 60%, Crown root: 40%",
+    "maize": "Basal: 40%, Knee-high: 30%, Tasseling: 30%",
+    "cotton": "Basal: 30%, Square formation: 35%, Flowering: 35%",
+    "sugarcane": "Basal: 50%, 30 days: 25%, 60 days: 25%",
+    "potato": "Basal: 60%, Earthing up: 40%",
+    "tomato": "Basal: 50%, Flowering: 25%, Fruiting: 25%"
+}
+DEFAULT_TIMING = "Basal: 60%, Top dressing: 40%"
+
+BASE_PRECAUTIONS = (
+    "Apply in cool hours (early morning or evening)",
+    "Ensure adequate soil moisture before application",
+    "Avoid direct contact with plant stems",
+    "Store in dry, cool place"
+)
+
+NO_FERTILIZER_NEEDED = {
+    "fertilizer_name": "No Fertilizer Needed",
+    "fertilizer_type": "None",
+    "quantity_kg_per_acre": 0,
+    "application_method": "Soil is already balanced",
+    "timing": "N/A",
+    "frequency": "N/A",
+    "precautions": ["Maintain current nutrient levels"],
+    "cost_estimate": 0
+}
+
+blend_optimizer = BlendOptimizer(FERTILIZER_DATABASE, tolerance=settings.FERTILIZER_BLEND_TOLERANCE)
 
 class FertilizerService:
     """Intelligent Fertilizer Recommendation Engine with AI Support"""
@@ -57,16 +89,60 @@ class FertilizerService:
     ) -> Dict[str, Any]:
         """AI-powered fertilizer recommendation with multilingual support"""
         
-        if GROQ_AVAILABLE:
-            lang_name = LANGUAGE_NAMES.get(language, "English")
-            
-            # Calculate deficiencies for context
-            crop_req = CROP_REQUIREMENTS.get(crop_type.lower(), {"N": 60, "P": 30, "K": 30})
-            n_deficit = max(0, crop_req.get("N", 60) - current_npk['N'])
-            p_deficit = max(0, crop_req.get("P", 30) - current_npk['P'])
-            k_deficit = max(0, crop_req.get("K", 30) - current_npk['K'])
-            
-            prompt = f"""You are an expert agricultural scientist. Analyze this SPECIFIC farm data and provide a CUSTOMIZED fertilizer recommendation.
+        cache_key = fertilizer_cache_key(crop_type, soil_type, current_npk, soil_ph, moisture, language)
+        return await response_cache.get_or_compute(
+            cache_key,
+            lambda: FertilizerService._recommend_fertilizer_uncached(
+                crop_type, soil_type, current_npk, soil_ph, moisture, language
+            )
+        )
+    
+    @staticmethod
+    def stream_fertilizer_recommendation(
+        crop_type: str,
+        soil_type: str,
+        current_npk: Dict[str, float],
+        soil_ph: float,
+        moisture: float,
+        language: str = "en"
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """recommend_fertilizer_ai as ("field", ...) events ending with ("result", recommendation)"""
+        
+        return stream_advisory(
+            fertilizer_cache_key(crop_type, soil_type, current_npk, soil_ph, moisture, language),
+            lambda: FertilizerService._fertilizer_groq_request(
+                crop_type, soil_type, current_npk, soil_ph, moisture, language
+            ),
+            model_used="Groq Llama-3.3-70B",
+            language=language,
+            fallback=lambda e: FertilizerService.recommend_fertilizer(
+                crop_type, soil_type, current_npk, soil_ph, moisture
+            ),
+            compute=lambda: FertilizerService._recommend_fertilizer_uncached(
+                crop_type, soil_type, current_npk, soil_ph, moisture, language
+            )
+        )
+    
+    @staticmethod
+    def _fertilizer_groq_request(
+        crop_type: str,
+        soil_type: str,
+        current_npk: Dict[str, float],
+        soil_ph: float,
+        moisture: float,
+        language: str = "en"
+    ) -> Dict[str, Any]:
+        """Chat request for a Groq recommendation, shared by the buffered and streaming paths"""
+        
+        lang_name = LANGUAGE_NAMES.get(language, "English")
+        
+        # Calculate deficiencies for context
+        crop_req = CROP_REQUIREMENTS.get(crop_type.lower(), {"N": 60, "P": 30, "K": 30})
+        n_deficit = max(0, crop_req.get("N", 60) - current_npk['N'])
+        p_deficit = max(0, crop_req.get("P", 30) - current_npk['P'])
+        k_deficit = max(0, crop_req.get("K", 30) - current_npk['K'])
+        
+        prompt = f"""You are an expert agricultural scientist. Analyze this SPECIFIC farm data and provide a CUSTOMIZED fertilizer recommendation.
 
 IMPORTANT: Base your recommendation ONLY on these EXACT values:
 
@@ -100,32 +176,51 @@ Respond ONLY with valid JSON:
   "soil_health_tips": "soil advice in {lang_name}",
   "expected_benefits": "benefits for {crop_type} in {lang_name}"
 }}"""
-            
+        
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are an expert agricultural scientist. Analyze the SPECIFIC nutrient values provided and give CUSTOMIZED recommendations. Never give generic advice. Always base your response on the actual N, P, K values and deficiencies. Respond in {lang_name} with valid JSON only."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "model": "llama-3.3-70b-versatile",
+            "temperature": 0.3,
+            "max_tokens": 2000,
+            "response_format": {"type": "json_object"}
+        }
+    
+    @staticmethod
+    async def _recommend_fertilizer_uncached(
+        crop_type: str,
+        soil_type: str,
+        current_npk: Dict[str, float],
+        soil_ph: float,
+        moisture: float,
+        language: str = "en"
+    ) -> Dict[str, Any]:
+        """Ask the LLM for a recommendation, falling back to the local rules"""
+        
+        if GROQ_AVAILABLE:
             try:
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are an expert agricultural scientist. Analyze the SPECIFIC nutrient values provided and give CUSTOMIZED recommendations. Never give generic advice. Always base your response on the actual N, P, K values and deficiencies. Respond in {lang_name} with valid JSON only."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.3,
-                    max_tokens=2000,
-                    response_format={"type": "json_object"}
+                content = await llm_gateway.chat_completion(
+                    "groq",
+                    **FertilizerService._fertilizer_groq_request(
+                        crop_type, soil_type, current_npk, soil_ph, moisture, language
+                    )
                 )
                 
-                result = json.loads(chat_completion.choices[0].message.content)
+                result = json.loads(content)
                 result["model_used"] = "Groq Llama-3.3-70B"
                 result["language"] = language
                 return result
                 
             except Exception as e:
-                print(f"Groq fertilizer recommendation error: {e}")
+                logger.warning("Groq fertilizer recommendation failed: %s", e)
                 # Fallback to rule-based
                 return FertilizerService.recommend_fertilizer(
                     crop_type, soil_type, current_npk, soil_ph, moisture
@@ -149,6 +244,39 @@ Respond ONLY with valid JSON:
             "K": max(0, required["K"] - current["K"])
         }
     
+    @staticmethod
+    def application_method(soil_type: str, moisture: float) -> str:
+        if moisture < 40:
+            return "Apply with irrigation water (fertigation) due to low moisture"
+        if soil_type.lower() == "sandy":
+            return "Split application recommended for sandy soil"
+        return "Broadcast and incorporate into soil, followed by irrigation"
+    
+    @staticmethod
+    def precautions(soil_ph: float) -> List[str]:
+        """General precautions, led by a pH correction when the soil needs one"""
+        
+        precautions = list(BASE_PRECAUTIONS)
+        if soil_ph < 5.5:
+            precautions.insert(0, "Apply lime to increase pH before fertilizer application")
+        elif soil_ph > 7.5:
+            precautions.insert(0, "Apply sulfur to decrease pH for better nutrient absorption")
+        return precautions
+    
+    @staticmethod
+    def blend_fields(blend: Dict[str, Any]) -> Dict[str, Any]:
+        """Response fields describing an optimised blend"""
+        
+        products = blend["products"]
+        return {
+            "fertilizer_name": " + ".join(product["fertilizer"] for product in products),
+            "fertilizer_type": FERTILIZER_DATABASE[products[0]["fertilizer"]]["type"] if len(products) == 1 else "Blend",
+            "quantity_kg_per_acre": blend["total_kg_per_acre"],
+            "cost_estimate": blend["cost"],
+            "blend": products,
+            "nutrients_supplied": blend["nutrients_supplied"]
+        }
+    
     @staticmethod
     def recommend_fertilizer(
         crop_type: str,
@@ -156,137 +284,86 @@ Respond ONLY with valid JSON:
         current_npk: Dict[str, float],
         soil_ph: float,
         moisture: float
+    ) -> Dict[str, Any]:
+        """Offline recommendation: a precompiled table lookup, computed directly on a miss"""
+        
+        from app.services.fertilizer_table import fertilizer_table
+        
+        result = fertilizer_table.lookup(crop_type, soil_type, current_npk, soil_ph, moisture)
+        if result is not None:
+            return result
+        return FertilizerService.compute_recommendation(crop_type, soil_type, current_npk, soil_ph, moisture)
+    
+    @staticmethod
+    def compute_recommendation(
+        crop_type: str,
+        soil_type: str,
+        current_npk: Dict[str, float],
+        soil_ph: float,
+        moisture: float
     ) -> Dict[str, Any]:
         """Generate intelligent fertilizer recommendation"""
         
         # Get crop requirements
-        crop_req = CROP_REQUIREMENTS.get(crop_type.lower(), {"N": 60, "P": 30, "K": 30})
+        crop_req = CROP_REQUIREMENTS.get(crop_type.lower(), DEFAULT_REQUIREMENT)
         
         # Calculate deficiency
         deficiency = FertilizerService.calculate_deficiency(current_npk, crop_req)
         
-        # Determine primary need
-        max_def = max(deficiency.values())
-        
-        if max_def == 0:
-            return {
-                "fertilizer_name": "No Fertilizer Needed",
-                "fertilizer_type": "None",
-                "quantity_kg_per_acre": 0,
-                "application_method": "Soil is already balanced",
-                "timing": "N/A",
-                "frequency": "N/A",
-                "precautions": ["Maintain current nutrient levels"],
-                "cost_estimate": 0
-            }
-        
-        # Select best fertilizer
-        recommendations = []
-        
-        # Rule-based selection
-        if deficiency["N"] > 30:
-            recommendations.append({
-                "fertilizer": "Urea",
-                "quantity": round(deficiency["N"] / FERTILIZER_DATABASE["Urea"]["N"] * 100, 2),
-                "priority": 1
-            })
-        
-        if deficiency["P"] > 20:
-            recommendations.append({
-                "fertilizer": "DAP",
-                "quantity": round(deficiency["P"] / FERTILIZER_DATABASE["DAP"]["P"] * 100, 2),
-                "priority": 2
-            })
-        
-        if deficiency["K"] > 20:
-            recommendations.append({
-                "fertilizer": "MOP",
-                "quantity": round(deficiency["K"] / FERTILIZER_DATABASE["MOP"]["K"] * 100, 2),
-                "priority": 3
-            })
-        
-        # If balanced deficiency, use NPK complex
-        if all(d > 10 for d in deficiency.values()):
-            avg_def = sum(deficiency.values()) / 3
-            recommendations = [{
-                "fertilizer": "NPK 17-17-17",
-                "quantity": round(avg_def * 1.5, 2),
-                "priority": 1
-            }]
-        
-        # Select top recommendation
-        if not recommendations:
-            recommendations = [{
-                "fertilizer": "NPK 17-17-17",
-                "quantity": 50,
-                "priority": 1
-            }]
-        
-        top_rec = recommendations[0]
-        
-        # Adjust for soil pH
-        ph_adjustment = ""
-        if soil_ph < 5.5:
-            ph_adjustment = "Apply lime to increase pH before fertilizer application"
-        elif soil_ph > 7.5:
-            ph_adjustment = "Apply sulfur to decrease pH for better nutrient absorption"
+        # Cheapest blend of the products in FERTILIZER_DATABASE covering the deficiency
+        blend = blend_optimizer.blend(deficiency)
+        if not blend["products"]:
+            return dict(NO_FERTILIZER_NEEDED)
         
-        # Timing based on crop
-        timing_map = {
-            "rice": "Basal: 50%, Tillering: 25%, Panicle: 25%",
-            "wheat": "Basal: 60%, Crown root: 40%",
-            "maize": "Basal: 40%, Knee-high: 30%, Tasseling: 30%",
-            "cotton": "Basal: 30%, Square formation: 35%, Flowering: 35%",
-            "sugarcane": "Basal: 50%, 30 days: 25%, 60 days: 25%",
-            "potato": "Basal: 60%, Earthing up: 40%",
-            "tomato": "Basal: 50%, Flowering: 25%, Fruiting: 25%"
+        return {
+            **FertilizerService.blend_fields(blend),
+            "application_method": FertilizerService.application_method(soil_type, moisture),
+            "timing": TIMING_SCHEDULES.get(crop_type.lower(), DEFAULT_TIMING),
+            "frequency": "Split application as per timing",
+            "precautions": FertilizerService.precautions(soil_ph),
+            "deficiency_analysis": deficiency
         }
+    
+    @staticmethod
+    def plan_blends(
+        plots: List[Dict[str, Any]],
+        prices: Optional[Dict[str, float]] = None,
+        tolerance: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Cheapest blends for many plots at once, plus the total to procure
         
-        timing = timing_map.get(crop_type.lower(), "Basal: 60%, Top dressing: 40%")
-        
-        # Application method
-        if moisture < 40:
-            method = "Apply with irrigation water (fertigation) due to low moisture"
-        elif soil_type.lower() == "sandy":
-            method = "Split application recommended for sandy soil"
-        else:
-            method = "Broadcast and incorporate into soil, followed by irrigation"
-        
-        # Precautions
-        precautions = [
-            "Apply in cool hours (early morning or evening)",
-            "Ensure adequate soil moisture before application",
-            "Avoid direct contact with plant stems",
-            "Store in dry, cool place"
-        ]
+        Each plot has crop_type and current nitrogen/phosphorus/potassium.
+        prices overrides per-kg product prices (e.g. a cooperative's quotes).
+        """
         
-        if ph_adjustment:
-            precautions.insert(0, ph_adjustment)
+        requirements = np.array([
+            [CROP_REQUIREMENTS.get(plot["crop_type"].lower(), DEFAULT_REQUIREMENT)[n] for n in NUTRIENTS]
+            for plot in plots
+        ], dtype=float)
+        current = np.array([[plot["nitrogen"], plot["phosphorus"], plot["potassium"]] for plot in plots], dtype=float)
+        deficiencies = np.clip(requirements - current, 0, None)
         
-        # Cost estimate (approximate USD per acre)
-        cost_per_kg = {"Urea": 0.35, "DAP": 0.45, "MOP": 0.40, "NPK 17-17-17": 0.50}
-        cost = round(
-            top_rec["quantity"] * cost_per_kg.get(top_rec["fertilizer"], 0.40),
-            2
-        )
+        quantities, costs = blend_optimizer.solve(deficiencies, prices, tolerance)
+        totals = quantities.sum(axis=0)
         
         return {
-            "fertilizer_name": top_rec["fertilizer"],
-            "fertilizer_type": FERTILIZER_DATABASE[top_rec["fertilizer"]]["type"],
-            "quantity_kg_per_acre": top_rec["quantity"],
-            "application_method": method,
-            "timing": timing,
-            "frequency": "Split application as per timing",
-            "precautions": precautions,
-            "cost_estimate": cost,
-            "deficiency_analysis": deficiency,
-            "additional_recommendations": [
+            "plots": [
                 {
-                    "fertilizer": rec["fertilizer"],
-                    "quantity": rec["quantity"]
+                    "plot_id": plot.get("plot_id"),
+                    "crop_type": plot["crop_type"],
+                    "deficiency": {n: round(float(v), 2) for n, v in zip(NUTRIENTS, deficiency)},
+                    **blend_optimizer.describe(plot_quantities, cost, prices)
                 }
-                for rec in recommendations[1:3]
-            ] if len(recommendations) > 1 else []
+                for plot, deficiency, plot_quantities, cost in zip(plots, deficiencies, quantities, costs)
+            ],
+            "procurement": {
+                name: round(float(total), 2)
+                for name, total in zip(blend_optimizer.names, totals)
+                if total >= 0.005
+            },
+            "total_kg": round(float(totals.sum()), 2),
+            "total_cost": round(float(costs.sum()), 2)
         }
 
 fertilizer_service = FertilizerService()
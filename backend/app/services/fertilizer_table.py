@@ -0,0 +1,192 @@
+import copy
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import pickle
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.services.fertilizer_optimizer import NUTRIENTS
+from app.services.fertilizer_service import (
+    FertilizerService,
+    FERTILIZER_DATABASE,
+    CROP_REQUIREMENTS,
+    DEFAULT_REQUIREMENT,
+    TIMING_SCHEDULES,
+    DEFAULT_TIMING,
+    NO_FERTILIZER_NEEDED,
+    blend_optimizer
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CROP = "*"
+SOIL_CLASSES = ("sandy", "other")
+PH_BANDS = ("acidic", "neutral", "alkaline")
+MOISTURE_BANDS = ("low", "normal")
+
+# A reading inside each band, fed to the same helpers the computed path uses
+SOIL_SAMPLES = {"sandy": "sandy", "other": "loamy"}
+PH_SAMPLES = {"acidic": 5.0, "neutral": 6.5, "alkaline": 8.0}
+MOISTURE_SAMPLES = {"low": 20.0, "normal": 60.0}
+
+
+def ph_band(soil_ph: float) -> str:
+    if soil_ph < 5.5:
+        return "acidic"
+    if soil_ph > 7.5:
+        return "alkaline"
+    return "neutral"
+
+
+def moisture_band(moisture: float) -> str:
+    return "low" if moisture < 40 else "normal"
+
+
+def soil_class(soil_type: str) -> str:
+    return "sandy" if soil_type.lower() == "sandy" else "other"
+
+
+class FertilizerTable:
+    """
+    Precompiled offline fertilizer recommendations
+
+    Conceptually one immutable table keyed by (crop, soil type, deficiency
+    rounded up to `step` kg/acre per nutrient, pH band, moisture band). It
+    is stored factored, since the blend depends only on the deficiency and
+    the advice text only on the bands: one cell per deficiency (the LP is
+    solved for the whole grid in one batch) and one entry per crop, soil,
+    pH and moisture band. The flattened product would be ~100 MB; this is
+    a few. A lookup is two dict hits and a merge. Rounding the deficiency
+    up means a table blend never supplies less than the computed one.
+    """
+
+    def __init__(self, step: int):
+        self.step = step
+        self.cells: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+        self.bands: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        self.limits: Tuple[int, ...] = (-1, -1, -1)
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self) -> str:
+        """Changes whenever anything a precompiled table depends on changes"""
+        source = json.dumps([
+            self.step, settings.FERTILIZER_BLEND_TOLERANCE, FERTILIZER_DATABASE,
+            CROP_REQUIREMENTS, DEFAULT_REQUIREMENT, TIMING_SCHEDULES, DEFAULT_TIMING
+        ], sort_keys=True)
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def build(self):
+        """Solve every deficiency cell and render every band entry"""
+
+        requirements = list(CROP_REQUIREMENTS.values()) + [DEFAULT_REQUIREMENT]
+        limits = tuple(math.ceil(max(req[n] for req in requirements) / self.step) for n in NUTRIENTS)
+        grid = np.array(list(itertools.product(*(range(limit + 1) for limit in limits))))
+        quantities, costs = blend_optimizer.solve(grid * self.step)
+
+        cells = {}
+        for index, cell_quantities, cost in zip(grid, quantities, costs):
+            blend = blend_optimizer.describe(cell_quantities, cost)
+            if blend["products"]:
+                cell = FertilizerService.blend_fields(blend)
+                cell["blend"] = tuple(cell["blend"])
+            else:
+                cell = dict(NO_FERTILIZER_NEEDED, precautions=tuple(NO_FERTILIZER_NEEDED["precautions"]))
+            cells[tuple(int(i) for i in index)] = cell
+
+        bands = {}
+        for crop, soil, ph, moisture in itertools.product(
+            list(CROP_REQUIREMENTS) + [DEFAULT_CROP], SOIL_CLASSES, PH_BANDS, MOISTURE_BANDS
+        ):
+            bands[(crop, soil, ph, moisture)] = {
+                "application_method": FertilizerService.application_method(SOIL_SAMPLES[soil], MOISTURE_SAMPLES[moisture]),
+                "timing": TIMING_SCHEDULES.get(crop, DEFAULT_TIMING),
+                "frequency": "Split application as per timing",
+                "precautions": tuple(FertilizerService.precautions(PH_SAMPLES[ph])),
+            }
+
+        self.cells, self.bands, self.limits = cells, bands, limits
+
+    def load(self, path: str = "") -> str:
+        """
+        Load the table from path if it was generated for the current inputs,
+        otherwise build it (and write it to path, when one is given)
+        """
+
+        fingerprint = self.fingerprint()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    stored = pickle.load(f)
+                if stored["fingerprint"] == fingerprint:
+                    self.cells, self.bands, self.limits = stored["cells"], stored["bands"], stored["limits"]
+                    return "file"
+            except Exception as e:
+                logger.warning("Fertilizer table file unreadable, rebuilding: %s", e)
+
+        self.build()
+        if path:
+            with open(path, "wb") as f:
+                pickle.dump({
+                    "fingerprint": fingerprint,
+                    "cells": self.cells,
+                    "bands": self.bands,
+                    "limits": self.limits,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return "built"
+
+    def lookup(
+        self,
+        crop_type: str,
+        soil_type: str,
+        current_npk: Dict[str, float],
+        soil_ph: float,
+        moisture: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Precompiled recommendation, or None when the inputs fall outside the table
+
+        The result is a deep copy, so callers may change it without touching
+        the shared table.
+        """
+
+        crop = crop_type.lower()
+        requirement = CROP_REQUIREMENTS.get(crop, DEFAULT_REQUIREMENT)
+        deficiency = FertilizerService.calculate_deficiency(current_npk, requirement)
+        cell = self.cells.get((
+            math.ceil(deficiency["N"] / self.step),
+            math.ceil(deficiency["P"] / self.step),
+            math.ceil(deficiency["K"] / self.step),
+        ))
+        if cell is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if "blend" not in cell:
+            # Nothing to apply, so the band advice does not apply either
+            return copy.deepcopy(cell)
+        band = self.bands[(
+            crop if crop in CROP_REQUIREMENTS else DEFAULT_CROP,
+            soil_class(soil_type),
+            ph_band(soil_ph),
+            moisture_band(moisture),
+        )]
+        return copy.deepcopy({**cell, **band, "deficiency_analysis": deficiency})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cells": len(self.cells),
+            "bands": len(self.bands),
+            "step_kg_per_acre": self.step,
+            "max_deficiency": {n: limit * self.step for n, limit in zip(NUTRIENTS, self.limits)},
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+fertilizer_table = FertilizerTable(settings.FERTILIZER_TABLE_STEP)
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def band_layout(max_distance: int) -> List[Tuple[int, int]]:
+    """
+    (shift, width) of the bands a 64-bit hash is split into for lookup
+
+    With max_distance + 1 bands, two hashes at most max_distance bits apart
+    must agree exactly on at least one band (pigeonhole), so the candidates
+    for a near match are the entries sharing any band value.
+    """
+
+    count = max(1, min(max_distance + 1, HASH_BITS))
+    width = HASH_BITS // count
+    layout = []
+    for index in range(count):
+        shift = index * width
+        layout.append((shift, HASH_BITS - shift if index == count - 1 else width))
+    return layout
+
+
+def band_values(value: int, layout: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    return [(index, (value >> shift) & ((1 << width) - 1)) for index, (shift, width) in enumerate(layout)]
+
+
+def partition_key(crop_type: Optional[str], language: Optional[str]) -> str:
+    """Diagnoses are only shared between uploads for the same crop and language"""
+    return f"{(crop_type or 'general').strip().lower()}:{(language or 'en').strip().lower()}"
+
+
+class ImageDiagnosisCache:
+    """
+    Content-addressed on-disk store of image diagnoses
+
+    Entries are keyed by the SHA-256 of the uploaded bytes (exact repeats)
+    and indexed by the dHash of the preprocessed image (near duplicates, e.g.
+    frames of one burst), both within a crop/language partition. dHashes are
+    split into bands stored in an indexed table, so a near lookup only
+    compares the few entries that share a band. The file is kept under
+    max_bytes of stored results by evicting the least recently used entries.
+    """
+
+    # Refresh the LRU timestamp at most this often per entry to keep reads cheap
+    TOUCH_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str, max_bytes: int, max_distance: int):
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.layout = band_layout(max_distance)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Open the database up front; call on startup"""
+        with self._lock:
+            self._open()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _open(self):
+        """Connect and create the schema on first use; called with the lock held"""
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_diagnoses ("
+            "id INTEGER PRIMARY KEY, partition TEXT NOT NULL, sha256 TEXT NOT NULL, "
+            "dhash TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "UNIQUE (partition, sha256))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_image_diagnoses_accessed_at ON image_diagnoses (accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_diagnosis_bands ("
+            "partition TEXT NOT NULL, band INTEGER NOT NULL, value INTEGER NOT NULL, entry_id INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_image_diagnosis_bands_lookup "
+            "ON image_diagnosis_bands (partition, band, value)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_image_diagnosis_bands_entry ON image_diagnosis_bands (entry_id)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS image_cache_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._rebuild_bands_if_needed()
+        self._conn.commit()
+
+    def _rebuild_bands_if_needed(self):
+        """Re-split stored hashes when IMAGE_CACHE_MAX_DISTANCE (and so the band layout) changed"""
+        layout = json.dumps(self.layout)
+        row = self._conn.execute("SELECT value FROM image_cache_meta WHERE key = 'band_layout'").fetchone()
+        if row is not None and row[0] == layout:
+            return
+        self._conn.execute("DELETE FROM image_diagnosis_bands")
+        for entry_id, partition, hash_hex in self._conn.execute(
+            "SELECT id, partition, dhash FROM image_diagnoses"
+        ).fetchall():
+            self._insert_bands(entry_id, partition, int(hash_hex, 16))
+        self._conn.execute("INSERT OR REPLACE INTO image_cache_meta (key, value) VALUES ('band_layout', ?)", (layout,))
+
+    def _insert_bands(self, entry_id: int, partition: str, hash_value: int):
+        self._conn.executemany(
+            "INSERT INTO image_diagnosis_bands (partition, band, value, entry_id) VALUES (?, ?, ?, ?)",
+            [(partition, band, value, entry_id) for band, value in band_values(hash_value, self.layout)]
+        )
+
+    def _touch(self, entry_id: int, accessed_at: float, now: float):
+        if now - accessed_at > self.TOUCH_INTERVAL_SECONDS:
+            self._conn.execute("UPDATE image_diagnoses SET accessed_at = ? WHERE id = ?", (now, entry_id))
+            self._conn.commit()
+
+    def _get_exact(self, partition: str, sha256: str) -> Optional[str]:
+        with self._lock:
+            self._open()
+            row = self._conn.execute(
+                "SELECT id, value, accessed_at FROM image_diagnoses WHERE partition = ? AND sha256 = ?",
+                (partition, sha256)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(row[0], row[2], time.time())
+            return row[1]
+
+    def _get_similar(self, partition: str, hash_value: int) -> Optional[Tuple[str, int]]:
+        bands = band_values(hash_value, self.layout)
+        with self._lock:
+            self._open()
+            rows = self._conn.execute(
+                "SELECT DISTINCT e.id, e.dhash, e.value, e.accessed_at FROM image_diagnosis_bands b "
+                "JOIN image_diagnoses e ON e.id = b.entry_id "
+                "WHERE b.partition = ? AND (" + " OR ".join(["(b.band = ? AND b.value = ?)"] * len(bands)) + ")",
+                (partition, *[part for band in bands for part in band])
+            ).fetchall()
+            best = None
+            for entry_id, hash_hex, value, accessed_at in rows:
+                distance = hamming(hash_value, int(hash_hex, 16))
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry_id, value, accessed_at)
+            if best is None:
+                return None
+            distance, entry_id, value, accessed_at = best
+            self._touch(entry_id, accessed_at, time.time())
+            return value, distance
+
+    def _set(self, partition: str, sha256: str, hash_value: int, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._open()
+            old = self._conn.execute(
+                "SELECT id FROM image_diagnoses WHERE partition = ? AND sha256 = ?", (partition, sha256)
+            ).fetchone()
+            if old is not None:
+                self._delete([old[0]])
+            cursor = self._conn.execute(
+                "INSERT INTO image_diagnoses (partition, sha256, dhash, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (partition, sha256, f"{hash_value:016x}", value, size, now, now)
+            )
+            self._insert_bands(cursor.lastrowid, partition, hash_value)
+            self._evict()
+            self._conn.commit()
+
+    def _delete(self, entry_ids: List[int]):
+        placeholders = ",".join("?" * len(entry_ids))
+        self._conn.execute(f"DELETE FROM image_diagnosis_bands WHERE entry_id IN ({placeholders})", entry_ids)
+        self._conn.execute(f"DELETE FROM image_diagnoses WHERE id IN ({placeholders})", entry_ids)
+
+    def _evict(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM image_diagnoses").fetchone()
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for entry_id, size in self._conn.execute("SELECT id, size FROM image_diagnoses ORDER BY accessed_at"):
+            victims.append(entry_id)
+            excess -= size
+            if excess <= 0:
+                break
+        self._delete(victims)
+        self.evictions += len(victims)
+
+    async def get(
+        self,
+        sha256: str,
+        crop_type: Optional[str],
+        language: Optional[str],
+        hash_value: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached diagnosis for an upload
+
+        Without hash_value only an exact repeat of the bytes matches; with it,
+        the nearest stored image within max_distance bits also matches. A hit
+        is marked cached, and a near hit carries its Hamming distance.
+        """
+
+        partition = partition_key(crop_type, language)
+        try:
+            if hash_value is None:
+                raw, distance = await asyncio.to_thread(self._get_exact, partition, sha256), 0
+            else:
+                found = await asyncio.to_thread(self._get_similar, partition, hash_value)
+                raw, distance = found if found is not None else (None, None)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Image cache read error: %s", e)
+            return None
+
+        if raw is None:
+            if hash_value is not None:
+                self.misses += 1
+            return None
+
+        result = json.loads(raw)
+        result["cached"] = True
+        if hash_value is None:
+            self.exact_hits += 1
+        else:
+            self.near_hits += 1
+            result["near_duplicate_distance"] = distance
+        return result
+
+    async def set(self, sha256: str, hash_value: int, crop_type: Optional[str], language: Optional[str], result: Dict[str, Any]):
+        try:
+            await asyncio.to_thread(
+                self._set, partition_key(crop_type, language), sha256, hash_value, json.dumps(result, ensure_ascii=False)
+            )
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Image cache write error: %s", e)
+
+    def size(self) -> Tuple[int, int]:
+        with self._lock:
+            if self._conn is None:
+                return 0, 0
+            return self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM image_diagnoses").fetchone()
+
+    def stats(self) -> Dict[str, Any]:
+        entries, stored_bytes = self.size()
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": stored_bytes,
+            "max_bytes": self.max_bytes,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+def _create_cache() -> Optional[ImageDiagnosisCache]:
+    if not settings.IMAGE_CACHE_PATH:
+        return None
+    return ImageDiagnosisCache(
+        settings.IMAGE_CACHE_PATH,
+        settings.IMAGE_CACHE_MAX_BYTES,
+        settings.IMAGE_CACHE_MAX_DISTANCE
+    )
+
+
+image_cache = _create_cache()
@@ -0,0 +1,228 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from app.config import settings
+
+from app.services.provider_registry import provider_registry
+from app.services.metrics import record_llm_call
+
+# Decided without importing the SDKs; see ProviderRegistry
+GROQ_AVAILABLE = provider_registry.available("groq")
+OPENAI_AVAILABLE = provider_registry.available("openai")
+GEMINI_AVAILABLE = provider_registry.available("gemini")
+
+
+class LLMGatewayBusy(Exception):
+    """Raised when a provider's concurrency slots stay full past the queue timeout"""
+
+
+class LLMGateway:
+    """
+    Shared non-blocking gateway for every LLM provider call
+
+    Provider SDKs are imported through provider_registry when a client is
+    first used. Groq and OpenAI go through their native async clients; SDKs
+    without a usable async API (Gemini) are offloaded to a bounded thread
+    pool. Each provider has its own concurrency limit so a slow provider
+    cannot starve the event loop or the other providers. Every call's
+    latency and token usage is recorded in the metrics registry.
+    """
+
+    def __init__(self):
+        self.limits = {
+            "groq": settings.GROQ_MAX_CONCURRENCY,
+            "openai": settings.OPENAI_MAX_CONCURRENCY,
+            "gemini": settings.GEMINI_MAX_CONCURRENCY,
+        }
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {provider: 0 for provider in self.limits}
+        self._waiting: Dict[str, int] = {provider: 0 for provider in self.limits}
+        self._groq_client = None
+        self._openai_client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def groq(self):
+        if self._groq_client is None:
+            self._groq_client = provider_registry.load("groq").AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+                max_retries=settings.LLM_MAX_RETRIES
+            )
+        return self._groq_client
+
+    @property
+    def openai(self):
+        if self._openai_client is None:
+            self._openai_client = provider_registry.load("openai").AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+                max_retries=settings.LLM_MAX_RETRIES
+            )
+        return self._openai_client
+
+    @property
+    def gemini(self):
+        """The configured google.generativeai module (it has no client object)"""
+        return provider_registry.load("gemini")
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.LLM_THREAD_POOL_SIZE,
+                thread_name_prefix="llm-offload"
+            )
+        return self._executor
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(self.limits.get(provider, 8))
+        return self._semaphores[provider]
+
+    async def _acquire(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._semaphore(provider)
+        self._waiting[provider] = self._waiting.get(provider, 0) + 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise LLMGatewayBusy(f"{provider} concurrency limit reached")
+        finally:
+            self._waiting[provider] -= 1
+        self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+        return semaphore
+
+    def _release(self, provider: str, semaphore: asyncio.Semaphore):
+        self._in_flight[provider] -= 1
+        semaphore.release()
+
+    def _chat_client(self, provider: str):
+        if provider == "groq":
+            return self.groq
+        if provider == "openai":
+            return self.openai
+        raise ValueError(f"Provider '{provider}' has no async chat client")
+
+    async def chat_completion(
+        self,
+        provider: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float = 0.3,
+        max_tokens: int = 2000,
+        response_format: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Run a chat completion on an async-capable provider and return the message text"""
+
+        client = self._chat_client(provider)
+        kwargs = {
+            "messages": messages,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_format:
+            kwargs["response_format"] = response_format
+
+        semaphore = await self._acquire(provider)
+        started = time.perf_counter()
+        try:
+            completion = await client.chat.completions.create(**kwargs)
+        except Exception:
+            record_llm_call(provider, model, started, "error")
+            raise
+        finally:
+            self._release(provider, semaphore)
+
+        record_llm_call(provider, model, started, "ok", getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    async def stream_chat_completion(
+        self,
+        provider: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float = 0.3,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[str]:
+        """
+        Run a streamed chat completion and yield text deltas as they arrive
+
+        The provider slot is held until the stream ends or the caller closes
+        the generator. There is no response_format: Groq's JSON mode can't
+        be streamed, so callers rely on the prompt asking for JSON.
+        """
+
+        client = self._chat_client(provider)
+        semaphore = await self._acquire(provider)
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            stream = await client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            outcome = "ok"
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self._release(provider, semaphore)
+            record_llm_call(provider, model, started, outcome)
+
+    async def run_blocking(self, provider: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking SDK call in the bounded thread pool under the provider's limit"""
+
+        # Gemini's GenerativeModel methods carry the model name
+        model = getattr(getattr(func, "__self__", None), "model_name", "unknown")
+        semaphore = await self._acquire(provider)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        except Exception:
+            record_llm_call(provider, model, started, "error")
+            raise
+        finally:
+            self._release(provider, semaphore)
+
+        record_llm_call(provider, model, started, "ok", getattr(result, "usage_metadata", None))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Current concurrency usage per provider"""
+
+        return {
+            provider: {
+                "limit": limit,
+                "in_flight": self._in_flight.get(provider, 0),
+                "waiting": self._waiting.get(provider, 0),
+            }
+            for provider, limit in self.limits.items()
+        }
+
+    async def aclose(self):
+        """Close provider clients and the offload pool"""
+
+        if self._groq_client is not None:
+            await self._groq_client.close()
+            self._groq_client = None
+        if self._openai_client is not None:
+            await self._openai_client.close()
+            self._openai_client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+llm_gateway = LLMGateway()
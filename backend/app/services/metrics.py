@@ -0,0 +1,269 @@
+import asyncio
+import bisect
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in seconds, per kind of latency
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family: one value (or histogram) per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram
+
+    Observations are counted per bucket, so any quantile can be estimated
+    at query time (Prometheus histogram_quantile) without keeping samples.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (the last is the +Inf overflow), sum, count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        names = self.labels + ("le",)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class CollectedMetric(Metric):
+    """A family whose values are read from the owning service when scraped"""
+
+    def __init__(self, name: str, kind: str, help_text: str, func: Callable, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self) -> List[str]:
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_format_labels(self.labels, key if isinstance(key, tuple) else (key,))} {_format_value(value)}"
+            for key, value in values.items()
+            if value is not None
+        ]
+
+
+class MetricsRegistry:
+    """
+    In-process metrics in the Prometheus text exposition format
+
+    Request paths update counters and histograms directly; services that
+    already keep their own counters (caches, the sensor hub) are read
+    through collectors at scrape time instead of being instrumented twice.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = HTTP_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def collect(self, name: str, kind: str, help_text: str, func: Callable, labels: Tuple[str, ...] = ()):
+        """
+        Register a family read from func() on every scrape: a number, or a
+        dict from label values (a tuple, or a bare value for one label) to
+        numbers. A None value is skipped.
+        """
+        self._register(CollectedMetric(name, kind, help_text, func, labels))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                logger.warning("Metric %s failed to collect: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"), HTTP_BUCKETS
+)
+http_requests_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+llm_request_duration = metrics.histogram(
+    "llm_request_duration_seconds", "LLM provider call latency",
+    ("provider", "model", "outcome"), LLM_BUCKETS
+)
+llm_tokens = metrics.counter("llm_tokens_total", "LLM tokens used", ("provider", "model", "kind"))
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "Database statement latency",
+    ("engine", "operation"), DB_BUCKETS
+)
+db_query_errors = metrics.counter("db_query_errors_total", "Database statements that raised", ("engine", "operation"))
+event_loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop in running a timer that was due", (), LOOP_LAG_BUCKETS
+)
+
+
+def record_llm_call(provider: str, model: str, started: float, outcome: str, usage: Any = None):
+    """Latency of one provider call, and its token usage when the SDK reports it"""
+
+    llm_request_duration.observe(time.perf_counter() - started, provider=provider, model=model, outcome=outcome)
+    if usage is None:
+        return
+    # OpenAI-style usage objects, or Gemini usage_metadata
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "prompt_token_count", None)
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "candidates_token_count", None)
+    if prompt:
+        llm_tokens.inc(prompt, provider=provider, model=model, kind="prompt")
+    if completion:
+        llm_tokens.inc(completion, provider=provider, model=model, kind="completion")
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a sleep of `interval` seconds wakes up
+
+    Anything blocking the loop (sync I/O, CPU work in a coroutine) shows up
+    here as lag for every request sharing the worker.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        metrics.collect("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag", lambda: self.last_lag)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, loop.time() - started - self.interval)
+            event_loop_lag.observe(self.last_lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor(settings.METRICS_LOOP_LAG_INTERVAL_SECONDS)
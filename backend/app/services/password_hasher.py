@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import bcrypt
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when every hashing slot stays busy past the queue timeout"""
+
+
+def hash_password(password: str, rounds: int) -> str:
+    """bcrypt hash at the given cost; runs in a worker"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    """bcrypt verification; runs in a worker"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except Exception as e:
+        logger.warning("Password verification error: %s", e)
+        return False
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ($2b$12$...), or None if it isn't one"""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop
+
+    Hashing and verification are CPU-bound for hundreds of milliseconds,
+    so they go to a dedicated process pool (or thread pool, see
+    PASSWORD_HASH_EXECUTOR). At most PASSWORD_HASH_WORKERS jobs are
+    submitted at once; the rest wait on a semaphore, which is the queue
+    depth reported in stats().
+    """
+
+    def __init__(self, workers: int, executor_kind: str, rounds: int):
+        self.workers = workers
+        self.executor_kind = executor_kind
+        self.rounds = rounds
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.max_waiting = 0
+        self.in_progress = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._busy_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # spawn, not fork: the server process has live threads and sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        finally:
+            self.waiting -= 1
+
+        self.in_progress += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_progress -= 1
+            self.completed += 1
+            self._busy_seconds += time.perf_counter() - started
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(check_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True when a stored hash was made with a different BCRYPT_ROUNDS"""
+        rounds = hash_rounds(hashed_password)
+        return rounds is not None and rounds != self.rounds
+
+    def start(self):
+        """Create the worker pool up front; call on startup"""
+        return self.executor
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "in_progress": self.in_progress,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_seconds": round(self._busy_seconds / self.completed, 4) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    executor_kind=settings.PASSWORD_HASH_EXECUTOR.lower(),
+    rounds=settings.BCRYPT_ROUNDS
+)
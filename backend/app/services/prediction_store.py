@@ -0,0 +1,81 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+from app.config import settings
+
+# Set on responses served from a cache; they describe that response, not the prediction
+RESPONSE_ONLY_FIELDS = ("cached", "near_duplicate_distance")
+
+
+def decode_payload(payload: Any) -> Dict[str, Any]:
+    """Payloads written before the JSON columns may still be JSON text"""
+    if payload is None:
+        return {}
+    if isinstance(payload, (str, bytes)):
+        return json.loads(payload)
+    return payload
+
+
+def promoted_fields(input_data: Dict[str, Any], output_data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Hot fields copied out of the payloads into indexed columns"""
+    return {
+        "recommended_crop": output_data.get("recommended_crop"),
+        "disease_name": output_data.get("disease_name"),
+        "language": input_data.get("language"),
+        "location": input_data.get("location"),
+    }
+
+
+def split_narrative(output_data: Dict[str, Any]):
+    """
+    Lift long top-level strings out of an output payload
+
+    Returns the remaining payload and the zlib-compressed JSON of the lifted
+    fields, or None when compression is off or nothing is long enough.
+    """
+
+    if not settings.PREDICTION_COMPRESS_NARRATIVES:
+        return output_data, None
+    lifted = {
+        key: value for key, value in output_data.items()
+        if isinstance(value, str) and len(value) >= settings.PREDICTION_NARRATIVE_MIN_CHARS
+    }
+    if not lifted:
+        return output_data, None
+    remaining = {key: value for key, value in output_data.items() if key not in lifted}
+    return remaining, zlib.compress(json.dumps(lifted, ensure_ascii=False).encode("utf-8"))
+
+
+def prediction_row(
+    user_id: int,
+    prediction_type: str,
+    input_data: Dict[str, Any],
+    output_data: Dict[str, Any],
+    model_used: str
+) -> Dict[str, Any]:
+    """Column values for a new Prediction"""
+
+    output_data = {key: value for key, value in output_data.items() if key not in RESPONSE_ONLY_FIELDS}
+    stored_output, narrative = split_narrative(output_data)
+    return {
+        "user_id": user_id,
+        "prediction_type": prediction_type,
+        "input_data": input_data,
+        "output_data": stored_output,
+        "narrative": narrative,
+        "confidence": output_data.get("confidence", 0.0),
+        "model_used": output_data.get("model_used", model_used),
+        **promoted_fields(input_data, output_data),
+    }
+
+
+def prediction_input(prediction) -> Dict[str, Any]:
+    return decode_payload(prediction.input_data)
+
+
+def prediction_output(prediction) -> Dict[str, Any]:
+    """The full output payload, with any compressed narrative fields restored"""
+    output_data = decode_payload(prediction.output_data)
+    if prediction.narrative:
+        output_data = {**output_data, **json.loads(zlib.decompress(prediction.narrative))}
+    return output_data
@@ -0,0 +1,120 @@
+import asyncio
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_gemini(module):
+    module.configure(api_key=settings.GEMINI_API_KEY)
+
+
+# name -> (SDK module, API key, setup run once after import)
+PROVIDERS: Dict[str, tuple] = {
+    "groq": ("groq", settings.GROQ_API_KEY, None),
+    "openai": ("openai", settings.OPENAI_API_KEY, None),
+    "gemini": ("google.generativeai", settings.GEMINI_API_KEY, _configure_gemini),
+}
+
+
+def _installed(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class ProviderRegistry:
+    """
+    Provider SDKs, imported on first use
+
+    The SDKs are the bulk of the API's cold import (google.generativeai alone
+    pulls in IPython), so whether a provider is usable is decided from its
+    API key and find_spec, and the module itself is only imported when a
+    client is first needed, or ahead of time by warm_up.
+    """
+
+    def __init__(self, providers: Dict[str, tuple]):
+        self.providers = providers
+        self._modules: Dict[str, Any] = {}
+        self._import_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._warm_task: Optional[asyncio.Task] = None
+        self._available = {
+            name: bool(api_key) and _installed(module_name)
+            for name, (module_name, api_key, _) in providers.items()
+        }
+
+    def available(self, name: str) -> bool:
+        """Provider has an API key and its SDK is installed; does not import it"""
+        return self._available.get(name, False)
+
+    def load(self, name: str):
+        """The provider's SDK module, imported (and set up) on the first call"""
+
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        module_name, _, setup = self.providers[name]
+        with self._lock:
+            if name not in self._modules:
+                started = time.perf_counter()
+                try:
+                    module = importlib.import_module(module_name)
+                    if setup is not None:
+                        setup(module)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._import_seconds[name] = time.perf_counter() - started
+                self._errors.pop(name, None)
+                self._modules[name] = module
+        return self._modules[name]
+
+    def _warm(self, names: Iterable[str]) -> Dict[str, Optional[float]]:
+        loaded = {}
+        for name in names:
+            try:
+                self.load(name)
+                loaded[name] = round(self._import_seconds.get(name, 0.0), 3)
+            except Exception as e:
+                logger.warning("Provider %s failed to load: %s", name, e)
+                loaded[name] = None
+        logger.info("Provider SDKs warmed up", extra={"import_seconds": loaded})
+        return loaded
+
+    async def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, Optional[float]]:
+        """
+        Import the SDKs of the available providers (or of names) off the event
+        loop, returning the import seconds per provider (None if it failed)
+        """
+
+        if names is None:
+            names = [name for name in self.providers if self.available(name)]
+        return await asyncio.to_thread(self._warm, list(names))
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Run warm_up in the background so startup does not wait on the imports"""
+        if self._warm_task is None:
+            self._warm_task = asyncio.get_running_loop().create_task(self.warm_up())
+        return self._warm_task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "available": self.available(name),
+                "loaded": name in self._modules,
+                "import_seconds": round(self._import_seconds[name], 3) if name in self._import_seconds else None,
+                "error": self._errors.get(name),
+            }
+            for name in self.providers
+        }
+
+
+provider_registry = ProviderRegistry(PROVIDERS)
@@ -0,0 +1,261 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.config import settings
+
+# (provider, model, coroutine factory) in order of preference
+ProviderAttempt = Tuple[str, str, Callable[[], Awaitable[Any]]]
+
+
+class NoProviderAvailable(Exception):
+    """Raised when every provider failed, returned an invalid answer or is switched off by its breaker"""
+
+
+class LatencyStats:
+    """Rolling latency and error rate over the last `window` calls of one provider model"""
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.calls = 0
+        self.censored = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(seconds)
+
+    def censor(self, seconds: float):
+        """
+        A call cancelled after `seconds` would have taken at least that long
+
+        Counted as a latency sample when it reaches the current p95, so
+        slow calls that lose a hedge push the tail up instead of vanishing
+        from the window; shorter ones say nothing about the tail and are
+        left out. Error rate and breaker are unaffected.
+        """
+        p95 = self.percentile(0.95)
+        if p95 is None or seconds >= p95:
+            self.censored += 1
+            self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "censored": self.censored,
+        }
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `failure_threshold` consecutive failures
+
+    While open every call is refused. After `cooldown` seconds one trial
+    call is let through (half open): success closes the breaker, failure
+    opens it for another cooldown. A trial that never reports back is
+    given up on after another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_started: Optional[float] = None
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def _probing(self) -> bool:
+        return self._probe_started is not None and time.monotonic() - self._probe_started < self.cooldown
+
+    def available(self) -> bool:
+        """Whether allow() would let a call through, without claiming the half-open trial"""
+        if self.state == "open":
+            return self._cooled_down()
+        return not (self.state == "half_open" and self._probing())
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if not self._cooled_down():
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing():
+                return False
+            self._probe_started = time.monotonic()
+        return True
+
+    def record(self, ok: bool):
+        self._probe_started = None
+        if ok:
+            self.consecutive_failures = 0
+            self.state = "closed"
+            return
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """A call was cancelled before it finished; free the half-open trial without judging it"""
+        self._probe_started = None
+
+
+class ProviderRouter:
+    """
+    Races LLM providers for one answer
+
+    Providers are tried in order of preference. If the current attempt
+    has not answered by its provider's rolling p95 (LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    until LLM_HEDGE_MIN_SAMPLES calls have been seen), a hedged request
+    goes to the next provider; a failure moves on to the next one at
+    once. The first answer that passes validation wins and the other
+    requests are cancelled.
+    """
+
+    def __init__(self):
+        self._latency: Dict[Tuple[str, str], LatencyStats] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.races = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self.exhausted = 0
+
+    def latency(self, provider: str, model: str) -> LatencyStats:
+        key = (provider, model)
+        if key not in self._latency:
+            self._latency[key] = LatencyStats(settings.LLM_LATENCY_WINDOW)
+        return self._latency[key]
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(
+                settings.LLM_BREAKER_FAILURE_THRESHOLD,
+                settings.LLM_BREAKER_COOLDOWN_SECONDS
+            )
+        return self._breakers[provider]
+
+    def available(self, provider: str) -> bool:
+        return self.breaker(provider).available()
+
+    def record(self, provider: str, model: str, seconds: float, ok: bool):
+        self.latency(provider, model).record(seconds, ok)
+        self.breaker(provider).record(ok)
+
+    def hedge_delay(self, provider: str, model: str) -> float:
+        stats = self.latency(provider, model)
+        p95 = stats.percentile(0.95) if len(stats.latencies) >= settings.LLM_HEDGE_MIN_SAMPLES else None
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, p95)
+
+    async def race(self, attempts: List[ProviderAttempt], validate: Callable[[Any], bool]) -> Any:
+        """Return the first valid answer from the attempts, or raise NoProviderAvailable"""
+
+        self.races += 1
+        queue = list(attempts)
+        pending: Dict[asyncio.Future, Tuple[str, str, float]] = {}
+        errors: List[str] = []
+        hedged = set()
+        hedge_at: Optional[float] = None
+
+        def launch() -> Optional[asyncio.Future]:
+            nonlocal hedge_at
+            while queue:
+                provider, model, factory = queue.pop(0)
+                if not self.breaker(provider).allow():
+                    errors.append(f"{provider}: circuit open")
+                    continue
+                task = asyncio.ensure_future(factory())
+                started = time.perf_counter()
+                pending[task] = (provider, model, started)
+                hedge_at = started + self.hedge_delay(provider, model) if settings.LLM_HEDGE_ENABLED else None
+                return task
+            hedge_at = None
+            return None
+
+        launch()
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - time.perf_counter()) if hedge_at is not None and queue else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    task = launch()
+                    if task is not None:
+                        hedged.add(task)
+                        self.hedges += 1
+                    continue
+
+                for task in done:
+                    provider, model, started = pending.pop(task)
+                    elapsed = time.perf_counter() - started
+                    try:
+                        result = task.result()
+                        ok = bool(validate(result))
+                        if not ok:
+                            errors.append(f"{provider}: invalid answer")
+                    except Exception as e:
+                        ok = False
+                        errors.append(f"{provider}: {type(e).__name__}: {str(e)[:200]}")
+                    self.record(provider, model, elapsed, ok)
+                    if ok:
+                        if task in hedged:
+                            self.hedge_wins += 1
+                        return result
+
+                if not pending:
+                    launch()
+        finally:
+            for task, (provider, model, started) in pending.items():
+                task.cancel()
+                self.latency(provider, model).censor(time.perf_counter() - started)
+                self.breaker(provider).release()
+                self.cancelled += 1
+
+        self.exhausted += 1
+        raise NoProviderAvailable("; ".join(errors) or "no provider configured")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "races": self.races,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "cancelled": self.cancelled,
+            "exhausted": self.exhausted,
+            "models": {f"{provider}/{model}": stats.stats() for (provider, model), stats in self._latency.items()},
+            "breakers": {
+                provider: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.consecutive_failures,
+                    "times_opened": breaker.times_opened,
+                }
+                for provider, breaker in self._breakers.items()
+            },
+        }
+
+
+provider_router = ProviderRouter()
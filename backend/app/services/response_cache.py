@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config import settings
+from app.services.single_flight import single_flight
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Results produced by local fallbacks are never cached, so a transient
+# provider outage does not pin a degraded answer for the whole TTL
+LOCAL_MODELS = {"Rule-based (Local)", "Intelligent Pattern Matching"}
+
+
+def _bucket(value: Optional[float], step: float) -> Optional[float]:
+    """Quantise a numeric input to the centre of its bucket"""
+    if value is None:
+        return None
+    return round(round(float(value) / step) * step, 4)
+
+
+def _normalise_text(text: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    if not text:
+        return ""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _make_key(namespace: str, parts: Dict[str, Any]) -> str:
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def crop_cache_key(
+    input_data: Dict[str, float],
+    language: str = "en",
+    location: str = None,
+    latitude: float = None,
+    longitude: float = None
+) -> str:
+    """Cache key for crop predictions built from bucketed soil and climate inputs"""
+    return _make_key("crop", {
+        "N": _bucket(input_data.get("nitrogen"), 5),
+        "P": _bucket(input_data.get("phosphorus"), 5),
+        "K": _bucket(input_data.get("potassium"), 5),
+        "temp": _bucket(input_data.get("temperature"), 1),
+        "humidity": _bucket(input_data.get("humidity"), 5),
+        "ph": _bucket(input_data.get("ph"), 0.2),
+        "rainfall": _bucket(input_data.get("rainfall"), 10),
+        "location": _normalise_text(location),
+        "lat": _bucket(latitude, 0.1),
+        "lon": _bucket(longitude, 0.1),
+        "language": language,
+    })
+
+
+def disease_cache_key(crop_type: str, symptoms: str, language: str = "en") -> str:
+    """Cache key for symptom-based diagnoses"""
+    return _make_key("disease", {
+        "crop": _normalise_text(crop_type),
+        "symptoms": _normalise_text(symptoms),
+        "language": language,
+    })
+
+
+def pest_cache_key(crop_type: str, pest_issue: str, language: str = "en") -> str:
+    """Request key for pest management advice"""
+    return _make_key("pest", {
+        "crop": _normalise_text(crop_type),
+        "pest": _normalise_text(pest_issue),
+        "language": language,
+    })
+
+
+def fertilizer_cache_key(
+    crop_type: str,
+    soil_type: str,
+    current_npk: Dict[str, float],
+    soil_ph: float,
+    moisture: float,
+    language: str = "en"
+) -> str:
+    """Cache key for fertilizer recommendations built from bucketed soil readings"""
+    return _make_key("fertilizer", {
+        "crop": _normalise_text(crop_type),
+        "soil": _normalise_text(soil_type),
+        "N": _bucket(current_npk.get("N"), 5),
+        "P": _bucket(current_npk.get("P"), 5),
+        "K": _bucket(current_npk.get("K"), 5),
+        "ph": _bucket(soil_ph, 0.2),
+        "moisture": _bucket(moisture, 5),
+        "language": language,
+    })
+
+
+def is_cacheable(result: Dict[str, Any]) -> bool:
+    """Only LLM-generated advisories are worth caching"""
+    model_used = result.get("model_used") if isinstance(result, dict) else None
+    return bool(model_used) and model_used not in LOCAL_MODELS
+
+
+class MemoryCacheBackend:
+    """Per-process LRU cache; fastest, but not shared between workers"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        self._cache.set(key, value)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def clear(self):
+        self._cache.clear()
+
+    def size(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteCacheBackend:
+    """File-backed cache shared by every worker on the host"""
+
+    blocking = True
+
+    # Refresh the LRU timestamp at most this often per key to keep reads cheap
+    TOUCH_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sets_since_evict = 0
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Open the database up front; call on startup"""
+        with self._lock:
+            self._open()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _open(self):
+        """Connect and create the table on first use; called with the lock held"""
+        if self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._open()
+            row = self._conn.execute(
+                "SELECT value, expires_at, accessed_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at, accessed_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            if now - accessed_at > self.TOUCH_INTERVAL_SECONDS:
+                self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._open()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now)
+            )
+            self._sets_since_evict += 1
+            if self._sets_since_evict >= 100:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._sets_since_evict = 0
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._open()
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            self._open()
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Advisory response cache with pluggable storage backends"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def open(self):
+        """Open the storage backend; call on startup"""
+        if self.backend is not None:
+            self.backend.open()
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+
+    async def _call(self, method: Callable, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        try:
+            raw = await self._call(self.backend.get, key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Response cache read error: %s", e)
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        if self.backend is None:
+            return
+        try:
+            await self._call(self.backend.set, key, json.dumps(value, ensure_ascii=False))
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Response cache write error: %s", e)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return the cached advisory for key, computing and storing it on a miss
+
+        Concurrent misses for the same key are coalesced, so only one of them
+        reaches the provider and stores the result.
+        """
+
+        cached = await self.get(key)
+        if cached is not None:
+            cached["cached"] = True
+            return cached
+
+        async def compute_and_store():
+            result = await compute()
+            if is_cacheable(result):
+                await self.set(key, result)
+            return result
+
+        return await single_flight.do(key, compute_and_store)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "errors": self.errors,
+        }
+
+
+def _create_backend():
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(
+            settings.RESPONSE_CACHE_PATH,
+            settings.RESPONSE_CACHE_MAX_ENTRIES,
+            settings.RESPONSE_CACHE_TTL_SECONDS
+        )
+    return None
+
+
+response_cache = ResponseCache(_create_backend())
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+from app.config import settings
+from app.sensor_simulator import sensor_simulator
+
+
+class Subscriber:
+    """A single dashboard socket's bounded outbound queue"""
+
+    def __init__(self, location: str, maxsize: int):
+        self.location = location
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message: str):
+        """Enqueue without blocking the producer; a slow consumer loses its oldest message"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class SensorHub:
+    """
+    Fans sensor readings out to every WebSocket subscriber
+
+    Each location has exactly one producer task, started with its first
+    subscriber and stopped with its last. A reading is generated and
+    serialised once per tick and offered to every subscriber's queue, so
+    all dashboards for a location see the same stream.
+    """
+
+    def __init__(self, interval: float, queue_size: int):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._producers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, str] = {}
+        self.dropped = 0
+
+    def subscribe(self, location: str) -> Subscriber:
+        subscriber = Subscriber(location, self.queue_size)
+        self._subscribers.setdefault(location, set()).add(subscriber)
+
+        if location in self._latest:
+            subscriber.offer(self._latest[location])
+        if location not in self._producers:
+            self._producers[location] = asyncio.create_task(self._produce(location))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        location = subscriber.location
+        self.dropped += subscriber.dropped
+        subscribers = self._subscribers.get(location)
+        if subscribers is None:
+            return
+
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[location]
+            self._latest.pop(location, None)
+            producer = self._producers.pop(location, None)
+            if producer is not None:
+                producer.cancel()
+
+    async def _produce(self, location: str):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            reading = sensor_simulator.get_reading(location)
+            message = json.dumps({**reading, "timestamp": reading["timestamp"].isoformat()})
+            self._latest[location] = message
+
+            for subscriber in list(self._subscribers.get(location, ())):
+                subscriber.offer(message)
+
+            # Schedule against the clock so ticks don't drift with fan-out time
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def subscriber_count(self, location: Optional[str] = None) -> int:
+        if location is not None:
+            return len(self._subscribers.get(location, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscriber_counts(self) -> Dict[str, int]:
+        return {location: len(subscribers) for location, subscribers in self._subscribers.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "locations": len(self._producers),
+            "subscribers": self.subscriber_count(),
+            "dropped_messages": self.dropped + sum(
+                subscriber.dropped
+                for subscribers in self._subscribers.values()
+                for subscriber in subscribers
+            ),
+        }
+
+    async def aclose(self):
+        """Stop every producer task"""
+        producers = list(self._producers.values())
+        self._producers.clear()
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+
+
+sensor_hub = SensorHub(
+    interval=settings.SENSOR_UPDATE_INTERVAL,
+    queue_size=settings.SENSOR_STREAM_QUEUE_SIZE
+)
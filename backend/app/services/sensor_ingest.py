@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, Tuple
+from pydantic import ValidationError
+from app.config import settings
+from app.database import engine
+from app.models.models import SensorReading
+from app.models.schemas import SensorData
+from app.services.batch_writer import BatchWriter
+from app.services.sensor_rollup import check_dialect, to_utc_naive, update_rollups
+
+# Most validation errors echoed back per request; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+
+def validate_readings(
+    rows: List[Tuple[int, Any]],
+    user_id: int = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Validate raw readings with SensorData, returning (rows to insert, errors); timestamps become naive UTC"""
+
+    valid = []
+    errors = []
+    for index, raw in rows:
+        try:
+            if isinstance(raw, Exception):
+                raise ValueError(str(raw))
+            reading = SensorData.model_validate(raw)
+        except (ValidationError, ValueError, TypeError) as e:
+            errors.append({
+                "index": index,
+                "error": e.errors(include_url=False) if isinstance(e, ValidationError) else str(e)
+            })
+            continue
+
+        # Same time base as the rollups and the history filters
+        valid.append({**reading.model_dump(), "timestamp": to_utc_naive(reading.timestamp), "user_id": user_id})
+    return valid, errors
+
+
+class SensorIngestWriter(BatchWriter):
+    """Writes raw readings and folds them into the rollup tiers in the same transaction"""
+
+    def start(self):
+        # Fail on startup rather than dead-lettering every batch at its first flush
+        check_dialect(engine.dialect.name)
+        super().start()
+
+    def write(self, conn, batch: List[Dict[str, Any]]):
+        super().write(conn, batch)
+        update_rollups(conn, batch)
+
+
+sensor_writer = SensorIngestWriter(
+    "sensor_ingest",
+    SensorReading.__table__,
+    max_queue=settings.SENSOR_INGEST_MAX_QUEUE,
+    batch_size=settings.SENSOR_INGEST_BATCH_SIZE,
+    flush_interval=settings.SENSOR_INGEST_FLUSH_INTERVAL
+)
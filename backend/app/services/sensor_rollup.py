@@ -0,0 +1,273 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from app.config import settings
+from app.models.models import SensorReading, SensorRollupMinute, SensorRollupHour, SensorRollupDay
+from app.utils.pagination import keyset_page
+
+METRICS = ("soil_moisture", "soil_ph", "nitrogen", "phosphorus", "potassium", "temperature", "humidity")
+
+# Rollup tiers, finest first
+ROLLUP_MODELS = {"1m": SensorRollupMinute, "1h": SensorRollupHour, "1d": SensorRollupDay}
+TIER_SECONDS = {"1m": 60, "1h": 3600, "1d": 86400}
+BUCKETS = ("raw", "auto") + tuple(ROLLUP_MODELS)
+
+# Databases with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = ("sqlite", "postgresql")
+
+# Lower bound used when a query has no start time
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_utc_naive(ts: datetime) -> datetime:
+    """Readings are stored as naive UTC"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def truncate(ts: datetime, tier: str) -> datetime:
+    """Start of the tier bucket containing ts"""
+    ts = ts.replace(second=0, microsecond=0)
+    if tier in ("1h", "1d"):
+        ts = ts.replace(minute=0)
+    if tier == "1d":
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def ceil(ts: datetime, tier: str) -> datetime:
+    """Start of the first tier bucket at or after ts"""
+    start = truncate(ts, tier)
+    return start if start == ts else start + timedelta(seconds=TIER_SECONDS[tier])
+
+
+def pick_tier(start: Optional[datetime], end: datetime) -> str:
+    """Finest tier that keeps a chart of start..end within SENSOR_HISTORY_MAX_POINTS per location"""
+    if start is None:
+        return "1h"
+    span = (to_utc_naive(end) - to_utc_naive(start)).total_seconds()
+    for tier, seconds in TIER_SECONDS.items():
+        if span / seconds <= settings.SENSOR_HISTORY_MAX_POINTS:
+            return tier
+    return "1d"
+
+
+def aggregate(rows: Iterable[Dict[str, Any]], tier: str) -> List[Dict[str, Any]]:
+    """Fold raw reading dicts into one rollup row per (location, bucket)"""
+
+    buckets: Dict[Tuple[str, datetime], Dict[str, Any]] = {}
+    for row in rows:
+        ts = to_utc_naive(row["timestamp"])
+        key = (row.get("location") or "", truncate(ts, tier))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = {"location": key[0], "bucket_start": key[1], "count": 0, "first_reading": ts, "last_reading": ts}
+            for metric in METRICS:
+                value = row[metric]
+                bucket[f"{metric}_sum"] = 0.0
+                bucket[f"{metric}_min"] = value
+                bucket[f"{metric}_max"] = value
+            buckets[key] = bucket
+
+        bucket["count"] += 1
+        bucket["first_reading"] = min(bucket["first_reading"], ts)
+        bucket["last_reading"] = max(bucket["last_reading"], ts)
+        for metric in METRICS:
+            value = row[metric]
+            bucket[f"{metric}_sum"] += value
+            if value < bucket[f"{metric}_min"]:
+                bucket[f"{metric}_min"] = value
+            if value > bucket[f"{metric}_max"]:
+                bucket[f"{metric}_max"] = value
+    return list(buckets.values())
+
+
+def check_dialect(dialect: str):
+    """Raise unless the database can upsert rollup rows; called on startup, before any reading is accepted"""
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Sensor rollups need an upsert-capable database, not {dialect}")
+
+
+def _upsert_statement(conn, table):
+    dialect = conn.dialect.name
+    check_dialect(dialect)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        least, greatest = func.min, func.max
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        least, greatest = func.least, func.greatest
+
+    stmt = insert(table)
+    excluded = stmt.excluded
+    updates = {
+        "count": table.c.count + excluded.count,
+        "first_reading": least(table.c.first_reading, excluded.first_reading),
+        "last_reading": greatest(table.c.last_reading, excluded.last_reading),
+    }
+    for metric in METRICS:
+        updates[f"{metric}_sum"] = table.c[f"{metric}_sum"] + excluded[f"{metric}_sum"]
+        updates[f"{metric}_min"] = least(table.c[f"{metric}_min"], excluded[f"{metric}_min"])
+        updates[f"{metric}_max"] = greatest(table.c[f"{metric}_max"], excluded[f"{metric}_max"])
+    return stmt.on_conflict_do_update(index_elements=["location", "bucket_start"], set_=updates)
+
+
+def update_rollups(conn, rows: List[Dict[str, Any]]):
+    """Merge a batch of raw readings into every rollup tier inside an open transaction"""
+    if not rows:
+        return
+    for tier, model in ROLLUP_MODELS.items():
+        conn.execute(_upsert_statement(conn, model.__table__), aggregate(rows, tier))
+
+
+def rebuild_rollups(engine, batch_size: int = 5000) -> int:
+    """Recompute every tier from sensor_readings; returns the number of readings folded in"""
+
+    readings = SensorReading.__table__
+    columns = [readings.c.timestamp, readings.c.location] + [readings.c[metric] for metric in METRICS]
+    total = 0
+    with engine.begin() as conn:
+        for model in ROLLUP_MODELS.values():
+            conn.execute(model.__table__.delete())
+
+        last_id = 0
+        while True:
+            batch = conn.execute(
+                select(readings.c.id, *columns)
+                .where(
+                    readings.c.id > last_id,
+                    readings.c.timestamp.isnot(None),
+                    *[readings.c[metric].isnot(None) for metric in METRICS]
+                )
+                .order_by(readings.c.id)
+                .limit(batch_size)
+            ).mappings().all()
+            if not batch:
+                break
+            last_id = batch[-1]["id"]
+            update_rollups(conn, [dict(row) for row in batch])
+            total += len(batch)
+    return total
+
+
+def _summary(row) -> Dict[str, Any]:
+    """avg/min/max per metric for one rollup row"""
+    return {
+        metric: {
+            "avg": round(getattr(row, f"{metric}_sum") / row.count, 2) if row.count else None,
+            "min": getattr(row, f"{metric}_min"),
+            "max": getattr(row, f"{metric}_max"),
+        }
+        for metric in METRICS
+    }
+
+
+async def query_buckets(
+    db,
+    tier: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    location: Optional[str],
+    limit: int,
+    after: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Rollup rows for one tier overlapping [start, end], newest bucket first, plus the next page cursor"""
+
+    model = ROLLUP_MODELS[tier]
+    stmt = select(model)
+    if start is not None:
+        stmt = stmt.where(model.bucket_start >= truncate(to_utc_naive(start), tier))
+    if end is not None:
+        stmt = stmt.where(model.bucket_start <= to_utc_naive(end))
+    if location is not None:
+        stmt = stmt.where(model.location == location)
+
+    rows, next_cursor = await keyset_page(db, stmt, model.bucket_start, model.id, after, limit)
+    return [
+        {
+            "bucket_start": row.bucket_start.isoformat(),
+            "location": row.location or None,
+            "count": row.count,
+            **_summary(row)
+        }
+        for row in rows
+    ], next_cursor
+
+
+def _cover(start: datetime, end: datetime, tiers=("1d", "1h", "1m")) -> List[Tuple[str, datetime, datetime]]:
+    """Split a minute-aligned [start, end) into the fewest whole buckets, coarsest tier first"""
+
+    if start >= end:
+        return []
+    tier = tiers[0]
+    if len(tiers) == 1:
+        return [(tier, start, end)]
+
+    low, high = ceil(start, tier), truncate(end, tier)
+    if low >= high:
+        return _cover(start, end, tiers[1:])
+    return _cover(start, low, tiers[1:]) + [(tier, low, high)] + _cover(high, end, tiers[1:])
+
+
+async def query_stats(
+    db,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    location: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Exact summary over [start, end) from the rollup tiers
+
+    The range is resolved to whole minutes and covered with whole days,
+    then hours, then minutes, so even an all-time summary touches only a
+    few hundred rows.
+    """
+
+    start = truncate(to_utc_naive(start), "1m") if start is not None else EPOCH
+    # Without an end, include a day of headroom for gateways with fast clocks
+    end = ceil(to_utc_naive(end), "1m") if end is not None else ceil(datetime.utcnow(), "1d") + timedelta(days=1)
+
+    count = 0
+    first_reading = last_reading = None
+    sums = {metric: 0.0 for metric in METRICS}
+    mins: Dict[str, Optional[float]] = {metric: None for metric in METRICS}
+    maxs: Dict[str, Optional[float]] = {metric: None for metric in METRICS}
+
+    for tier, low, high in _cover(start, end):
+        model = ROLLUP_MODELS[tier]
+        columns = [
+            func.sum(model.count).label("count"),
+            func.min(model.first_reading).label("first_reading"),
+            func.max(model.last_reading).label("last_reading"),
+        ]
+        for metric in METRICS:
+            columns += [
+                func.sum(getattr(model, f"{metric}_sum")).label(f"{metric}_sum"),
+                func.min(getattr(model, f"{metric}_min")).label(f"{metric}_min"),
+                func.max(getattr(model, f"{metric}_max")).label(f"{metric}_max"),
+            ]
+        stmt = select(*columns).where(model.bucket_start >= low, model.bucket_start < high)
+        if location is not None:
+            stmt = stmt.where(model.location == location)
+        row = (await db.execute(stmt)).one()
+        if not row.count:
+            continue
+
+        count += row.count
+        first_reading = min(filter(None, (first_reading, row.first_reading)))
+        last_reading = max(filter(None, (last_reading, row.last_reading)))
+        for metric in METRICS:
+            sums[metric] += getattr(row, f"{metric}_sum")
+            low_value, high_value = getattr(row, f"{metric}_min"), getattr(row, f"{metric}_max")
+            mins[metric] = low_value if mins[metric] is None else min(mins[metric], low_value)
+            maxs[metric] = high_value if maxs[metric] is None else max(maxs[metric], high_value)
+
+    return {
+        "averages": {metric: round(sums[metric] / count, 2) if count else 0 for metric in METRICS},
+        "minimums": mins,
+        "maximums": maxs,
+        "total_readings": count,
+        "first_reading": first_reading.isoformat() if first_reading else None,
+        "last_reading": last_reading.isoformat() if last_reading else None
+    }
@@ -0,0 +1,52 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls into one shared upstream call
+
+    The first caller for a key starts the work as a background task; every
+    caller that arrives while it is running awaits the same task instead of
+    issuing its own request. The task is shielded, so a leader whose client
+    disconnects does not cancel the answer the followers are waiting for.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+            result = await asyncio.shield(task)
+            # Followers get their own copy so callers can't mutate each other's result
+            return copy.deepcopy(result)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(compute())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.collapsed
+        return {
+            "upstream_calls": self.leaders,
+            "collapsed_calls": self.collapsed,
+            "collapse_ratio": round(self.collapsed / calls, 4) if calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+
+single_flight = SingleFlight()
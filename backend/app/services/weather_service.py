@@ -1,64 +1,166 @@
+import asyncio
+import copy
+import logging
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 from app.config import settings
+from app.services.single_flight import SingleFlight
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 class WeatherService:
-    """Weather data integration service"""
+    """
+    Weather data integration service
+    
+    One pooled keep-alive client is shared by all requests. Results are
+    cached per rounded coordinate or normalised city name: fresh for
+    WEATHER_CACHE_TTL_SECONDS, then served stale for up to
+    WEATHER_CACHE_STALE_SECONDS while a single background refresh runs.
+    """
+    
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache = TTLCache(
+            max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.WEATHER_CACHE_TTL_SECONDS + settings.WEATHER_CACHE_STALE_SECONDS
+        )
+        self._flights = SingleFlight()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stale_served = 0
+        self.upstream_errors = 0
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.WEATHER_API_URL,
+                timeout=httpx.Timeout(settings.WEATHER_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=settings.WEATHER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WEATHER_MAX_CONNECTIONS,
+                    keepalive_expiry=60
+                )
+            )
+        return self._client
+    
+    def open(self):
+        """Create the pooled client up front; call on startup"""
+        return self.client
+    
+    async def aclose(self):
+        """Cancel pending refreshes and close the pooled client"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     @staticmethod
-    async def get_weather(location: str, lat: float = None, lon: float = None) -> Dict[str, Any]:
-        """Fetch weather data from OpenWeatherMap API"""
+    def _cache_key(location: str, lat: float = None, lon: float = None) -> str:
+        """~1 km grid for coordinates, case- and whitespace-insensitive city names"""
+        if lat is not None and lon is not None:
+            return f"coords:{round(lat, 2)}:{round(lon, 2)}"
+        return "city:" + " ".join(location.lower().split())
+    
+    async def get_weather(self, location: str, lat: float = None, lon: float = None) -> Dict[str, Any]:
+        """Fetch weather data from OpenWeatherMap API, served from cache when possible"""
         
         if not settings.WEATHER_API_KEY:
             return WeatherService._get_mock_weather(location)
         
+        key = self._cache_key(location, lat, lon)
+        cached = self._cache.get(key)
+        if cached is not None:
+            data, fetched_at = cached
+            if time.monotonic() - fetched_at > settings.WEATHER_CACHE_TTL_SECONDS:
+                self.stale_served += 1
+                self._refresh_in_background(key, location, lat, lon)
+            return copy.deepcopy(data)
+        
         try:
-            async with httpx.AsyncClient() as client:
-                # Current weather
-                if lat and lon:
-                    url = f"{settings.WEATHER_API_URL}/weather?lat={lat}&lon={lon}&appid={settings.WEATHER_API_KEY}&units=metric"
-                else:
-                    url = f"{settings.WEATHER_API_URL}/weather?q={location}&appid={settings.WEATHER_API_KEY}&units=metric"
-                
-                response = await client.get(url, timeout=10)
-                response.raise_for_status()
-                current = response.json()
-                
-                # 5-day forecast
-                if lat and lon:
-                    forecast_url = f"{settings.WEATHER_API_URL}/forecast?lat={lat}&lon={lon}&appid={settings.WEATHER_API_KEY}&units=metric"
-                else:
-                    forecast_url = f"{settings.WEATHER_API_URL}/forecast?q={location}&appid={settings.WEATHER_API_KEY}&units=metric"
-                
-                forecast_response = await client.get(forecast_url, timeout=10)
-                forecast_response.raise_for_status()
-                forecast_data = forecast_response.json()
-                
-                return {
-                    "location": current.get("name", location),
-                    "temperature": current["main"]["temp"],
-                    "humidity": current["main"]["humidity"],
-                    "rainfall": current.get("rain", {}).get("1h", 0),
-                    "wind_speed": current["wind"]["speed"],
-                    "description": current["weather"][0]["description"],
-                    "pressure": current["main"]["pressure"],
-                    "visibility": current.get("visibility", 10000) / 1000,
-                    "forecast": [
-                        {
-                            "datetime": item["dt_txt"],
-                            "temperature": item["main"]["temp"],
-                            "humidity": item["main"]["humidity"],
-                            "description": item["weather"][0]["description"],
-                            "rain_probability": item.get("pop", 0) * 100
-                        }
-                        for item in forecast_data["list"][:8]  # Next 24 hours
-                    ]
-                }
-                
+            return await self._flights.do(key, lambda: self._fetch_and_store(key, location, lat, lon))
         except Exception as e:
-            print(f"Weather API error: {e}")
+            self.upstream_errors += 1
+            logger.warning("Weather API error: %s", e)
             return WeatherService._get_mock_weather(location)
     
+    def _refresh_in_background(self, key: str, location: str, lat: float, lon: float):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        
+        async def refresh():
+            try:
+                await self._flights.do(key, lambda: self._fetch_and_store(key, location, lat, lon))
+            except Exception as e:
+                # Keep serving the stale entry until it expires
+                self.upstream_errors += 1
+                logger.warning("Weather refresh error: %s", e)
+            finally:
+                self._refreshing.discard(key)
+        
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _fetch_and_store(self, key: str, location: str, lat: float, lon: float) -> Dict[str, Any]:
+        data = await self._fetch(location, lat, lon)
+        self._cache.set(key, (copy.deepcopy(data), time.monotonic()))
+        return data
+    
+    async def _fetch(self, location: str, lat: float = None, lon: float = None) -> Dict[str, Any]:
+        """Current conditions and forecast, requested concurrently"""
+        
+        params = {"appid": settings.WEATHER_API_KEY, "units": "metric"}
+        if lat is not None and lon is not None:
+            params.update(lat=lat, lon=lon)
+        else:
+            params["q"] = location.strip()
+        
+        # Current weather and 5-day forecast
+        response, forecast_response = await asyncio.gather(
+            self.client.get("/weather", params=params),
+            self.client.get("/forecast", params=params)
+        )
+        response.raise_for_status()
+        forecast_response.raise_for_status()
+        current = response.json()
+        forecast_data = forecast_response.json()
+        
+        return {
+            "location": current.get("name", location),
+            "temperature": current["main"]["temp"],
+            "humidity": current["main"]["humidity"],
+            "rainfall": current.get("rain", {}).get("1h", 0),
+            "wind_speed": current["wind"]["speed"],
+            "description": current["weather"][0]["description"],
+            "pressure": current["main"]["pressure"],
+            "visibility": current.get("visibility", 10000) / 1000,
+            "forecast": [
+                {
+                    "datetime": item["dt_txt"],
+                    "temperature": item["main"]["temp"],
+                    "humidity": item["main"]["humidity"],
+                    "description": item["weather"][0]["description"],
+                    "rain_probability": item.get("pop", 0) * 100
+                }
+                for item in forecast_data["list"][:8]  # Next 24 hours
+            ]
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self._cache.stats(),
+            "stale_served": self.stale_served,
+            "refreshing": len(self._refreshing),
+            "upstream_errors": self.upstream_errors,
+            "coalescing": self._flights.stats(),
+        }
+    
     @staticmethod
     def _get_mock_weather(location: str) -> Dict[str, Any]:
         """Return mock weather data for testing"""
@@ -1,28 +1,33 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models.models import User
+from app.services.password_hasher import check_password, hash_password
+from app.utils.cache import TTLCache
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Decoded token -> username, and username -> detached User. Entries live for
+# at most a few minutes, which bounds staleness across workers; in this
+# process invalidate_user() evicts a principal immediately.
+_token_cache = TTLCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE, ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(max_entries=settings.AUTH_USER_CACHE_SIZE, ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
-    try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-    except Exception as e:
-        print(f"Password verification error: {e}")
-        return False
+    """Verify a password against a hash (blocking; async code uses password_hasher)"""
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash a password using bcrypt (blocking; async code uses password_hasher)"""
+    return hash_password(password, settings.BCRYPT_ROUNDS)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -38,9 +43,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     return encoded_jwt
 
+def _decode_subject(token: str) -> Optional[str]:
+    """Username from a valid token, memoised so hot tokens skip signature checks"""
+    
+    username = _token_cache.get(token)
+    if username is not None:
+        return username
+    
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return None
+    
+    username = payload.get("sub")
+    if username is None:
+        return None
+    
+    # Never remember a token past its own expiry
+    ttl = settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(token, username, ttl_seconds=ttl)
+    return username
+
+async def _load_user(db: AsyncSession, username: str) -> Optional[User]:
+    """
+    Resolve a token subject to a User attached to this request's session
+    
+    The cached copy is detached; merge(load=False) attaches a copy to db
+    without querying, so routes can still update it or lazy-load
+    relationships.
+    """
+    
+    user = _user_cache.get(username)
+    if user is None:
+        user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+        if user is None:
+            return None
+        db.expunge(user)
+        # End the lookup's transaction so the request (an LLM call, an SSE
+        # stream) does not hold the pooled connection
+        await db.rollback()
+        _user_cache.set(username, user)
+    
+    return await db.merge(user, load=False)
+
+def invalidate_user(username: str):
+    """Drop a cached principal after its profile or active flag changes"""
+    _user_cache.pop(username)
+
+def auth_cache_stats() -> Dict[str, Any]:
+    return {
+        "tokens": _token_cache.stats(),
+        "users": _user_cache.stats(),
+    }
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current authenticated user"""
     
@@ -50,17 +111,11 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            raise credentials_exception
-            
-    except JWTError:
+    username = _decode_subject(token)
+    if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await _load_user(db, username)
     
     if user is None:
         raise credentials_exception
@@ -79,21 +134,14 @@ oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_e
 
 async def get_current_user_optional(
     token: str = Depends(oauth2_scheme_optional),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[User]:
     """Get current user if authenticated, None otherwise"""
     if not token:
         return None
     
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            return None
-            
-    except JWTError:
+    username = _decode_subject(token)
+    if username is None:
         return None
     
-    user = db.query(User).filter(User.username == username).first()
-    return user
+    return await _load_user(db, username)
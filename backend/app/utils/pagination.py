@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+# Page size cap for history endpoints; larger limits are clamped, not rejected, so existing clients keep working
+MAX_PAGE_SIZE = 500
+
+
+def clamp_limit(limit: Optional[int], default: int, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Requested page size, or default, clamped to 1..maximum"""
+    return max(1, min(limit or default, maximum))
+
+
+def encode_cursor(position: datetime, row_id: int) -> str:
+    """Opaque cursor for the (position, id) of the last row on a page"""
+    raw = json.dumps([position.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; a malformed cursor is a 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position, row_id = json.loads(raw)
+        return datetime.fromisoformat(position), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+async def keyset_page(db, stmt, position_column, id_column, after: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of a select() of ORM rows, newest first, continuing after the given cursor
+
+    Seeks with a (position, id) row comparison instead of OFFSET, so each
+    page costs the same however deep it is, given an index ending in
+    (position, id). Returns the rows and the cursor for the next page,
+    or None on the last page.
+    """
+
+    if after:
+        position, row_id = decode_cursor(after)
+        stmt = stmt.where(tuple_(position_column, id_column) < tuple_(position, row_id))
+
+    stmt = stmt.order_by(position_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, position_column.key), last.id)
@@ -0,0 +1,45 @@
+import time
+from app.services.metrics import http_request_duration, http_requests_in_flight
+
+# Requests that matched no route share one label, so scanners can't grow the series count
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each HTTP request's latency by method, route template and status
+
+    The route template (e.g. /api/history/{prediction_id}) is read from the
+    scope after routing, so per-ID paths land in one series. Streaming
+    responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", UNMATCHED_ROUTE),
+                status=status
+            )
@@ -0,0 +1,196 @@
+import codecs
+import csv
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+
+async def _iter_lines(request) -> AsyncIterator[str]:
+    """Yield complete text lines from a streamed request body"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def iter_batch_rows(request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse a batch upload into (index, row) pairs
+
+    Accepts a JSON array, NDJSON (one object per line) or CSV with a header
+    row, selected by Content-Type. NDJSON and CSV are parsed as they stream
+    in; a row that cannot be parsed is yielded as an Exception.
+    """
+
+    content_type = request.headers.get("content-type", "").lower()
+
+    if "csv" in content_type:
+        header = None
+        index = 0
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [column.strip() for column in values]
+                continue
+            yield index, {
+                column: value.strip() or None
+                for column, value in zip(header, values)
+            }
+            index += 1
+        return
+
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, ValueError(f"Invalid JSON: {e}")
+            index += 1
+        return
+
+    body = await request.body()
+    try:
+        rows = json.loads(body or b"[]")
+    except json.JSONDecodeError as e:
+        yield 0, ValueError(f"Invalid JSON: {e}")
+        return
+    if not isinstance(rows, list):
+        rows = [rows]
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that may keep reading the request body while it sends
+
+    The stock response listens for client disconnects by consuming receive(),
+    which would steal the body chunks the batch parser is still reading.
+    Disconnects surface instead as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class JSONFieldParser:
+    """
+    Incremental parser for a JSON object arriving in text fragments
+
+    feed() returns each top-level (key, value) pair as soon as the comma
+    or closing brace after it arrives, so a client can render the first
+    fields of an LLM answer long before the whole object is complete.
+    Anything before the opening brace (prose, a code fence) is skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._field_start: Optional[int] = None
+        self.complete = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        self.text += fragment
+        fields: List[Tuple[str, Any]] = []
+        text = self.text
+        while self._pos < len(text) and not self.complete:
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._field_start = self._pos + 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    fields += self._field(self._pos)
+                    self.complete = True
+            elif ch == "," and self._depth == 1:
+                fields += self._field(self._pos)
+                self._field_start = self._pos + 1
+            self._pos += 1
+        return fields
+
+    def _field(self, end: int) -> List[Tuple[str, Any]]:
+        segment = self.text[self._field_start:end].strip()
+        if not segment:
+            return []
+        try:
+            return list(json.loads("{" + segment + "}").items())
+        except ValueError:
+            return []
+
+    def result(self) -> Dict[str, Any]:
+        """The whole object, once the stream has ended"""
+        start, end = self.text.find("{"), self.text.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("Stream ended without a JSON object")
+        return json.loads(self.text[start:end + 1])
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events frame with a JSON payload (dicts or pydantic models)"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+async def advisory_events(
+    events: AsyncIterator[Tuple[str, Any]],
+    on_result: Callable[[Dict[str, Any]], Awaitable[Any]]
+) -> AsyncIterator[str]:
+    """
+    SSE frames for an advisory stream
+
+    Sends a comment straight away so the response starts before the
+    provider answers, then a "field" event per top-level field and a final
+    "result" event with whatever on_result returns, which is the same
+    body the non-streaming endpoint sends. The result is authoritative:
+    if the provider fails midway it carries the fallback answer.
+    """
+
+    yield ": stream open\n\n"
+    try:
+        async for kind, payload in events:
+            if kind == "field":
+                name, value = payload
+                yield sse_event("field", {"name": name, "value": value})
+            else:
+                yield sse_event("result", await on_result(payload))
+    except Exception as e:
+        logger.warning("Advisory stream error: %s", e, exc_info=True)
+        yield sse_event("error", {"detail": str(e)})
+
+
+class EventStreamResponse(StreamingResponse):
+    """text/event-stream response that proxies and browsers won't buffer"""
+
+    def __init__(self, content, **kwargs):
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **kwargs.pop("headers", {})}
+        super().__init__(content, media_type="text/event-stream", headers=headers, **kwargs)
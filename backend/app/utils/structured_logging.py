@@ -0,0 +1,238 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Correlates every log line written while handling a request
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# LogRecord attributes; anything else on a record came from `extra=` and is logged as a field
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sampled_out"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request ID and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "sampled_out", 0):
+            entry["sampled_out"] = record.sampled_out
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        line = super().format(record)
+        if getattr(record, "sampled_out", 0):
+            line += f" (+{record.sampled_out} similar suppressed)"
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits chatty records per call site
+
+    Records at or below `max_level` are let through at most `rate` per
+    second (with bursts up to `rate`) for each logger/line; the rest are
+    dropped and counted, and the next record let through from that site
+    carries the count as `sampled_out`. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+        self.suppressed_total = 0
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate <= 0:
+            return True
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, suppressed since the last record let through]
+            bucket = self._buckets.setdefault(key, [self.rate, now, 0])
+            bucket[0] = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.suppressed_total += 1
+                return False
+            bucket[0] -= 1
+            record.sampled_out, bucket[2] = bucket[2], 0
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background thread that formats and writes them
+
+    The calling thread only resolves the message and request ID; when the
+    bounded queue is full the record is dropped and counted instead of
+    blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that depends on the caller before the record changes threads
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_stream: Optional[logging.Handler] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """'app.services.ai_service=DEBUG,sqlalchemy.engine=INFO' -> {logger: level}"""
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(
+    level: str = "INFO",
+    module_levels: str = "",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    sample_rate: float = 0,
+    sample_max_level: str = "DEBUG"
+):
+    """
+    Route the root logger (and uvicorn's loggers) through a bounded queue to
+    a single writer thread; safe to call again to apply new settings
+    """
+
+    global _listener, _stream, _queue_handler, _sampler
+    shutdown_logging()
+
+    _stream = logging.StreamHandler(sys.stdout)
+    _stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _sampler = SamplingFilter(sample_rate, logging.getLevelName(sample_max_level.upper()))
+    _queue_handler.addFilter(_sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+
+    # uvicorn installs its own synchronous handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    for name, module_level in parse_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, _stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread; anything logged
+    afterwards (e.g. uvicorn's last lines) is written directly
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    root.addHandler(_stream)
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "sampled_out": _sampler.suppressed_total if _sampler else 0,
+    }
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request an ID for log correlation
+
+    A well-formed X-Request-ID from the caller (e.g. a load balancer) is
+    kept, otherwise one is generated; it is set for the duration of the
+    request and echoed in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")
+        request_id = supplied if _VALID_REQUEST_ID.match(supplied) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,65 @@
+from typing import Dict
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds the {limit // (1024 * 1024)} MB limit"
+
+
+class UploadLimitMiddleware:
+    """
+    Caps request bodies on selected paths while they stream in
+
+    A declared Content-Length over the limit is refused before any body is
+    read; otherwise the body is counted as it arrives and the request fails
+    with 413 as soon as it crosses the limit, so an oversized upload is
+    never spooled in full.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": _too_large(limit)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=_too_large(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an uploaded file in chunks, failing with 413 once it passes max_bytes"""
+
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=_too_large(max_bytes))
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -0,0 +1,108 @@
+"""
+Per-call cost of the precompiled fertilizer table against computing
+
+Times FertilizerService.compute_recommendation (deficiency, LP blend and
+advice built per call) and FertilizerTable.lookup on the same random
+inputs, plus the one-off cost of building the table, saving it and
+loading it back. Also reports how far the table's rounded-up blends are
+from the computed ones.
+
+    cd backend
+    DEBUG=False python -m benchmarks.fertilizer_table --calls 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from app.services.fertilizer_service import FertilizerService, CROP_REQUIREMENTS
+from app.services.fertilizer_table import FertilizerTable
+
+SOIL_TYPES = ["Sandy", "Clay", "Loamy", "Silty", "Peaty", "Chalky"]
+
+
+def random_inputs(count: int):
+    crops = list(CROP_REQUIREMENTS) + ["onion"]
+    return [
+        (
+            random.choice(crops),
+            random.choice(SOIL_TYPES),
+            {"N": random.uniform(0, 110), "P": random.uniform(0, 60), "K": random.uniform(0, 70)},
+            random.uniform(4.5, 8.5),
+            random.uniform(10, 80),
+        )
+        for _ in range(count)
+    ]
+
+
+def time_calls(func, inputs):
+    timings = []
+    for args in inputs:
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(name: str, timings):
+    timings = sorted(timings)
+    print(
+        f"{name:<10} mean {statistics.mean(timings) * 1e6:8.1f} us   "
+        f"p50 {timings[len(timings) // 2] * 1e6:8.1f} us   "
+        f"p99 {timings[int(len(timings) * 0.99)] * 1e6:8.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--step", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    table = FertilizerTable(args.step)
+    tracemalloc.start()
+    started = time.perf_counter()
+    table.build()
+    build_seconds = time.perf_counter() - started
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"build      {build_seconds * 1000:8.1f} ms   {len(table.cells)} cells, {len(table.bands)} band entries, ~{table_bytes / 1e6:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fertilizer_table.pkl")
+        table.load(path)
+        reloaded = FertilizerTable(args.step)
+        started = time.perf_counter()
+        source = reloaded.load(path)
+        print(f"load       {(time.perf_counter() - started) * 1000:8.1f} ms   from {source}, {os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+    inputs = random_inputs(args.calls)
+    computed = time_calls(FertilizerService.compute_recommendation, inputs)
+    looked_up = time_calls(table.lookup, inputs)
+    report("computed", computed)
+    report("table", looked_up)
+    print(f"speedup    {statistics.mean(computed) / statistics.mean(looked_up):8.1f} x")
+
+    misses = same_products = 0
+    extra_kg = []
+    for args_ in inputs:
+        expected = FertilizerService.compute_recommendation(*args_)
+        actual = table.lookup(*args_)
+        if actual is None:
+            misses += 1
+            continue
+        same_products += expected["fertilizer_name"] == actual["fertilizer_name"]
+        extra_kg.append(actual["quantity_kg_per_acre"] - expected["quantity_kg_per_acre"])
+    print(
+        f"agreement  {same_products / (len(inputs) - misses):.1%} same products, "
+        f"table supplies {statistics.mean(extra_kg):+.1f} kg/acre on average (max {max(extra_kg):+.1f}), "
+        f"{misses} misses"
+    )
+
+
+if __name__ == "__main__":
+    main()
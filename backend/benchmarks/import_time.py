@@ -0,0 +1,82 @@
+"""
+Cold import time of app.main, as a regression check
+
+Imports app.main in fresh interpreters under `python -X importtime`,
+keeps the fastest run, and prints the modules with the largest
+cumulative import time. Exits non-zero when the import takes longer
+than --budget-ms or pulls in a module that should only load on first
+use (provider SDKs, training-only scientific libraries), so it can gate
+CI or a container build. The budget defaults to IMPORT_TIME_BUDGET_MS
+(2000 ms), so slower runners can set it without changing the code.
+
+    cd backend
+    DEBUG=False python -m benchmarks.import_time --budget-ms 2000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Loaded lazily by ProviderRegistry, or not used by the API at all
+DEFERRED_MODULES = (
+    "groq", "openai", "google.generativeai", "IPython",
+    "xgboost", "sklearn", "pandas", "matplotlib",
+)
+
+BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(module: str):
+    """{module: (self us, cumulative us, depth)} for one cold import of module"""
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    profile = {}
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            profile[name] = (int(own), int(cumulative), len(indent) // 2)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    profile = min(runs, key=lambda run: run[args.module][1])
+    total_ms = profile[args.module][1] / 1000
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    top_level = [(name, row) for name, row in profile.items() if row[2] <= 1 and name != args.module]
+    for name, (own, cumulative, _) in sorted(top_level, key=lambda item: -item[1][1])[:args.top]:
+        print(f"{cumulative / 1000:14.1f} {own / 1000:9.1f}  {name}")
+    print(f"{total_ms:14.1f} {'':9}  {args.module} (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    deferred = sorted(name for name in DEFERRED_MODULES if name in profile)
+    if deferred:
+        failures.append(f"import {args.module} loaded modules that should load on first use: {', '.join(deferred)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
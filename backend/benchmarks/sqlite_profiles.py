@@ -0,0 +1,155 @@
+"""
+Insert and read throughput of the SQLite storage profiles
+
+Runs the sensor ingest write path (bulk insert + rollup upserts, as the
+SensorIngestWriter does) against a scratch database per profile, first
+alone and then with reader threads running the /history and /stats
+queries plus a raw scan. Under the default rollback journal, readers
+and the ingest commit exclude each other, and a wait longer than the
+busy timeout surfaces as "database is locked"; under WAL they don't
+block each other.
+
+    cd backend
+    DEBUG=False python -m benchmarks.sqlite_profiles --rows 50000 --seconds 10 --readers 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, desc, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from app.database import Base, SQLITE_PROFILES, install_sqlite_profile
+from app.models import models  # noqa: F401 - registers the tables
+from app.models.models import SensorReading, SensorRollupHour
+from app.services.sensor_rollup import update_rollups
+
+LOCATIONS = [f"field-{n}" for n in range(8)]
+
+
+def make_engine(path: str, profile: str, busy_timeout: float):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": busy_timeout},
+        poolclass=QueuePool,
+        pool_size=16,
+        max_overflow=0,
+    )
+    install_sqlite_profile(engine, profile)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def readings(count: int, start: datetime):
+    return [
+        {
+            "user_id": None,
+            "location": random.choice(LOCATIONS),
+            "timestamp": start + timedelta(seconds=n),
+            "soil_moisture": random.uniform(10, 60),
+            "soil_ph": random.uniform(5, 8),
+            "nitrogen": random.uniform(0, 140),
+            "phosphorus": random.uniform(5, 145),
+            "potassium": random.uniform(5, 205),
+            "temperature": random.uniform(10, 40),
+            "humidity": random.uniform(20, 95),
+        }
+        for n in range(count)
+    ]
+
+
+def write_batch(engine, batch):
+    with engine.begin() as conn:
+        conn.execute(insert(SensorReading), batch)
+        update_rollups(conn, batch)
+
+
+def bench_inserts(engine, rows: int, batch_size: int) -> float:
+    start = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        write_batch(engine, readings(min(batch_size, rows - offset), start + timedelta(seconds=offset)))
+    return rows / (time.perf_counter() - started)
+
+
+def reader(engine, stop: threading.Event, latencies, errors):
+    history = select(SensorReading).where(SensorReading.location == LOCATIONS[0]) \
+        .order_by(desc(SensorReading.timestamp), desc(SensorReading.id)).limit(100)
+    chart = select(SensorRollupHour).order_by(desc(SensorRollupHour.bucket_start)).limit(500)
+    # A raw scan like an export, holding its read lock across ingest commits
+    scan = select(func.count(), func.avg(SensorReading.soil_moisture), func.max(SensorReading.temperature))
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(history).all()
+                conn.execute(chart).all()
+                conn.execute(scan).one()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError as e:
+            errors.append(str(e.orig))
+
+
+def bench_mixed(engine, seconds: float, readers: int, batch_size: int):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=reader, args=(engine, stop, latencies, errors)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+
+    written = 0
+    start = datetime(2025, 1, 1)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            write_batch(engine, readings(batch_size, start + timedelta(seconds=written)))
+            written += batch_size
+        except OperationalError as e:
+            errors.append(str(e.orig))
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "writes_per_s": written / seconds,
+        "reads_per_s": len(latencies) / seconds,
+        "read_p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "read_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "errors": len(errors),
+        "locked": sum("locked" in error for error in errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="readings for the insert-only run")
+    parser.add_argument("--batch", type=int, default=500, help="readings per ingest transaction")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of the mixed run")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent reader threads")
+    parser.add_argument("--busy-timeout", type=float, default=5.0,
+                        help="sqlite3 connect timeout in seconds (the tuned profile sets its own)")
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'insert rows/s':>14} {'mixed rows/s':>13} {'reads/s':>9} "
+          f"{'read p50 ms':>12} {'read p99 ms':>12} {'errors':>7} {'locked':>7}")
+    for profile in args.profiles:
+        random.seed(0)
+        with tempfile.TemporaryDirectory() as scratch:
+            engine = make_engine(os.path.join(scratch, "bench.db"), profile, args.busy_timeout)
+            try:
+                inserts = bench_inserts(engine, args.rows, args.batch)
+                mixed = bench_mixed(engine, args.seconds, args.readers, args.batch)
+            finally:
+                engine.dispose()
+        print(f"{profile:<10} {inserts:>14,.0f} {mixed['writes_per_s']:>13,.0f} {mixed['reads_per_s']:>9,.0f} "
+              f"{mixed['read_p50_ms']:>12.1f} {mixed['read_p99_ms']:>12.1f} {mixed['errors']:>7} {mixed['locked']:>7}")
+
+
+if __name__ == "__main__":
+    main()
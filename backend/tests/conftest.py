@@ -0,0 +1,31 @@
+"""Point the app at a throwaway database and keep tests offline, before anything imports app.config"""
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="agriculture-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir}/test.db",
+    "ASYNC_DATABASE_URL": "",
+    "AUDIT_DEAD_LETTER_PATH": f"{_workdir}/audit_dead_letter.jsonl",
+    "IMAGE_CACHE_PATH": "",
+    "RESPONSE_CACHE_BACKEND": "memory",
+    "GROQ_API_KEY": "",
+    "OPENAI_API_KEY": "",
+    "GEMINI_API_KEY": "",
+    "LLM_WARMUP_ON_STARTUP": "False",
+    "PASSWORD_HASH_EXECUTOR": "thread",
+    "DEBUG": "False",
+})
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient with the startup and shutdown hooks run once per session"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from app.services import batch_prediction
+from app.services.batch_prediction import CropBatchPredictor
+
+SOIL = {"nitrogen": 90, "phosphorus": 42, "potassium": 43, "temperature": 21, "humidity": 82, "ph": 6.5, "rainfall": 203}
+
+
+class FakeEngine:
+    """Low confidence for every row but the last, so narrations are pending when the last row is yielded"""
+
+    def predict_batch(self, rows):
+        return [
+            {"recommended_crop": "rice", "confidence": 0.9 if index == len(rows) - 1 else 0.1}
+            for index in range(len(rows))
+        ]
+
+
+def test_closing_the_stream_cancels_pending_narrations(monkeypatch):
+    started, cancelled = [], []
+
+    async def never_answers(*args, **kwargs):
+        started.append(True)
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(batch_prediction.AIService, "predict_crop_ai", never_answers)
+    monkeypatch.setattr(batch_prediction, "get_crop_engine", FakeEngine)
+
+    async def rows():
+        for index in range(4):
+            yield index, dict(SOIL)
+
+    async def consume():
+        stream = CropBatchPredictor(narrate_below=0.5).stream(rows())
+        first = json.loads(await stream.__anext__())
+        await asyncio.sleep(0.05)
+        # The client disconnects: the response closes the generator at its yield
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        # Checked before asyncio.run cancels whatever is left at exit
+        return first, len(started), len(cancelled)
+
+    first, started_count, cancelled_count = asyncio.run(consume())
+    assert first["index"] == 3
+    assert started_count == 3
+    assert cancelled_count == 3
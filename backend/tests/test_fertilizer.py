@@ -0,0 +1,64 @@
+import copy
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.fertilizer_optimizer import BlendOptimizer
+from app.services.fertilizer_service import FERTILIZER_DATABASE
+from app.services.fertilizer_table import FertilizerTable
+
+
+def test_blend_optimizer_matches_linprog():
+    linprog = pytest.importorskip("scipy.optimize").linprog
+    rng = np.random.default_rng(7)
+    optimizer = BlendOptimizer(FERTILIZER_DATABASE)
+    deficiencies = rng.uniform(0, 120, size=(2000, 3))
+    deficiencies[rng.random(deficiencies.shape) < 0.2] = 0
+
+    quantities, costs = optimizer.solve(deficiencies)
+
+    assert (quantities >= 0).all()
+    assert (optimizer.content @ quantities.T >= deficiencies.T - 1e-6).all()
+    for deficiency, cost in zip(deficiencies, costs):
+        reference = linprog(optimizer.prices, A_ub=-optimizer.content, b_ub=-deficiency, bounds=(0, None), method="highs")
+        assert reference.status == 0
+        assert cost == pytest.approx(reference.fun, rel=1e-9, abs=1e-9)
+
+
+@pytest.fixture(scope="module")
+def table():
+    table = FertilizerTable(settings.FERTILIZER_TABLE_STEP)
+    table.build()
+    return table
+
+
+def test_table_lookup_results_are_independent(table):
+    args = ("rice", "loamy", {"N": 10, "P": 5, "K": 0}, 6.5, 60.0)
+    first = table.lookup(*args)
+    pristine = copy.deepcopy(table.lookup(*args))
+
+    first["blend"][0]["quantity_kg_per_acre"] = -1
+    first["nutrients_supplied"]["N"] = -1
+    first["deficiency_analysis"]["N"] = -1
+
+    assert table.lookup(*args) == pristine
+
+
+def test_table_lookup_without_deficiency_is_independent(table):
+    args = ("rice", "loamy", {"N": 500, "P": 500, "K": 500}, 6.5, 60.0)
+    first = table.lookup(*args)
+    pristine = copy.deepcopy(table.lookup(*args))
+    first["fertilizer_name"] = "changed"
+    assert table.lookup(*args) == pristine
+
+
+def test_table_file_round_trip(table, tmp_path):
+    path = str(tmp_path / "fertilizer_table.pkl")
+    written = FertilizerTable(table.step)
+    assert written.load(path) == "built"
+    reloaded = FertilizerTable(table.step)
+    assert reloaded.load(path) == "file"
+
+    args = ("maize", "sandy", {"N": 20, "P": 10, "K": 5}, 5.0, 20.0)
+    assert reloaded.lookup(*args) == table.lookup(*args)
@@ -0,0 +1,21 @@
+"""Cold import of app.main stays within budget and leaves the deferred modules unloaded"""
+import pytest
+
+from benchmarks.import_time import BUDGET_MS, DEFERRED_MODULES, import_profile
+
+
+@pytest.fixture(scope="module")
+def profile():
+    # Best of 5 fresh interpreters, to ride out a noisy machine
+    runs = [import_profile("app.main") for _ in range(5)]
+    return min(runs, key=lambda run: run["app.main"][1])
+
+
+def test_cold_import_within_budget(profile):
+    total_ms = profile["app.main"][1] / 1000
+    assert total_ms <= BUDGET_MS, f"import app.main took {total_ms:.0f} ms, over the {BUDGET_MS:.0f} ms budget"
+
+
+def test_deferred_modules_not_imported(profile):
+    loaded = sorted(name for name in DEFERRED_MODULES if name in profile)
+    assert not loaded, f"import app.main loaded modules that should load on first use: {', '.join(loaded)}"
@@ -0,0 +1,38 @@
+import asyncio
+
+from app.config import settings
+from app.services.provider_router import LatencyStats, ProviderRouter
+
+
+def answer(delay: float, value: str):
+    async def call():
+        await asyncio.sleep(delay)
+        return value
+    return call
+
+
+def test_hedge_loser_is_counted_in_latency_window(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.05)
+    router = ProviderRouter()
+
+    result = asyncio.run(router.race(
+        [("slow", "m", answer(1.0, "slow")), ("fast", "m", answer(0.01, "fast"))],
+        lambda value: bool(value)
+    ))
+
+    assert result == "fast"
+    slow = router.latency("slow", "m")
+    assert slow.censored == 1
+    assert slow.latencies[0] >= 0.05
+    assert list(slow.outcomes) == []
+    assert router.breaker("slow").state == "closed"
+
+
+def test_censored_samples_below_p95_are_ignored():
+    stats = LatencyStats(window=100)
+    for _ in range(20):
+        stats.record(2.0, True)
+    stats.censor(0.1)
+    stats.censor(3.0)
+    assert stats.censored == 1
+    assert sorted(stats.latencies)[-1] == 3.0
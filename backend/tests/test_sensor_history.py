@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.models import SensorReading
+from app.services.sensor_ingest import sensor_writer, validate_readings
+from app.utils.pagination import MAX_PAGE_SIZE
+
+READING = {
+    "soil_moisture": 41.5,
+    "soil_ph": 6.4,
+    "nitrogen": 120.0,
+    "phosphorus": 45.0,
+    "potassium": 180.0,
+    "temperature": 27.5,
+    "humidity": 64.0,
+}
+
+
+def test_offset_timestamps_are_stored_as_utc():
+    valid, errors = validate_readings([(0, {**READING, "timestamp": "2026-01-01T05:30:00+05:30"})])
+    assert not errors
+    assert valid[0]["timestamp"].isoformat() == "2026-01-01T00:00:00"
+
+
+def test_raw_history_matches_rollups_for_offset_timestamps(client):
+    location = "tz-offset-plot"
+    response = client.post("/api/sensor/ingest", json=[
+        {**READING, "timestamp": "2026-01-01T05:30:00+05:30", "location": location},
+        {**READING, "timestamp": "2026-01-01T00:00:30Z", "location": location, "soil_ph": 6.8},
+    ])
+    assert response.json()["accepted"] == 2
+    client.portal.call(sensor_writer.flush)
+
+    window = {"from": "2026-01-01T00:00:00Z", "to": "2026-01-01T00:00:59Z", "location": location}
+    raw = client.get("/api/sensor/history", params={**window, "bucket": "raw"}).json()["readings"]
+    minute = client.get("/api/sensor/history", params={**window, "bucket": "1m"}).json()["readings"]
+
+    assert sorted(r["timestamp"] for r in raw) == ["2026-01-01T00:00:00", "2026-01-01T00:00:30"]
+    assert len(minute) == 1
+    assert minute[0]["bucket_start"] == "2026-01-01T00:00:00"
+    assert minute[0]["count"] == len(raw)
+    assert minute[0]["soil_ph"]["min"] == min(r["soil_ph"] for r in raw)
+    assert minute[0]["soil_ph"]["max"] == max(r["soil_ph"] for r in raw)
+
+
+def test_history_page_size_is_clamped(client):
+    location = "page-size-plot"
+    readings = [
+        {**READING, "timestamp": f"2026-02-01T{index // 60:02d}:{index % 60:02d}:00Z", "location": location}
+        for index in range(MAX_PAGE_SIZE + 20)
+    ]
+    assert client.post("/api/sensor/ingest", json=readings).json()["accepted"] == len(readings)
+    client.portal.call(sensor_writer.flush)
+
+    response = client.get("/api/sensor/history", params={"bucket": "raw", "location": location, "limit": 10 ** 9})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == MAX_PAGE_SIZE
+    assert body["next_cursor"] is not None
+
+
+def test_writer_refuses_to_start_without_upsert(monkeypatch):
+    import app.services.sensor_ingest as sensor_ingest
+
+    monkeypatch.setattr(sensor_ingest, "engine", SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    writer = sensor_ingest.SensorIngestWriter("sensor_ingest_test", SensorReading.__table__, max_queue=10, batch_size=10, flush_interval=1)
+    with pytest.raises(NotImplementedError, match="mysql"):
+        writer.start()
+    assert writer._task is None
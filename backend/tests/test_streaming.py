@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from app.utils.streaming import JSONFieldParser
+
+DOCUMENT = {
+    "disease_name": "Leaf blight, late stage {suspected}",
+    "quote": "farmer said \"it spread overnight\", then } and ]",
+    "path": "C:\\fields\\north\\",
+    "unicode": "caf\u00e9 \u0939\u093f\u0902\u0926\u0940",
+    "confidence": 0.87,
+    "treatment": {"organic": ["neem oil, 5 ml/l", "remove {infected} leaves"], "chemical": {"name": "mancozeb", "dose": [2, "g/l"]}},
+    "steps": [[1, "scout"], {"day": 3, "note": "re-check, spray if needed"}],
+    "empty": {},
+    "none": None,
+    "last": True,
+}
+
+
+def parse(chunks):
+    parser = JSONFieldParser()
+    fields = []
+    for chunk in chunks:
+        fields += parser.feed(chunk)
+    return parser, fields
+
+
+def test_fields_match_json_loads():
+    text = json.dumps(DOCUMENT)
+    parser, fields = parse([text])
+    assert fields == list(DOCUMENT.items())
+    assert parser.complete
+    assert parser.result() == DOCUMENT
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_split_point(ensure_ascii):
+    # Splitting inside strings, escapes (\" \\ \uXXXX), numbers and nested values changes nothing
+    text = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii)
+    for cut in range(1, len(text)):
+        _, fields = parse([text[:cut], text[cut:]])
+        assert fields == list(DOCUMENT.items()), f"split at {cut}: {text[cut - 5:cut]!r}|{text[cut:cut + 5]!r}"
+
+
+def test_one_character_at_a_time():
+    text = json.dumps(DOCUMENT, indent=2)
+    _, fields = parse(list(text))
+    assert fields == list(DOCUMENT.items())
+
+
+def test_field_is_emitted_once_its_delimiter_arrives():
+    parser = JSONFieldParser()
+    assert parser.feed('{"crop": "rice", "tips": ["a, b"') == [("crop", "rice")]
+    assert parser.feed(', "c"]') == []
+    assert parser.feed('}') == [("tips", ["a, b", "c"])]
+    assert parser.complete
+
+
+def test_prose_and_code_fence_before_the_object_are_skipped():
+    text = 'Here is the answer:\n```json\n{"crop": "maize", "confidence": 0.9}\n```'
+    parser, fields = parse([text[:25], text[25:]])
+    assert fields == [("crop", "maize"), ("confidence", 0.9)]
+    assert parser.result() == {"crop": "maize", "confidence": 0.9}
+
+
+def test_text_after_the_object_is_ignored():
+    parser, fields = parse(['{"a": 1}', ', "b": 2}'])
+    assert fields == [("a", 1)]
+    assert parser.complete
+
+
+def test_incomplete_stream():
+    parser, fields = parse(['{"a": 1, "b": "unterminated'])
+    assert fields == [("a", 1)]
+    assert not parser.complete
+    with pytest.raises(ValueError):
+        parser.result()